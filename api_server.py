@@ -0,0 +1,258 @@
+# api_server.py - Headless HTTP service for the CHRONOCHECK agents
+"""
+Headless API server (plain ASGI, no web framework needed)
+Exposes the five agents over JSON and coalesces identical in-flight requests (single-flight),
+so a burst of identical hospital searches results in one upstream call
+
+Run:   uvicorn api_server:app --host 0.0.0.0 --port 8000
+       (or: python api_server.py --port 8000)
+Config comes from the same .streamlit/secrets.toml as the Streamlit app; point the flow URLs
+at a local stub Langflow to run fully offline
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable
+
+from file_preprocessing import ProcessedUpload
+
+
+# Largest accepted request body (files are sent base64-encoded inside the JSON)
+MAX_BODY_BYTES = 40 * 1024 * 1024
+
+
+class SingleFlight:
+    """Share one execution among concurrent callers with the same key"""
+    
+    def __init__(self):
+        self._inflight = {}
+        self.executed = 0
+        self.coalesced = 0
+    
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        
+        future = asyncio.ensure_future(call())
+        self._inflight[key] = future
+        self.executed += 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+    
+    def stats(self) -> Dict[str, int]:
+        return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
+
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# ========== REQUEST PARSING ==========
+
+def _decode_files(body: Dict[str, Any]) -> List:
+    """Files arrive as [{"name", "type", "content_base64"}]"""
+    files = []
+    for item in body.get("files") or []:
+        try:
+            data = base64.b64decode(item["content_base64"], validate=True)
+        except (KeyError, TypeError, ValueError):
+            raise RequestError(400, "Each file needs a base64 'content_base64' field")
+        files.append(ProcessedUpload(data, item.get("name") or "upload", item.get("type") or "application/octet-stream"))
+    return files
+
+
+def _required(body: Dict[str, Any], field: str) -> str:
+    value = body.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise RequestError(400, f"Field '{field}' is required")
+    return value
+
+
+def _option(body: Dict[str, Any], field: str, kind: type, default: Any) -> Any:
+    value = body.get(field, default)
+    if value is not None and not isinstance(value, kind):
+        raise RequestError(400, f"'{field}' must be a {'boolean' if kind is bool else 'string'}")
+    return value
+
+
+# path -> (flow_key, parser returning (input_value, files, method_name, args, options))
+def _parse_qna(body):
+    question = _required(body, "question")
+    return question, None, "qna_medical", (question,), {}
+
+
+def _parse_with_files(method_name: str, **option_specs: Tuple[type, Any]):
+    """option_specs: keyword argument of the method -> (type, default), read from the body field of that name"""
+    def parse(body):
+        message = body.get("message") or ""
+        files = _decode_files(body)
+        if not message and not files:
+            raise RequestError(400, "Provide 'message' and/or 'files'")
+        options = {field: _option(body, field, kind, default) for field, (kind, default) in option_specs.items()}
+        return message, files, method_name, (message, files or None), options
+    return parse
+
+
+def _parse_hospitals(body):
+    query = _required(body, "query")
+    location = body.get("location") or ""
+    specializations = body.get("specializations") or None
+    if specializations is not None and not (isinstance(specializations, list) and all(isinstance(s, str) for s in specializations)):
+        raise RequestError(400, "'specializations' must be a list of strings")
+    full_query = f"{query} in {location}" if location else query
+    if specializations:
+        full_query += f" specializing in {', '.join(specializations)}"
+    options = {"phrase": _option(body, "phrase", bool, False)}
+    return full_query, None, "find_hospitals", (query, location, specializations), options
+
+
+ROUTES = {
+    "/qna": ("qna_agent", _parse_qna),
+    "/report": ("report_analyzer", _parse_with_files("analyze_report", analysis_type=(str, None))),
+    "/prescription": ("prescription_analyzer", _parse_with_files("explain_medicines", check_interactions=(bool, True))),
+    "/bill": ("bill_analyzer", _parse_with_files("analyze_bill", quick_audit=(bool, False),
+                                                 check_overcharges=(bool, True), check_duplicates=(bool, True))),
+    "/hospitals": ("hospital_finder", _parse_hospitals)
+}
+
+
+# ========== ASGI APP ==========
+
+class AgentServer:
+    
+    def __init__(self, api_factory: Callable[[], Any] = None):
+        """api_factory builds the async client (defaults to AsyncCloudLangflowAPI from secrets)"""
+        self.api_factory = api_factory
+        self.api = None
+        self.single_flight = SingleFlight()
+    
+    def _get_api(self):
+        if self.api is None:
+            if self.api_factory is None:
+                from async_langflow_api import AsyncCloudLangflowAPI
+                self.api_factory = AsyncCloudLangflowAPI
+            self.api = self.api_factory()
+        return self.api
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        
+        try:
+            status, payload = await self._dispatch(scope, receive)
+        except RequestError as e:
+            status, payload = e.status, {"success": False, "error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"success": False, "error": f"Internal error: {type(e).__name__}: {e}"}
+        
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), b"text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body, content_type = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8"), b"application/json; charset=utf-8"
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type),
+                        (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+    
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    self._get_api()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.api is not None:
+                    await self.api.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    
+    async def _dispatch(self, scope, receive) -> Tuple[int, Dict[str, Any]]:
+        path = scope["path"].rstrip("/") or "/"
+        method = scope["method"]
+        
+        if path == "/health" and method == "GET":
+            api = self._get_api()
+            return 200, {
+                "status": "ok",
+                "circuits": {flow: m["state"] for flow, m in api.circuit_metrics().items()},
+                "single_flight": self.single_flight.stats(),
+                "cache": api.cache.stats()
+            }
+        
+        if path == "/metrics" and method == "GET":
+            return 200, self._get_api().prometheus_metrics()
+        
+        if path not in ROUTES:
+            raise RequestError(404, f"Unknown endpoint {path}")
+        if method != "POST":
+            raise RequestError(405, "Use POST")
+        
+        body = await self._read_json(receive)
+        flow_key, parse = ROUTES[path]
+        input_value, files, method_name, args, options = parse(body)
+        
+        # Requests that differ only in options (quick_audit, phrase, ...) must not share a call
+        api = self._get_api()
+        key = api.cache.make_key(flow_key, input_value + "\n" + json.dumps(options, sort_keys=True), files)
+        result = await self.single_flight.do(key, lambda: getattr(api, method_name)(*args, **options))
+        
+        response = {k: v for k, v in result.items() if k != "raw"}
+        return (200 if result.get("success") else 502), response
+    
+    @staticmethod
+    async def _read_json(receive) -> Dict[str, Any]:
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                raise RequestError(413, f"Request body exceeds {MAX_BODY_BYTES} bytes")
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                break
+        
+        try:
+            body = json.loads(b"".join(chunks) or b"{}")
+        except ValueError:
+            raise RequestError(400, "Request body must be JSON")
+        if not isinstance(body, dict):
+            raise RequestError(400, "Request body must be a JSON object")
+        return body
+
+
+app = AgentServer()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="CHRONOCHECK headless agent API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
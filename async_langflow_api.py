@@ -0,0 +1,429 @@
+# async_langflow_api.py - Async variant of CloudLangflowAPI
+"""
+Async Cloud Langflow API client
+Same public methods and result format as CloudLangflowAPI, built on one shared httpx.AsyncClient
+so a single event loop can multiplex many in-flight flow calls (FastAPI, batch jobs)
+"""
+
+import asyncio
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+import httpx
+
+from cloud_langflow_api import CloudLangflowAPI, _content_length
+from bill_engine import BillAuditor
+from hospital_index import phrase_prompt, hospital_query
+from lab_report import ReportParser, ABNORMAL_ONLY
+from translation import TranslationJob, failed_translation, restate_prompt
+from file_preprocessing import split_text_uploads, preprocess_images
+from multipart_stream import MultipartEncoder, UploadTooLarge, file_digest
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Failures of the httpx transport (the sync client catches requests.exceptions.RequestException)
+TRANSPORT_ERRORS = (httpx.HTTPError, httpx.InvalidURL)
+
+
+class AsyncCloudLangflowAPI(CloudLangflowAPI):
+    """
+    Reuses configuration, response cache, circuit breakers, retry policy, upload registry,
+    _handle_response, _extract_message and demo fallbacks from CloudLangflowAPI;
+    only the network path is async. Streaming is not supported here.
+    """
+    
+    def __init__(self, max_connections: int = 200, max_keepalive_connections: int = 50, secrets: Dict[str, Any] = None):
+        super().__init__(secrets)
+        
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        self._client = None
+        self._inflight_uploads = {}
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared async client, created on first use inside the running event loop"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self.limits, http2=HTTP2_AVAILABLE)
+        return self._client
+    
+    async def aclose(self):
+        """Close the async client (and the inherited sync resources)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.aclose()
+    
+    # ========== CALL PATH ==========
+    
+    async def _call_api(self, flow_key: str, input_value: str, files: List = None) -> Dict[str, Any]:
+        """Call Langflow cloud API, serving repeated requests from the response cache"""
+        
+        if flow_key not in self.endpoints:
+            return {"success": False, "error": f"Flow {flow_key} not found"}
+        
+        ttl = self.endpoints[flow_key].get("cache_ttl", 0)
+        if ttl <= 0:
+            return await self._call_with_breaker(flow_key, input_value, files)
+        
+        cache_key = await asyncio.to_thread(self.cache.make_key, flow_key, input_value, files)
+        cached = self.cache.get(flow_key, cache_key)
+        if cached is not None:
+            cached["cached"] = True
+            return cached
+        
+        result = await self._call_with_breaker(flow_key, input_value, files)
+        
+        # Only cache real answers, never demo fallbacks; the raw payload is not kept
+        if result.get("success"):
+            self.cache.set(cache_key, {k: v for k, v in result.items() if k != "raw"}, ttl)
+        
+        return result
+    
+    async def _call_with_breaker(self, flow_key: str, input_value: str, files: List = None) -> Dict[str, Any]:
+        """Run the flow unless its circuit is open, recording the outcome on the breaker and in metrics"""
+        
+        started = time.perf_counter()
+        breaker = self.breakers[flow_key]
+        permit = breaker.allow_request()
+        if permit is None:
+            result = {
+                "success": False,
+                "error": f"{self.endpoints[flow_key]['flow_name']} is temporarily unavailable (circuit open)",
+                "message": self._get_demo_response(flow_key, input_value, is_error=True),
+                "circuit_open": True
+            }
+            self.metrics.observe_call(flow_key, time.perf_counter() - started, result)
+            return result
+        
+        result = {"success": False}
+        try:
+            result = await self._call_flow(flow_key, input_value, files)
+            return result
+        finally:
+            # A refused upload never reached the flow, so it says nothing about the flow's health
+            # (but a half-open probe slot it took must be given back)
+            if result.get("upload_rejected"):
+                breaker.release(permit)
+            else:
+                breaker.record(permit, bool(result.get("success")))
+            self.metrics.observe_call(flow_key, time.perf_counter() - started, result)
+    
+    async def _call_flow(self, flow_key: str, input_value: str, files: List = None) -> Dict[str, Any]:
+        """Call Langflow cloud API"""
+        
+        input_value, files, tweaks = await self._prepare_inputs(flow_key, input_value, files)
+        return await self._run_flow(flow_key, input_value, files, tweaks)
+    
+    async def _prepare_inputs(self, flow_key: str, input_value: str, files: List = None):
+        """Async counterpart of CloudLangflowAPI._prepare_inputs (CPU work runs in threads)"""
+        
+        tweaks = None
+        
+        if files and self.extract_text_locally:
+            input_value, files = await asyncio.to_thread(split_text_uploads, input_value, files)
+        
+        if files and self.image_options is not None:
+            files = await asyncio.to_thread(preprocess_images, files, self.image_options)
+        
+        component = self.endpoints[flow_key].get("file_component")
+        if files and component:
+            paths = await asyncio.gather(*(self._upload_file(flow_key, file) for file in files))
+            
+            # Fall back to the multipart upload if any file could not be uploaded
+            if all(paths):
+                field = "files" if component.startswith("ChatInput") else "path"
+                tweaks = {component: {field: list(paths)}}
+                files = []
+        
+        return input_value, files, tweaks
+    
+    async def _upload_file(self, flow_key: str, file) -> Optional[str]:
+        """Upload a file once per content hash; concurrent callers share one upload"""
+        
+        key = (flow_key, file_digest(file))
+        
+        ref = self.uploads.lookup(key)
+        if ref is not None:
+            return ref
+        
+        pending = self._inflight_uploads.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._post_file(flow_key, file, key))
+            self._inflight_uploads[key] = pending
+            pending.add_done_callback(lambda _: self._inflight_uploads.pop(key, None))
+        
+        ref = await asyncio.shield(pending)
+        return ref
+    
+    async def _post_file(self, flow_key: str, file, key: Tuple) -> Optional[str]:
+        """POST a file to the flow's upload endpoint (streamed) and register the returned reference under key"""
+        
+        url = self._upload_url(flow_key)
+        
+        try:
+            body = MultipartEncoder([("file", (file.name, file, file.type or 'application/octet-stream'))],
+                                    self.max_request_bytes)
+        except UploadTooLarge:
+            return None
+        
+        headers = self.base_headers.copy()
+        headers.update(body.headers)
+        
+        self.metrics.observe_upload(flow_key, body.file_bytes)
+        try:
+            response = await self.client.post(
+                url,
+                content=body.async_content(),
+                headers=headers,
+                timeout=httpx.Timeout(120, connect=self.retry_policy.connect_timeout)
+            )
+            if response.status_code in (200, 201):
+                ref = response.json().get("file_path")
+                if ref:
+                    self.uploads.register(key, ref)
+                return ref
+        except (*TRANSPORT_ERRORS, ValueError):
+            pass
+        
+        return None
+    
+    async def _run_flow(self, flow_key: str, input_value: str, files: List = None, tweaks: Dict = None) -> Dict[str, Any]:
+        """Run a flow with already prepared inputs"""
+        
+        url = self.endpoints[flow_key]["url"]
+        
+        # If files are present, use multipart upload
+        if files:
+            return await self._call_api_with_files(url, input_value, files)
+        
+        try:
+            response = await self._post_with_retries(
+                url,
+                read_timeout=60,
+                json=self._build_payload(input_value, tweaks),
+                headers=self.base_headers
+            )
+        except TRANSPORT_ERRORS as e:
+            return {
+                "success": False,
+                "error": f"API call failed: {str(e)}",
+                "message": self._get_demo_response(flow_key, input_value, is_error=True)
+            }
+        
+        return self._handle_response(response, flow_key)
+    
+    async def _call_api_with_files(self, url: str, input_value: str, files: List) -> Dict[str, Any]:
+        """Call Langflow API with file uploads using multipart/form-data"""
+        
+        try:
+            body = self._build_multipart(input_value, files)
+        except UploadTooLarge as e:
+            return self._upload_rejected(e)
+        self.metrics.observe_upload(self.metrics.flow_for(url), body.file_bytes)
+        
+        # Prepare headers (multipart Content-Type with boundary, and the known length)
+        headers = self.base_headers.copy()
+        headers.update(body.headers)
+        
+        try:
+            response = await self._post_with_retries(
+                url,
+                read_timeout=120,
+                content=body.async_content(),
+                headers=headers
+            )
+        except TRANSPORT_ERRORS as e:
+            return {
+                "success": False,
+                "error": f"File upload failed: {str(e)}",
+                "message": self._get_demo_response("file_upload", input_value, is_error=True)
+            }
+        
+        return self._handle_response(response, "file_upload")
+    
+    async def _post_with_retries(self, url: str, read_timeout: float, **kwargs) -> httpx.Response:
+        """
+        POST under the shared retry policy
+        Returns the final response (possibly a non-200 one) or raises the last transport error
+        """
+        
+        policy = self.retry_policy
+        policy.budget.record_request()
+        flow = self.metrics.flow_for(url)
+        attempt = 0
+        
+        while True:
+            try:
+                response = await self.client.post(
+                    url,
+                    timeout=httpx.Timeout(read_timeout, connect=policy.connect_timeout),
+                    **kwargs
+                )
+            except TRANSPORT_ERRORS as e:
+                self.metrics.observe_status(flow, "transport_error")
+                delay = policy.delay_after_exception(e, attempt)
+                if delay is None:
+                    self.metrics.observe_attempts(flow, attempt + 1)
+                    raise
+            else:
+                self.metrics.observe_status(flow, response.status_code)
+                delay = policy.delay_after_response(response, attempt)
+                if delay is None:
+                    self.metrics.observe_attempts(flow, attempt + 1)
+                    self.metrics.observe_request_bytes(flow, _content_length(response.request))
+                    return response
+            
+            attempt += 1
+            await asyncio.sleep(delay)
+    
+    # ========== PUBLIC METHODS ==========
+    
+    async def qna_medical(self, question: str) -> Dict[str, Any]:
+        """Medical Q&A - text only"""
+        return await self._call_api("qna_agent", question)
+    
+    async def analyze_report(self, user_message: str, uploaded_files: List = None,
+                             analysis_type: str = None, language: str = None) -> Dict[str, Any]:
+        """Analyze medical report with optional file uploads"""
+        labs = None
+        if self.report_parser and uploaded_files:
+            labs = await asyncio.to_thread(self.report_parser.analyze_files, uploaded_files)
+        if labs is None:
+            return await self._call_api("report_analyzer", user_message, uploaded_files)
+        
+        if analysis_type == ABNORMAL_ONLY:
+            return await self.localize_result(self._local_lab_result(labs), "report_analyzer", language)
+        
+        result = await self._call_api("report_analyzer", ReportParser.summary_prompt(user_message, labs))
+        if not result.get("success"):
+            return self._local_lab_result(labs, flow_error=result.get("error"))
+        
+        result["lab_results"] = labs
+        return result
+    
+    async def explain_medicines(self, user_message: str, uploaded_files: List = None,
+                                check_interactions: bool = True) -> Dict[str, Any]:
+        """Explain medicines/prescription with optional file uploads"""
+        check = None
+        if self.interaction_checker:
+            check = await asyncio.to_thread(
+                self.interaction_checker.analyze_files, user_message, uploaded_files, check_interactions
+            )
+        if check is None:
+            return await self._call_api("prescription_analyzer", user_message, uploaded_files)
+        
+        result = await self._call_api("prescription_analyzer", self._medicine_prompt(user_message, check), uploaded_files)
+        result["medicine_check"] = check
+        return result
+    
+    async def analyze_bill(self, user_message: str, uploaded_files: List = None, quick_audit: bool = False,
+                           check_overcharges: bool = True, check_duplicates: bool = True,
+                           language: str = None) -> Dict[str, Any]:
+        """Analyze medical bill with optional file uploads"""
+        text = audit = None
+        if self.bill_auditor and uploaded_files and (check_overcharges or check_duplicates):
+            text = await asyncio.to_thread(self.bill_auditor.read_files, uploaded_files)
+        if text is not None:
+            audit = await asyncio.to_thread(self.bill_auditor.audit_text, text, check_overcharges, check_duplicates)
+        if audit is None:
+            return await self._call_api("bill_analyzer", user_message, uploaded_files)
+        
+        if quick_audit:
+            return await self.localize_result(self._local_audit_result(audit), "bill_analyzer", language)
+        
+        result = await self._call_api("bill_analyzer", BillAuditor.explain_prompt(user_message, audit, text))
+        return self._with_local_audit(result, audit)
+    
+    async def find_hospitals(self, query: str, location: str = "", specializations: List[str] = None,
+                             phrase: bool = False, language: str = None) -> Dict[str, Any]:
+        """Find hospitals - text only"""
+        full_query = hospital_query(query, location, specializations, language)
+        local = self.search_hospitals(query, location, specializations)
+        if local is None:
+            return await self._call_api("hospital_finder", full_query)
+        
+        if not phrase:
+            return local
+        
+        result = await self._call_api("hospital_finder", phrase_prompt(full_query, local["hospitals"]))
+        if not result.get("success"):
+            return dict(local, flow_error=result.get("error"))
+        
+        result["hospitals"] = local["hospitals"]
+        return result
+    
+    # ========== BILINGUAL DISPATCH ==========
+    
+    async def call_bilingual(self, method_name: str, message: str, english_message: str = None,
+                             *args, timeout: float = None, language: str = None,
+                             localized_options: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Run the selected-language and English calls concurrently; a failed leg keeps the other
+        In translate-once mode the English answer is translated instead (see CloudLangflowAPI)
+        localized_options are keyword arguments for the selected-language leg only
+        """
+        
+        method = getattr(self, method_name)
+        timeout = timeout or self.bilingual_timeout
+        
+        async def leg(name: str, leg_message: str, **options) -> Dict[str, Any]:
+            try:
+                return await asyncio.wait_for(method(leg_message, *args, **options), timeout)
+            except asyncio.TimeoutError:
+                return {"success": False, "error": f"{name.title()} request timed out after {timeout}s"}
+            except Exception as e:
+                return {"success": False, "error": f"{name.title()} request failed: {str(e)}"}
+        
+        if self.translate_once and language and english_message is not None:
+            english = await leg("english", english_message)
+            localized = await self.translate_result(english, language)
+            return {"success": english.get("success"), "localized": localized, "english": english}
+        
+        legs = [leg("localized", message, **(localized_options or {}))]
+        if english_message is not None:
+            legs.append(leg("english", english_message))
+        
+        outcomes = await asyncio.gather(*legs)
+        results = {"localized": outcomes[0], "english": outcomes[1] if len(outcomes) > 1 else None}
+        results["success"] = any(r and r.get("success") for r in outcomes)
+        return results
+    
+    async def localize_result(self, result: Dict[str, Any], flow_key: str, language: str = None) -> Dict[str, Any]:
+        """A locally built English result in language (see CloudLangflowAPI.localize_result)"""
+        if not language or language == "English" or not result.get("success"):
+            return result
+        
+        if self.translate_once:
+            localized = await self.translate_result(result, language)
+        else:
+            localized = await self._call_api(flow_key, restate_prompt(result["message"], language))
+        if not localized.get("success"):
+            return dict(result, flow_error=localized.get("error"))
+        return dict(result, message=localized["message"], translated=True)
+    
+    async def translate_result(self, english_result: Dict[str, Any], language: str) -> Dict[str, Any]:
+        """Translate a successful English result, sending only uncached segments"""
+        if not english_result.get("success"):
+            return english_result
+        
+        job = await asyncio.to_thread(TranslationJob, english_result["message"], language, self.translation_cache)
+        batches = job.batches()
+        for batch in batches:
+            reply = await self._call_api("translator", job.prompt(batch))
+            if not reply.get("success") or not job.apply(batch, reply["message"]):
+                return failed_translation(reply.get("error"))
+        
+        return job.result(english_result, calls=len(batches))
\ No newline at end of file
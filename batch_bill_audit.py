@@ -0,0 +1,254 @@
+# batch_bill_audit.py - Bulk bill auditing on top of CloudLangflowAPI.analyze_bill
+"""
+Batch Bill Auditor
+Runs many bills through analyze_bill with a bounded worker pool and rate limiting,
+appends each result to a JSONL file (which doubles as the resume checkpoint),
+and reports throughput and latency percentiles at the end
+
+Each record has a status: "ok", "partial" (the flow failed and only the local audit of a text
+bill is available; flow_error says why) or "failed". Only "ok" bills are skipped on resume.
+
+Usage:
+    python batch_bill_audit.py bills/ --output audit.jsonl --workers 8 --rate 120
+    python batch_bill_audit.py manifest.csv --output audit.jsonl --parquet audit.parquet
+"""
+
+import argparse
+import csv
+import json
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Iterable
+
+import numpy as np
+
+from file_preprocessing import ProcessedUpload
+
+
+BILL_EXTENSIONS = {".pdf", ".docx", ".txt", ".jpg", ".jpeg", ".png"}
+
+DEFAULT_MESSAGE = "Detailed Analysis | Check overcharges | Check duplicates"
+
+
+class RateLimiter:
+    """Space out call starts so at most `per_minute` calls begin per minute"""
+    
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        time.sleep(max(0.0, start - now))
+
+
+# ========== INPUTS ==========
+
+def load_bills(source: str) -> List[Dict[str, str]]:
+    """
+    Bills from a directory (recursive) or a manifest (.csv with a 'path' column, or .jsonl)
+    Each item is {"id", "path", "message"}; manifest rows may override the message
+    """
+    
+    items = []
+    
+    if os.path.isdir(source):
+        for root, _, names in os.walk(source):
+            for name in sorted(names):
+                if os.path.splitext(name)[1].lower() in BILL_EXTENSIONS:
+                    path = os.path.join(root, name)
+                    items.append({"id": os.path.relpath(path, source), "path": path, "message": None})
+        return sorted(items, key=lambda item: item["id"])
+    
+    base = os.path.dirname(os.path.abspath(source))
+    if source.endswith(".jsonl"):
+        with open(source, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(source, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    
+    for row in rows:
+        path = row["path"] if os.path.isabs(row["path"]) else os.path.join(base, row["path"])
+        items.append({"id": row.get("id") or row["path"], "path": path, "message": row.get("message") or None})
+    return items
+
+
+def load_checkpoint(output_path: str) -> set:
+    """IDs that already have a complete ("ok") result in the output file"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A torn last line from an interrupted run
+                continue
+            if record.get("status", "ok" if record.get("success") else "failed") == "ok":
+                done.add(record["id"])
+    return done
+
+
+# ========== RUN ==========
+
+def audit_one(api, item: Dict[str, str], message: str) -> Dict[str, Any]:
+    """Audit a single bill and build its result record"""
+    
+    with open(item["path"], "rb") as f:
+        data = f.read()
+    mime_type = mimetypes.guess_type(item["path"])[0] or "application/octet-stream"
+    upload = ProcessedUpload(data, os.path.basename(item["path"]), mime_type)
+    
+    started = time.perf_counter()
+    result = api.analyze_bill(item["message"] or message, [upload])
+    latency = time.perf_counter() - started
+    
+    # A flow failure on a text bill still returns success with the local findings as the report
+    flow_error = result.get("flow_error")
+    success = bool(result.get("success")) and not flow_error
+    
+    return {
+        "id": item["id"],
+        "path": item["path"],
+        "success": success,
+        "status": "ok" if success else "partial" if result.get("success") else "failed",
+        "message": result.get("message"),
+        "error": result.get("error") or flow_error,
+        "flow_error": flow_error,
+        "local_audit": result.get("local_audit"),
+        "latency_s": round(latency, 3),
+        "audited_at": datetime.now(timezone.utc).isoformat()
+    }
+
+
+def run_batch(api, items: Iterable[Dict[str, str]], output_path: str, workers: int = 4,
+              rate_per_minute: float = 60, message: str = DEFAULT_MESSAGE,
+              resume: bool = True, progress=None) -> Dict[str, Any]:
+    """
+    Audit bills concurrently, appending one JSON line per bill to output_path
+    With resume=True bills that already succeeded in output_path are skipped
+    Returns a summary with counts, throughput (bills/min) and p50/p95 latency
+    """
+    
+    done = load_checkpoint(output_path) if resume else set()
+    pending = [item for item in items if item["id"] not in done]
+    limiter = RateLimiter(rate_per_minute)
+    write_lock = threading.Lock()
+    
+    latencies = []
+    succeeded = partial = failed = 0
+    started = time.perf_counter()
+    
+    def task(item):
+        limiter.wait()
+        try:
+            return audit_one(api, item, message)
+        except Exception as e:
+            return {"id": item["id"], "path": item["path"], "success": False, "status": "failed",
+                    "message": None, "error": f"{type(e).__name__}: {e}", "flow_error": None,
+                    "local_audit": None, "latency_s": None,
+                    "audited_at": datetime.now(timezone.utc).isoformat()}
+    
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bill-audit") as pool:
+        futures = [pool.submit(task, item) for item in pending]
+        
+        for future in as_completed(futures):
+            record = future.result()
+            with write_lock:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+            
+            if record["status"] == "ok":
+                succeeded += 1
+            elif record["status"] == "partial":
+                partial += 1
+            else:
+                failed += 1
+            if record["latency_s"] is not None:
+                latencies.append(record["latency_s"])
+            if progress:
+                progress(succeeded + partial + failed, len(pending), record)
+    
+    elapsed = time.perf_counter() - started
+    processed = succeeded + partial + failed
+    
+    return {
+        "skipped_from_checkpoint": len(done),
+        "processed": processed,
+        "succeeded": succeeded,
+        "partial": partial,
+        "failed": failed,
+        "elapsed_s": round(elapsed, 2),
+        "bills_per_min": round(processed / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        "latency_p50_s": round(float(np.percentile(latencies, 50)), 3) if latencies else None,
+        "latency_p95_s": round(float(np.percentile(latencies, 95)), 3) if latencies else None
+    }
+
+
+def export_parquet(jsonl_path: str, parquet_path: str):
+    """Convert the JSONL results (latest record per bill) to Parquet (needs pyarrow or fastparquet)"""
+    import pandas as pd
+    
+    frame = pd.read_json(jsonl_path, lines=True)
+    frame = frame.drop_duplicates(subset="id", keep="last")
+    if "local_audit" in frame:
+        # Nested findings vary per bill; keep them as JSON text
+        frame["local_audit"] = frame["local_audit"].map(lambda audit: json.dumps(audit) if isinstance(audit, dict) else None)
+    frame.to_parquet(parquet_path, index=False)
+
+
+# ========== CLI ==========
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Audit many hospital bills with the Bill Analyzer flow")
+    parser.add_argument("source", help="Directory of bills, or a manifest (.csv with a 'path' column, or .jsonl)")
+    parser.add_argument("--output", default="bill_audit.jsonl", help="JSONL results file (also the checkpoint)")
+    parser.add_argument("--parquet", help="Also write the results to this Parquet file at the end")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent audits")
+    parser.add_argument("--rate", type=float, default=60, help="Max audits started per minute (0 = unlimited)")
+    parser.add_argument("--message", default=DEFAULT_MESSAGE, help="Audit instructions sent with each bill")
+    parser.add_argument("--no-resume", action="store_true", help="Start over instead of skipping completed bills")
+    args = parser.parse_args(argv)
+    
+    from cloud_langflow_api import CloudLangflowAPI
+    api = CloudLangflowAPI()
+    
+    items = load_bills(args.source)
+    
+    def progress(count, total, record):
+        status = {"ok": "ok", "partial": f"LOCAL AUDIT ONLY ({record['flow_error']})"}.get(
+            record["status"], f"FAILED ({record['error']})")
+        print(f"[{count}/{total}] {record['id']}: {status}", flush=True)
+    
+    summary = run_batch(
+        api, items, args.output,
+        workers=args.workers,
+        rate_per_minute=args.rate,
+        message=args.message,
+        resume=not args.no_resume,
+        progress=progress
+    )
+    
+    if args.parquet:
+        export_parquet(args.output, args.parquet)
+    
+    print(json.dumps(summary, indent=2))
+    api.close()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,285 @@
+# benchmark.py - Performance benchmarks for CloudLangflowAPI against the local Langflow stub
+"""
+Benchmark suite
+Runs scenarios (Q&A, file uploads of several sizes, bilingual double calls, a failure storm)
+through a fresh CloudLangflowAPI pointed at langflow_stub.StubServer, and reports throughput,
+p50/p95/p99 latency and process memory. Results can be saved as a JSON baseline and compared
+against a previous run to catch regressions between versions.
+
+Usage:
+    python benchmark.py --output bench_baseline.json
+    python benchmark.py --compare bench_baseline.json --tolerance 0.2
+    python benchmark.py --scenarios qna,bilingual --calls 100 --concurrency 16 --latency-ms 300
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Callable
+
+import numpy as np
+
+from file_preprocessing import ProcessedUpload
+from langflow_stub import StubServer
+
+
+# Relative change that counts as a regression when comparing with a baseline
+DEFAULT_TOLERANCE = 0.20
+
+# Interval of the background RSS sampler
+RSS_SAMPLE_SECONDS = 0.02
+
+
+def rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """Current resident set size of this process, or of pid, in MB (Linux), else this process's peak RSS so far"""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, IndexError):
+        pass
+    if pid is not None:
+        return None
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return None
+
+
+class RssSampler:
+    """Track peak RSS in a background thread while a scenario runs"""
+    
+    def __init__(self, interval: float = RSS_SAMPLE_SECONDS, pid: Optional[int] = None):
+        self.interval = interval
+        self.pid = pid
+        self.start_mb = self.peak_mb = rss_mb(pid)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            current = rss_mb(self.pid)
+            if current is not None and (self.peak_mb is None or current > self.peak_mb):
+                self.peak_mb = current
+    
+    def __enter__(self):
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_calls(calls: List[Callable[[], Dict[str, Any]]], concurrency: int) -> Dict[str, Any]:
+    """Run the calls on a thread pool; per-call wall time, success and fallback counts"""
+    
+    durations = [0.0] * len(calls)
+    outcomes = [None] * len(calls)
+    
+    def timed(index: int):
+        started = time.perf_counter()
+        try:
+            result = calls[index]()
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        durations[index] = time.perf_counter() - started
+        outcomes[index] = result
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(len(calls))))
+    elapsed = time.perf_counter() - started
+    
+    latencies = np.array(durations) * 1000
+    failed = sum(1 for r in outcomes if not r.get("success"))
+    return {
+        "calls": len(calls),
+        "failed": failed,
+        "fallbacks": sum(1 for r in outcomes if not r.get("success") and r.get("message")),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(calls) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies, 50)), 2),
+            "p95": round(float(np.percentile(latencies, 95)), 2),
+            "p99": round(float(np.percentile(latencies, 99)), 2),
+            "mean": round(float(latencies.mean()), 2)
+        }
+    }
+
+
+# ========== SCENARIOS ==========
+# Each scenario gets a fresh client and returns the calls to run; stub settings changed by a
+# scenario are restored after it
+
+def scenario_qna(api, stub: StubServer, calls: int) -> List[Callable]:
+    """Unique text questions (no cache hits)"""
+    return [lambda i=i: api.qna_medical(f"What does a fasting sugar of {90 + i} mg/dL mean? #{i}")
+            for i in range(calls)]
+
+
+def _upload_scenario(size: int) -> Callable:
+    def scenario(api, stub: StubServer, calls: int) -> List[Callable]:
+        """Report analysis with one binary upload per call (unique content, multipart)"""
+        payloads = [i.to_bytes(4, "big") + os.urandom(size - 4) for i in range(calls)]
+        return [lambda data=data: api.analyze_report(
+                    "Comprehensive Analysis", [ProcessedUpload(data, "scan.bin", "application/octet-stream")])
+                for data in payloads]
+    return scenario
+
+
+def scenario_bilingual(api, stub: StubServer, calls: int) -> List[Callable]:
+    """Selected-language and English legs per request, as the pages run them"""
+    return [lambda i=i: api.call_bilingual(
+                "qna_medical",
+                f"What causes anaemia? #{i}\n\nIMPORTANT: Provide the complete answer in Hindi language only.",
+                f"What causes anaemia? #{i}")
+            for i in range(calls)]
+
+
+def scenario_failure_storm(api, stub: StubServer, calls: int) -> List[Callable]:
+    """Every run fails with 503 (Retry-After 0.05s): retries, retry budget and circuit breaker"""
+    stub.configure("qna", error_rate=1.0, retry_after=0.05)
+    return [lambda i=i: api.qna_medical(f"Storm question #{i}") for i in range(calls)]
+
+
+SCENARIOS = {
+    "qna": scenario_qna,
+    "upload_100kb": _upload_scenario(100 * 1024),
+    "upload_1mb": _upload_scenario(1024 ** 2),
+    "upload_5mb": _upload_scenario(5 * 1024 ** 2),
+    "bilingual": scenario_bilingual,
+    "failure_storm": scenario_failure_storm
+}
+
+
+def run_scenario(name: str, stub: StubServer, calls: int, concurrency: int) -> Dict[str, Any]:
+    from cloud_langflow_api import CloudLangflowAPI
+    
+    api = CloudLangflowAPI(stub.secrets())
+    saved = dict(stub.settings)
+    stub.reset_stats()
+    try:
+        prepared = SCENARIOS[name](api, stub, calls)
+        with RssSampler() as memory:
+            result = run_calls(prepared, concurrency)
+    finally:
+        stub.reset_settings(**saved)
+        api.close()
+    
+    result["rss_mb"] = {
+        "start": round(memory.start_mb, 1) if memory.start_mb is not None else None,
+        "peak": round(memory.peak_mb, 1) if memory.peak_mb is not None else None
+    }
+    result["upstream"] = stub.stats()["requests"]
+    result["breakers"] = {flow: m["state"] for flow, m in api.circuit_metrics().items() if m["state"] != "closed"}
+    return result
+
+
+# ========== BASELINES ==========
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Regressions of current vs baseline: p95/p99 latency or peak RSS up, or throughput down, by more than tolerance"""
+    regressions = []
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        
+        checks = [
+            ("p95 latency", before["latency_ms"]["p95"], now["latency_ms"]["p95"], 1),
+            ("p99 latency", before["latency_ms"]["p99"], now["latency_ms"]["p99"], 1),
+            ("throughput", before["throughput_per_s"], now["throughput_per_s"], -1),
+            ("peak RSS", before["rss_mb"]["peak"], now["rss_mb"]["peak"], 1)
+        ]
+        for label, old, new, direction in checks:
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change * direction > tolerance:
+                regressions.append(f"{name}: {label} {old:g} -> {new:g} ({change:+.0%})")
+    return regressions
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"{'scenario':<15} {'calls':>6} {'failed':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'RSS MB':>8}")
+    for name, r in report["scenarios"].items():
+        latency = r["latency_ms"]
+        print(f"{name:<15} {r['calls']:>6} {r['failed']:>6} {r['throughput_per_s']:>8} "
+              f"{latency['p50']:>9} {latency['p95']:>9} {latency['p99']:>9} {r['rss_mb']['peak'] or '-':>8}")
+
+
+def run_benchmarks(scenarios: List[str], calls: int = 50, concurrency: int = 8, **stub_settings) -> Dict[str, Any]:
+    """Run the named scenarios against a fresh stub and return the report (baseline format)"""
+    stub_settings = dict({"latency_ms": 100.0, "jitter_ms": 20.0}, **stub_settings)
+    with StubServer(seed=0, **stub_settings) as stub:
+        results = {}
+        for name in scenarios:
+            results[name] = run_scenario(name, stub, calls, concurrency)
+    
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "settings": {"calls": calls, "concurrency": concurrency, "stub": stub_settings},
+        "scenarios": results
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark CloudLangflowAPI against a local Langflow stub")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated: {', '.join(SCENARIOS)}")
+    parser.add_argument("--calls", type=int, default=50, help="Calls per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent callers")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="Stub mean latency")
+    parser.add_argument("--response-chars", type=int, default=1500, help="Stub answer length")
+    parser.add_argument("--output", help="Write the results (baseline format) to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON to compare against; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed relative change")
+    args = parser.parse_args(argv)
+    
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenario(s): {', '.join(unknown)}")
+    
+    report = run_benchmarks(names, args.calls, args.concurrency,
+                            latency_ms=args.latency_ms, response_chars=args.response_chars)
+    print_report(report)
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            json.dump(report, out, indent=2)
+    
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("settings") != report["settings"]:
+            print(f"\nNote: settings differ from the baseline ({baseline.get('settings')}); results may not be comparable")
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegressions vs {args.compare} (revision {baseline.get('revision')}):")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print(f"\nNo regressions vs {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
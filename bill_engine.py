@@ -0,0 +1,552 @@
+# bill_engine.py - Local, deterministic bill audit against a reference price table
+"""
+Bill audit engine
+Parses bill line items into a pandas frame, matches them to a reference price table
+(exact normalized name, then fuzzy trigram match) and computes overcharges and duplicate
+charges with vectorized NumPy operations. The Bill Analyzer flow then only explains the
+flagged rows instead of reading the whole bill.
+
+Reference table CSV columns: item, price[, aliases]  (aliases separated by ';')
+"""
+
+import re
+from collections import Counter
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from file_preprocessing import extract_text
+
+
+# Starter reference prices (₹ per unit); load a real tariff with ReferencePriceIndex.from_csv
+DEFAULT_REFERENCE_PRICES = [
+    ("Complete Blood Count", 200, ["CBC", "Hemogram", "Complete Haemogram"]),
+    ("Ultrasound Abdomen", 850, ["USG Abdomen", "Sonography Abdomen"]),
+    ("Lipid Profile", 400, ["Lipid Panel"]),
+    ("Liver Function Test", 450, ["LFT"]),
+    ("Kidney Function Test", 450, ["KFT", "RFT", "Renal Function Test"]),
+    ("Thyroid Profile", 400, ["TFT", "T3 T4 TSH"]),
+    ("HbA1c", 350, ["Glycated Hemoglobin"]),
+    ("Blood Sugar Fasting", 60, ["FBS", "Fasting Blood Sugar"]),
+    ("Urine Routine", 100, ["Urine R/E", "Urine Analysis"]),
+    ("Chest X-Ray", 300, ["CXR", "X-Ray Chest PA"]),
+    ("ECG", 150, ["Electrocardiogram"]),
+    ("2D Echo", 1500, ["Echocardiography"]),
+    ("CT Scan Head", 2000, ["CT Brain"]),
+    ("MRI Brain", 5000, []),
+    ("Doctor Consultation", 500, ["Consultation Fee", "Consultant Visit"]),
+    ("General Ward Bed", 1500, ["Bed Charges General Ward", "Room Rent General Ward"]),
+    ("ICU Bed", 5000, ["ICU Charges", "ICU Room Rent"]),
+    ("Nursing Charges", 500, ["Nursing Care"]),
+    ("Paracetamol 500mg Tablet", 2, ["Tab Paracetamol 500mg"]),
+    ("Paracetamol 650mg Tablet", 2.5, ["Tab Paracetamol 650mg", "Dolo 650"]),
+    ("Normal Saline 500ml", 30, ["NS 500ml"]),
+    ("Injection Ceftriaxone 1g", 60, ["Inj Ceftriaxone 1g"])
+]
+
+# Words that carry no meaning for matching
+NOISE_WORDS = {"charge", "charges", "fee", "fees", "test", "the", "of", "for", "and", "with", "rs", "inr"}
+
+# Common bill abbreviations, expanded before matching
+ABBREVIATIONS = {"inj": "injection", "tab": "tablet", "tabs": "tablet", "cap": "capsule",
+                 "caps": "capsule", "syp": "syrup", "amp": "ampoule"}
+
+# Lines that are totals, taxes or payments rather than billable items
+SKIP_WORDS = {"total", "subtotal", "grand", "gst", "cgst", "sgst", "igst", "tax", "discount",
+              "due", "balance", "paid", "advance", "deposit", "payable", "words", "round", "rounding"}
+
+# Checks a bill audit can run, and how the prompt names them
+CHECKS = ("overcharges", "duplicates")
+CHECK_NAMES = {"overcharges": "overcharges", "duplicates": "duplicate charges"}
+
+# Unit price above reference * (1 + tolerance) is an overcharge
+DEFAULT_TOLERANCE = 0.10
+
+# Minimum trigram Dice similarity for a fuzzy name match
+MIN_MATCH_SCORE = 0.7
+
+# Largest whole number read as a quantity when it multiplies with a rate to the amount
+MAX_QUANTITY = 100
+
+_NUMBER = re.compile(r"^(?:₹|rs\.?|inr)?\s*(\d{1,3}(?:,\d{2,3})+(?:\.\d+)?|\d+(?:\.\d+)?)/?-?$", re.IGNORECASE)
+_DATE = re.compile(
+    r"\b(?:(\d{1,2})[/.-](\d{1,2})[/.-](\d{2,4})|(\d{4})-(\d{1,2})-(\d{1,2}))\b"
+)
+_SERIAL = re.compile(r"^\s*\d{1,3}[.)\-:]?\s+(?=[A-Za-z])")
+_CELL_SPLIT = re.compile(r"\s*\|\s*|\t+|\s{2,}")
+_PARENTHETICAL = re.compile(r"\([^)]*\)")
+_DOSE = re.compile(r"\b(\d+(?:\.\d+)?)\s+(mg|mcg|g|ml|iu)\b")
+
+# A number followed by one of these is a strength ("Inj Ceftriaxone 1 g"), not a quantity or price
+DOSE_UNITS = {"mg", "mcg", "g", "gm", "ml", "iu"}
+
+
+# ========== NORMALIZATION ==========
+
+def normalize_name(name: str) -> str:
+    """
+    Matching key for an item name: lowercase, punctuation and noise words removed,
+    abbreviations expanded, doses joined ("40 mg" -> "40mg"), parenthetical notes dropped,
+    tokens sorted so word order does not matter
+    """
+    text = name.lower().replace("&", " and ")
+    stripped = _PARENTHETICAL.sub(" ", text)
+    if re.search(r"[a-z0-9]", stripped):
+        text = stripped
+    text = _DOSE.sub(r"\1\2", text)
+    
+    tokens = [ABBREVIATIONS.get(token, token) for token in re.findall(r"\d+(?:\.\d+)?[a-z]*|[a-z0-9]+", text)]
+    tokens = [token for token in tokens if token not in NOISE_WORDS]
+    return " ".join(sorted(tokens))
+
+
+def _trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _parse_date(text: str) -> Tuple[Optional[str], str]:
+    """First date in text as ISO yyyy-mm-dd (day-first), and the text without it"""
+    match = _DATE.search(text)
+    if not match:
+        return None, text
+    
+    if match.group(4):
+        year, month, day = int(match.group(4)), int(match.group(5)), int(match.group(6))
+    else:
+        day, month, year = int(match.group(1)), int(match.group(2)), int(match.group(3))
+        if year < 100:
+            year += 2000
+    
+    # Join the text around the date with the wider of the two gaps, so a single-spaced line
+    # stays single-spaced and a column layout keeps its column break
+    before, after = text[:match.start()], text[match.end():]
+    gap = max(re.search(r"\s*$", before).group(), re.search(r"^\s*", after).group(), key=len)
+    rest = before.rstrip() + (gap if before.strip() and after.strip() else "") + after.lstrip()
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        return None, rest
+    return f"{year:04d}-{month:02d}-{day:02d}", rest
+
+
+def _parse_number(cell: str) -> Optional[float]:
+    match = _NUMBER.match(cell.strip())
+    if not match:
+        return None
+    return float(match.group(1).replace(",", ""))
+
+
+# ========== LINE ITEMS ==========
+
+def _parse_line(line: str) -> Optional[Dict[str, Any]]:
+    """One bill line -> {description, date, quantity, amount}, or None if it is not an item"""
+    
+    line = line.strip().strip("|").strip()
+    if not line or set(line) <= set("-|: "):
+        return None
+    
+    date, line = _parse_date(line)
+    line = _SERIAL.sub("", line)
+    
+    if _CELL_SPLIT.search(line):
+        cells = [cell for cell in _CELL_SPLIT.split(line) if cell]
+        # A leading S.No cell ("3 | Paracetamol 500mg Tablet | 10 | 5 | 50")
+        if len(cells) > 2 and re.fullmatch(r"\d{1,3}[.)]?", cells[0]) and _parse_number(cells[1]) is None:
+            cells = cells[1:]
+    else:
+        # Single-spaced text: the description runs up to the first standalone number that is
+        # not a strength
+        tokens = line.split()
+        split = next((
+            i for i, token in enumerate(tokens)
+            if _parse_number(token) is not None
+            and not (i + 1 < len(tokens) and tokens[i + 1].lower().strip(".,") in DOSE_UNITS)
+        ), len(tokens))
+        cells = [" ".join(tokens[:split])] + tokens[split:]
+    
+    description = None
+    numbers = []
+    for cell in cells:
+        value = _parse_number(cell)
+        if value is not None:
+            numbers.append(value)
+        elif description is None and re.search(r"[A-Za-z]{2,}", cell):
+            description = cell
+    
+    if description is None or not numbers:
+        return None
+    
+    words = set(re.split(r"[^a-z]+", description.lower()))
+    if words & SKIP_WORDS:
+        return None
+    
+    amount = numbers[-1]
+    quantity = _quantity(numbers[:-1], amount)
+    
+    return {"description": description.strip(" :-"), "date": date, "quantity": quantity, "amount": amount}
+
+
+def _plausible_quantity(value: float) -> bool:
+    return value.is_integer() and 0 < value <= MAX_QUANTITY
+
+
+def _quantity(numbers: List[float], amount: float) -> float:
+    """
+    Quantity among the numbers before the amount
+    Two adjacent numbers whose product is the amount are quantity and rate (quantity first
+    unless only the second is a plausible count); a lone number is a rate when amount / rate
+    is a small count, else a count itself; otherwise the first small whole number, else 1
+    """
+    for first, second in reversed(list(zip(numbers, numbers[1:]))):
+        if amount and abs(first * second - amount) <= 0.01 * amount:
+            if _plausible_quantity(first) or not _plausible_quantity(second):
+                return first
+            return second
+    
+    if len(numbers) == 1 and numbers[0]:
+        ratio = amount / numbers[0]
+        if 1 <= ratio <= 50 and abs(ratio - round(ratio)) < 0.01:
+            return float(round(ratio))
+    
+    return next((value for value in numbers if _plausible_quantity(value) and value <= 50), 1.0)
+
+
+def parse_line_items(text: str) -> pd.DataFrame:
+    """Bill text -> frame with description, name_key, date, quantity, amount, line"""
+    
+    rows = []
+    for number, line in enumerate(text.splitlines(), start=1):
+        item = _parse_line(line)
+        if item is not None:
+            item["line"] = number
+            rows.append(item)
+    
+    frame = pd.DataFrame(rows, columns=["description", "date", "quantity", "amount", "line"])
+    frame.insert(1, "name_key", frame["description"].map(normalize_name))
+    return frame.astype({"quantity": float, "amount": float})
+
+
+# ========== REFERENCE PRICES ==========
+
+class ReferencePriceIndex:
+    """Reference price table indexed by normalized name, with a trigram index for fuzzy matches"""
+    
+    def __init__(self, table: pd.DataFrame, min_score: float = MIN_MATCH_SCORE):
+        self.table = table.reset_index(drop=True)
+        self.prices = self.table["price"].to_numpy(dtype=float)
+        self.min_score = min_score
+        
+        self._exact = {}
+        self._keys = []            # (trigram set, table row) per indexed name
+        self._grams = {}           # trigram -> positions in self._keys
+        self._memo = {}
+        
+        aliases = self.table["aliases"] if "aliases" in self.table else [""] * len(self.table)
+        for row, (item, alias_text) in enumerate(zip(self.table["item"], aliases)):
+            names = [item] + [a for a in str(alias_text or "").split(";") if a.strip()]
+            for name in names:
+                key = normalize_name(name)
+                if not key or key in self._exact:
+                    continue
+                self._exact[key] = row
+                grams = _trigrams(key)
+                for gram in grams:
+                    self._grams.setdefault(gram, []).append(len(self._keys))
+                self._keys.append((grams, row))
+    
+    @classmethod
+    def default(cls) -> "ReferencePriceIndex":
+        table = pd.DataFrame(
+            [(item, price, ";".join(aliases)) for item, price, aliases in DEFAULT_REFERENCE_PRICES],
+            columns=["item", "price", "aliases"]
+        )
+        return cls(table)
+    
+    @classmethod
+    def from_csv(cls, path: str) -> "ReferencePriceIndex":
+        table = pd.read_csv(path, dtype={"item": str, "aliases": str})
+        return cls(table.dropna(subset=["item", "price"]))
+    
+    def match(self, key: str) -> Tuple[int, float]:
+        """(table row, score) for a normalized name; row -1 when nothing is close enough"""
+        
+        if key in self._memo:
+            return self._memo[key]
+        
+        if key in self._exact:
+            result = (self._exact[key], 1.0)
+        else:
+            grams = _trigrams(key)
+            overlap = Counter(position for gram in grams for position in self._grams.get(gram, ()))
+            result = (-1, 0.0)
+            for position, shared in overlap.most_common(10):
+                key_grams, row = self._keys[position]
+                score = 2 * shared / (len(grams) + len(key_grams))
+                if score > result[1]:
+                    result = (row, score)
+            if result[1] < self.min_score:
+                result = (-1, result[1])
+        
+        self._memo[key] = result
+        return result
+    
+    def match_many(self, keys: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and scores for many keys; each distinct key is matched once"""
+        codes, uniques = pd.factorize(keys)
+        matches = np.array([self.match(key) for key in uniques], dtype=float).reshape(-1, 2)
+        return matches[codes, 0].astype(int), matches[codes, 1]
+
+
+# ========== DUPLICATE CHARGES ==========
+
+# Minimum trigram similarity for two differently worded lines to be the same charge
+NEAR_DUPLICATE_SCORE = 0.75
+
+
+def _dice(a: str, b: str) -> float:
+    grams_a, grams_b = _trigrams(a), _trigrams(b)
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+def find_duplicates(items: pd.DataFrame, reference_rows: np.ndarray = None,
+                    min_similarity: float = NEAR_DUPLICATE_SCORE) -> pd.DataFrame:
+    """
+    Flag repeated charges among parsed line items (the first occurrence is not flagged)
+    
+    Exact duplicates share a hash of normalized description, date and amount.
+    Near duplicates are found within blocks of lines with the same date and amount:
+    two lines match if their names are similar or map to the same reference item
+    (e.g. "CBC" and "Complete Blood Count (CBC)"). Blocks are tiny, so the cost stays
+    linear in the number of lines.
+    
+    Returns a frame aligned with items: duplicate, duplicate_kind ("exact"/"near"), duplicate_of (line)
+    """
+    
+    count = len(items)
+    lines = items["line"].to_numpy()
+    names = items["name_key"].to_numpy()
+    if reference_rows is None:
+        reference_rows = np.full(count, -1)
+    
+    exact_hash = pd.util.hash_pandas_object(
+        items[["name_key", "date", "amount"]].fillna({"date": ""}), index=False
+    ).to_numpy()
+    exact = pd.Series(exact_hash).duplicated().to_numpy()
+    first_line = pd.Series(lines).groupby(exact_hash).transform("first").to_numpy()
+    
+    duplicate = exact.copy()
+    kind = np.where(exact, "exact", None).astype(object)
+    duplicate_of = np.where(exact, first_line, -1)
+    
+    # Near-duplicate candidates: non-exact lines whose (date, amount) block has other lines
+    block = pd.util.hash_pandas_object(items[["date", "amount"]].fillna({"date": ""}), index=False).to_numpy()
+    candidates = np.flatnonzero(pd.Series(block).duplicated(keep=False).to_numpy() & ~exact)
+    
+    for _, group in pd.Series(candidates).groupby(block[candidates]):
+        originals = []
+        for position in group.to_numpy():
+            original = next((
+                kept for kept in originals
+                if (reference_rows[kept] >= 0 and reference_rows[kept] == reference_rows[position])
+                or _dice(names[kept], names[position]) >= min_similarity
+            ), None)
+            if original is None:
+                originals.append(position)
+            else:
+                duplicate[position] = True
+                kind[position] = "near"
+                duplicate_of[position] = lines[original]
+    
+    return pd.DataFrame({
+        "duplicate": duplicate,
+        "duplicate_kind": kind,
+        "duplicate_of": pd.Series(duplicate_of, index=items.index, dtype="Int64").where(duplicate)
+    }, index=items.index)
+
+
+# ========== AUDIT ==========
+
+def audit_line_items(items: pd.DataFrame, index: ReferencePriceIndex,
+                     tolerance: float = DEFAULT_TOLERANCE, overcharges: bool = True,
+                     duplicates: bool = True) -> pd.DataFrame:
+    """
+    Add reference prices, overcharges and duplicate flags to parsed line items
+    Duplicates come from find_duplicates (the first occurrence is not flagged); a check
+    that is turned off flags nothing
+    """
+    
+    audit = items.copy()
+    rows, scores = index.match_many(audit["name_key"])
+    matched = rows >= 0
+    
+    quantity = np.maximum(audit["quantity"].to_numpy(), 1.0)
+    amount = audit["amount"].to_numpy()
+    unit_price = amount / quantity
+    reference = np.where(matched, index.prices[np.maximum(rows, 0)], np.nan)
+    
+    with np.errstate(invalid="ignore", divide="ignore"):
+        excess = np.where(matched, np.maximum(unit_price - reference, 0.0) * quantity, 0.0)
+        overcharged = matched & (unit_price > reference * (1 + tolerance)) & overcharges
+        pct = np.where(overcharged, (unit_price - reference) / reference * 100, 0.0)
+    
+    # A duplicate's whole amount is counted as a duplicate charge, not also as an overcharge
+    if duplicates:
+        duplicates = find_duplicates(audit, rows)
+    else:
+        duplicates = pd.DataFrame({"duplicate": False, "duplicate_kind": None, "duplicate_of": -1}, index=audit.index)
+    duplicate = duplicates["duplicate"].to_numpy()
+    
+    audit["reference_item"] = np.where(matched, index.table["item"].to_numpy()[np.maximum(rows, 0)], None)
+    audit["reference_price"] = reference
+    audit["match_score"] = scores.round(3)
+    audit["overcharge"] = np.where(overcharged & ~duplicate, excess, 0.0).round(2)
+    audit["overcharge_pct"] = pct.round(2)
+    audit["overcharged"] = overcharged
+    audit["duplicate"] = duplicate
+    audit["duplicate_kind"] = duplicates["duplicate_kind"]
+    audit["duplicate_of"] = duplicates["duplicate_of"]
+    audit["flagged"] = audit["overcharged"] | audit["duplicate"]
+    return audit
+
+
+def _rupees(value: float) -> str:
+    return f"₹{value:,.2f}"
+
+
+def summarize_audit(audit: pd.DataFrame, checks: List[str] = CHECKS) -> Dict[str, Any]:
+    """JSON-friendly summary of an audited frame, with flagged rows as records"""
+    
+    flagged = audit[audit["flagged"]]
+    columns = ["description", "date", "quantity", "amount", "reference_item", "reference_price",
+               "overcharge", "overcharge_pct", "overcharged", "duplicate", "duplicate_kind", "duplicate_of", "line"]
+    findings = flagged[columns].astype(object).where(flagged[columns].notna(), None).to_dict("records")
+    
+    # Items without a reference price; the flow reviews these itself
+    unmatched = audit[audit["reference_item"].isna()]
+    columns = ["description", "date", "quantity", "amount", "line"]
+    unmatched_items = unmatched[columns].astype(object).where(unmatched[columns].notna(), None).to_dict("records")
+    
+    return {
+        "line_items": int(len(audit)),
+        "matched_items": int(audit["reference_item"].notna().sum()),
+        "flagged_items": int(len(flagged)),
+        "total_billed": float(audit["amount"].sum()),
+        "total_overcharge": float(audit["overcharge"].sum()),
+        "duplicate_amount": float(audit.loc[audit["duplicate"], "amount"].sum()),
+        "findings": findings,
+        "unmatched": unmatched_items,
+        "checks": list(checks)
+    }
+
+
+def format_findings(summary: Dict[str, Any]) -> str:
+    """Markdown table of the flagged rows in the same layout as the Bill Analyzer report"""
+    
+    lines = [
+        "| Bill Item | Billed Price (₹) | Standard/Ref Price (₹) | Potential Overcharge (₹) | Finding |",
+        "|-----------|------------------|------------------------|--------------------------|---------|"
+    ]
+    for row in summary["findings"]:
+        notes = []
+        if row["overcharged"]:
+            notes.append(f"Overcharged by {row['overcharge_pct']:.2f}%")
+        if row["duplicate"]:
+            near = " (near match)" if row["duplicate_kind"] == "near" else ""
+            notes.append(f"Duplicate of line {row['duplicate_of']}{near}")
+        reference = _rupees(row["reference_price"]) if row["reference_price"] is not None else "Not found"
+        overcharge = row["amount"] if row["duplicate"] else row["overcharge"]
+        lines.append(
+            f"| {row['description']} | {_rupees(row['amount'])} | {reference} | "
+            f"**{_rupees(overcharge)}** | {'; '.join(notes)} |"
+        )
+    
+    lines.append("")
+    lines.append(f"**Total Potential Overcharge: {_rupees(summary['total_overcharge'])}**")
+    if summary["duplicate_amount"]:
+        lines.append(f"**Duplicate Charges: {_rupees(summary['duplicate_amount'])}**")
+        lines.append(f"**Total Potential Savings: {_rupees(summary['total_overcharge'] + summary['duplicate_amount'])}**")
+    unmatched = summary["line_items"] - summary["matched_items"]
+    if unmatched:
+        lines.append(f"{unmatched} of {summary['line_items']} items have no reference price and were not audited.")
+    return "\n".join(lines)
+
+
+class BillAuditor:
+    """Runs the local audit over uploaded bill files"""
+    
+    def __init__(self, index: ReferencePriceIndex = None, tolerance: float = DEFAULT_TOLERANCE):
+        self.index = index or ReferencePriceIndex.default()
+        self.tolerance = tolerance
+    
+    @classmethod
+    def from_path(cls, path: Optional[str] = None, tolerance: float = DEFAULT_TOLERANCE) -> "BillAuditor":
+        """Auditor over a reference CSV, or the built-in starter table when path is empty"""
+        index = ReferencePriceIndex.from_csv(path) if path else ReferencePriceIndex.default()
+        return cls(index, tolerance)
+    
+    def audit_text(self, text: str, overcharges: bool = True, duplicates: bool = True) -> Optional[Dict[str, Any]]:
+        """Summary for bill text with the selected checks, or None when no line items could be parsed"""
+        items = parse_line_items(text)
+        if items.empty:
+            return None
+        checks = [check for check, on in zip(CHECKS, (overcharges, duplicates)) if on]
+        return summarize_audit(audit_line_items(items, self.index, self.tolerance, overcharges, duplicates), checks)
+    
+    @staticmethod
+    def read_files(files: List) -> Optional[str]:
+        """
+        Text of all uploaded bills, or None unless every file has a text layer
+        (photos and scanned PDFs still go to the flow as files)
+        """
+        if not files:
+            return None
+        
+        texts = []
+        for file in files:
+            text = extract_text(file)
+            if text is None:
+                return None
+            texts.append(text)
+        return "\n".join(texts)
+    
+    def audit_files(self, files: List, overcharges: bool = True, duplicates: bool = True) -> Optional[Dict[str, Any]]:
+        """Summary over all uploaded bills, or None unless every file has a text layer"""
+        text = self.read_files(files)
+        return self.audit_text(text, overcharges, duplicates) if text is not None else None
+    
+    @staticmethod
+    def explain_prompt(user_message: str, summary: Dict[str, Any], bill_text: Optional[str] = None) -> str:
+        """
+        Flow input with the locally checked findings, the items the reference list does not
+        cover, and the bill itself; the flow audits everything it was not given a price for
+        """
+        
+        checked = " or ".join(CHECK_NAMES[check] for check in summary["checks"])
+        if not summary["checks"]:
+            findings = "No checks were requested."
+        elif summary["flagged_items"]:
+            findings = format_findings(summary)
+        else:
+            findings = f"No {checked} were found in {summary['matched_items']} items with a reference price."
+        
+        prompt = (
+            f"{user_message}\n\n"
+            f"The bill has {summary['line_items']} line items totalling {_rupees(summary['total_billed'])}. "
+            f"{summary['matched_items']} of them were checked automatically against a reference price "
+            f"list. The matching and quantity reading can be wrong, so present these as items to "
+            f"verify, not as confirmed billing errors:\n\n"
+            f"{findings}"
+        )
+        if summary["unmatched"]:
+            items = "\n".join(
+                f"- {row['description']}: {_rupees(row['amount'])} (quantity {row['quantity']:g})"
+                for row in summary["unmatched"]
+            )
+            if summary["checks"]:
+                prompt += (f"\n\nThese items have no reference price and were not checked. Review them "
+                           f"yourself for {checked}:\n{items}")
+        if bill_text:
+            prompt += f"\n\nFull bill text:\n{bill_text}"
+        
+        return prompt + ("\n\nExplain the findings for the patient and what to ask the hospital "
+                         "billing desk.")
\ No newline at end of file
@@ -0,0 +1,204 @@
+# call_metrics.py - Latency and outcome instrumentation for Langflow calls
+"""
+Call metrics for CloudLangflowAPI
+Per-flow latency histograms, call outcomes (including demo fallbacks), HTTP attempts and
+status codes, request and upload sizes, and time spent in _extract_message.
+Exported as a snapshot dict for the admin page and in Prometheus text format.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Optional, Dict, Any, List, Tuple
+
+
+# Histogram bucket upper bounds (Prometheus "le"); +Inf is implicit
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+EXTRACT_BUCKETS = (1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05)
+ATTEMPT_BUCKETS = (1, 2, 3, 5, 10)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 5 * 1024 ** 2, 20 * 1024 ** 2, 50 * 1024 ** 2)
+
+# Outcome of one _call_with_breaker call
+SUCCESS = "success"
+FALLBACK = "fallback"           # failed; the demo response was served
+CIRCUIT_OPEN = "circuit_open"   # not sent upstream; the demo response was served
+ERROR = "error"                 # failed without a demo response
+
+
+class Histogram:
+    """Cumulative-bucket histogram with sum and count"""
+    
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate by linear interpolation inside the bucket (the +Inf bucket reports its lower bound)"""
+        if not self.count:
+            return None
+        
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                if i == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+    
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, cumulative count) pairs including +Inf"""
+        pairs, total = [], 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            pairs.append((bound if bound == "+Inf" else f"{bound:g}", total))
+        return pairs
+
+
+class CallMetrics:
+    """Thread-safe metrics registry shared by every call of one client"""
+    
+    def __init__(self, endpoints: Dict[str, Dict[str, Any]] = None):
+        self._lock = threading.Lock()
+        self._flow_by_url = {}
+        self.reset()
+        if endpoints:
+            self.register_flows(endpoints)
+    
+    def register_flows(self, endpoints: Dict[str, Dict[str, Any]]):
+        """Map flow URLs to flow keys, so HTTP-level hooks can label by flow"""
+        self._flow_by_url.update({ep["url"]: flow_key for flow_key, ep in endpoints.items()})
+    
+    def flow_for(self, url, default: str = "unknown") -> str:
+        """Flow key for a run URL (query string ignored)"""
+        return self._flow_by_url.get(str(url).split("?", 1)[0], default)
+    
+    def reset(self):
+        with self._lock:
+            self.latency = {}
+            self.extract = {}
+            self.attempts = {}
+            self.request_bytes = {}
+            self.upload_bytes = {}
+            self.outcomes = Counter()       # (flow, outcome)
+            self.status_codes = Counter()   # (flow, code or "transport_error")
+            self.started_at = time.time()
+    
+    def _observe(self, table: Dict[str, Histogram], buckets: Tuple[float, ...], flow: str, value: float):
+        with self._lock:
+            histogram = table.get(flow)
+            if histogram is None:
+                histogram = table[flow] = Histogram(buckets)
+            histogram.observe(value)
+    
+    # ========== HOOKS ==========
+    
+    def observe_call(self, flow: str, seconds: float, result: Dict[str, Any]):
+        """One flow call (time to result; for streams, time until the stream opened)"""
+        if result.get("success"):
+            outcome = SUCCESS
+        elif result.get("circuit_open"):
+            outcome = CIRCUIT_OPEN
+        elif result.get("message"):
+            outcome = FALLBACK
+        else:
+            outcome = ERROR
+        
+        self._observe(self.latency, LATENCY_BUCKETS, flow, seconds)
+        with self._lock:
+            self.outcomes[(flow, outcome)] += 1
+    
+    def observe_attempts(self, flow: str, attempts: int):
+        self._observe(self.attempts, ATTEMPT_BUCKETS, flow, attempts)
+    
+    def observe_status(self, flow: str, code):
+        with self._lock:
+            self.status_codes[(flow, str(code))] += 1
+    
+    def observe_request_bytes(self, flow: str, size: Optional[int]):
+        if size is not None:
+            self._observe(self.request_bytes, SIZE_BUCKETS, flow, size)
+    
+    def observe_upload(self, flow: str, size: int):
+        self._observe(self.upload_bytes, SIZE_BUCKETS, flow, size)
+    
+    def observe_extract(self, flow: str, seconds: float):
+        self._observe(self.extract, EXTRACT_BUCKETS, flow, seconds)
+    
+    # ========== EXPORT ==========
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per-flow summary for the admin page"""
+        with self._lock:
+            flows = sorted(set(self.latency) | {flow for flow, _ in self.outcomes})
+            summary = {}
+            for flow in flows:
+                latency = self.latency.get(flow)
+                attempts = self.attempts.get(flow)
+                request_bytes = self.request_bytes.get(flow)
+                upload_bytes = self.upload_bytes.get(flow)
+                extract = self.extract.get(flow)
+                summary[flow] = {
+                    "calls": latency.count if latency else 0,
+                    "success": self.outcomes[(flow, SUCCESS)],
+                    "fallbacks": self.outcomes[(flow, FALLBACK)] + self.outcomes[(flow, CIRCUIT_OPEN)],
+                    "errors": self.outcomes[(flow, ERROR)],
+                    "latency_p50_s": latency.quantile(0.5) if latency else None,
+                    "latency_p95_s": latency.quantile(0.95) if latency else None,
+                    "latency_mean_s": latency.sum / latency.count if latency and latency.count else None,
+                    "attempts_mean": attempts.sum / attempts.count if attempts else None,
+                    "status_codes": {code: n for (f, code), n in self.status_codes.items() if f == flow},
+                    "request_kb_mean": request_bytes.sum / request_bytes.count / 1024 if request_bytes else None,
+                    "upload_kb_total": upload_bytes.sum / 1024 if upload_bytes else 0.0,
+                    "extract_ms_mean": extract.sum / extract.count * 1000 if extract else None
+                }
+            return summary
+    
+    def prometheus(self, prefix: str = "chronocheck") -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        
+        def histogram(name: str, help_text: str, table: Dict[str, Histogram]):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for flow, h in sorted(table.items()):
+                for le, count in h.cumulative():
+                    lines.append(f'{prefix}_{name}_bucket{{flow="{flow}",le="{le}"}} {count}')
+                lines.append(f'{prefix}_{name}_sum{{flow="{flow}"}} {h.sum:.6g}')
+                lines.append(f'{prefix}_{name}_count{{flow="{flow}"}} {h.count}')
+        
+        with self._lock:
+            histogram("flow_latency_seconds", "Flow call latency, including retries", self.latency)
+            
+            lines.append(f"# HELP {prefix}_flow_calls_total Flow calls by outcome")
+            lines.append(f"# TYPE {prefix}_flow_calls_total counter")
+            for (flow, outcome), count in sorted(self.outcomes.items()):
+                lines.append(f'{prefix}_flow_calls_total{{flow="{flow}",outcome="{outcome}"}} {count}')
+            
+            lines.append(f"# HELP {prefix}_flow_fallbacks_total Calls answered with the demo fallback")
+            lines.append(f"# TYPE {prefix}_flow_fallbacks_total counter")
+            for flow in sorted({flow for flow, _ in self.outcomes}):
+                count = self.outcomes[(flow, FALLBACK)] + self.outcomes[(flow, CIRCUIT_OPEN)]
+                lines.append(f'{prefix}_flow_fallbacks_total{{flow="{flow}"}} {count}')
+            
+            lines.append(f"# HELP {prefix}_flow_http_responses_total HTTP attempts by status code")
+            lines.append(f"# TYPE {prefix}_flow_http_responses_total counter")
+            for (flow, code), count in sorted(self.status_codes.items()):
+                lines.append(f'{prefix}_flow_http_responses_total{{flow="{flow}",code="{code}"}} {count}')
+            
+            histogram("flow_attempts", "HTTP attempts per run request", self.attempts)
+            histogram("flow_request_bytes", "Run request body size", self.request_bytes)
+            histogram("flow_upload_bytes", "File bytes uploaded per request", self.upload_bytes)
+            histogram("extract_message_seconds", "Time spent in _extract_message", self.extract)
+        
+        return "\n".join(lines) + "\n"
\ No newline at end of file
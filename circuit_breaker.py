@@ -0,0 +1,130 @@
+# circuit_breaker.py - Per-flow circuit breaker for Langflow calls
+"""
+Circuit breaker for CloudLangflowAPI
+Closed -> open on consecutive failures or a high error rate; open calls get the demo
+fallback immediately; after a cool-down a single half-open probe decides whether to close
+
+allow_request() hands out a Permit stamped with the breaker's generation (bumped on every
+transition). Outcomes are recorded against their permit, so a slow call let through before
+the circuit opened cannot count as the half-open probe or release its slot.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, NamedTuple, Optional
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class Permit(NamedTuple):
+    """A call allow_request() let through; pass it back to record() or release()"""
+    generation: int
+    probe: bool
+
+
+class CircuitBreaker:
+    
+    def __init__(self, name: str, failure_threshold: int = 5, error_rate_threshold: float = 0.5,
+                 window_size: int = 20, min_calls: int = 10, open_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._outcomes = deque(maxlen=window_size)   # True = success
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._generation = 0
+        self._lock = threading.Lock()
+        
+        self.short_circuited = 0
+        self.transitions = deque(maxlen=50)          # (timestamp, from_state, to_state)
+        self.transition_counts = {}
+    
+    def _transition(self, new_state: str):
+        """Change state and record the transition (lock held)"""
+        if new_state == self.state:
+            return
+        key = f"{self.state}->{new_state}"
+        self.transition_counts[key] = self.transition_counts.get(key, 0) + 1
+        self.transitions.append((time.time(), self.state, new_state))
+        self.state = new_state
+        self._generation += 1
+        
+        if new_state == OPEN:
+            self._opened_at = time.monotonic()
+        elif new_state == CLOSED:
+            self.consecutive_failures = 0
+            self._outcomes.clear()
+    
+    def allow_request(self) -> Optional[Permit]:
+        """A Permit if the call may go upstream; None means serve the fallback now"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+            
+            if self.state == CLOSED:
+                return Permit(self._generation, probe=False)
+            
+            # Half-open lets exactly one probe through at a time
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return Permit(self._generation, probe=True)
+            
+            self.short_circuited += 1
+            return None
+    
+    def _is_probe(self, permit: Permit) -> bool:
+        """True if permit is the probe of the current half-open period (lock held)"""
+        return permit.probe and self.state == HALF_OPEN and permit.generation == self._generation
+    
+    def record(self, permit: Permit, success: bool):
+        """Record the outcome of a call that allow_request() let through"""
+        with self._lock:
+            if self._is_probe(permit):
+                self._probe_in_flight = False
+                self._transition(CLOSED if success else OPEN)
+                return
+            
+            # A call from before the last transition says nothing about the current state
+            if permit.probe or permit.generation != self._generation:
+                return
+            
+            self._outcomes.append(success)
+            self.consecutive_failures = 0 if success else self.consecutive_failures + 1
+            
+            if self.state == CLOSED and (
+                self.consecutive_failures >= self.failure_threshold
+                or (len(self._outcomes) >= self.min_calls and self.error_rate() >= self.error_rate_threshold)
+            ):
+                self._transition(OPEN)
+    
+    def release(self, permit: Permit):
+        """Give back a call that allow_request() let through but that never reached the flow"""
+        with self._lock:
+            if self._is_probe(permit):
+                self._probe_in_flight = False
+    
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state and counters for metrics"""
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "error_rate": round(self.error_rate(), 3),
+                "short_circuited": self.short_circuited,
+                "transition_counts": dict(self.transition_counts),
+                "recent_transitions": list(self.transitions)[-10:]
+            }
\ No newline at end of file
@@ -8,41 +8,107 @@ import requests
 import json
 import uuid
 import time
+import threading
 import streamlit as st
-from typing import Optional, Dict, Any, List
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import partial
+from typing import Optional, Dict, Any, List, Iterator
+
+from response_cache import ResponseCache
+from file_preprocessing import split_text_uploads, preprocess_images, DEFAULT_IMAGE_OPTIONS
+from upload_registry import UploadRegistry
+from retry_policy import RetryPolicy
+from circuit_breaker import CircuitBreaker
+from bill_engine import BillAuditor, format_findings
+from hospital_index import HospitalIndex, format_hospitals, phrase_prompt, hospital_query
+from drug_interactions import InteractionChecker, format_interactions
+from lab_report import ReportParser, format_results, ABNORMAL_ONLY
+from translation import TranslationJob, failed_translation, restate_prompt
+from call_metrics import CallMetrics
+from message_extraction import MessageExtractor, loads, dumps_indented
+from raw_responses import RawResponseStore
+from multipart_stream import MultipartEncoder, UploadTooLarge, file_digest, DEFAULT_MAX_REQUEST_BYTES
+
+
+def _content_length(request) -> Optional[int]:
+    """Body size of a sent request (requests or httpx), from its Content-Length header"""
+    length = request.headers.get("Content-Length") if request is not None else None
+    return int(length) if length else None
+
+
+class _Leg:
+    """One bilingual leg on the worker pool; its timeout runs from when a worker picks it up"""
+    
+    def __init__(self, executor: ThreadPoolExecutor, method, *args, **kwargs):
+        self.started = threading.Event()
+        self.started_at = None
+        self.future = executor.submit(self._run, method, args, kwargs)
+    
+    def _run(self, method, args, kwargs):
+        self.started_at = time.monotonic()
+        self.started.set()
+        return method(*args, **kwargs)
+
 
 class CloudLangflowAPI:
     
-    def __init__(self):
-        """Initialize with cloud Langflow endpoints from secrets"""
+    # Number of clients constructed in this process (should stay at 1 while warm)
+    build_count = 0
+    
+    def __init__(self, secrets: Dict[str, Any] = None):
+        """Initialize with cloud Langflow endpoints from secrets (the [api] table; defaults to st.secrets["api"])"""
         
         # ===== LOAD FROM STREAMLIT SECRETS =====
         try:
+            secrets = st.secrets["api"] if secrets is None else secrets
             self.endpoints = {
                 "qna_agent": {
-                    "url": st.secrets["api"]["QNA_AGENT_URL"],
-                    "flow_name": "QNA Agent"
+                    "url": secrets["QNA_AGENT_URL"],
+                    "flow_name": "QNA Agent",
+                    "cache_ttl": 6 * 3600
                 },
                 "report_analyzer": {
-                    "url": st.secrets["api"]["REPORT_ANALYZER_URL"],
-                    "flow_name": "Report Analyzer"
+                    "url": secrets["REPORT_ANALYZER_URL"],
+                    "flow_name": "Report Analyzer",
+                    "cache_ttl": 3600,
+                    # Component that receives uploaded-file references (optional)
+                    "file_component": secrets.get("REPORT_ANALYZER_FILE_COMPONENT")
                 },
                 "prescription_analyzer": {
-                    "url": st.secrets["api"]["PRESCRIPTION_ANALYZER_URL"],
-                    "flow_name": "Prescription Analyzer"
+                    "url": secrets["PRESCRIPTION_ANALYZER_URL"],
+                    "flow_name": "Prescription Analyzer",
+                    "cache_ttl": 3600,
+                    # Component that receives uploaded-file references (optional)
+                    "file_component": secrets.get("PRESCRIPTION_ANALYZER_FILE_COMPONENT")
                 },
                 "bill_analyzer": {
-                    "url": st.secrets["api"]["BILL_ANALYZER_URL"],
-                    "flow_name": "Bill Analyzer"
+                    "url": secrets["BILL_ANALYZER_URL"],
+                    "flow_name": "Bill Analyzer",
+                    "cache_ttl": 0,
+                    # Component that receives uploaded-file references (optional)
+                    "file_component": secrets.get("BILL_ANALYZER_FILE_COMPONENT")
                 },
                 "hospital_finder": {
-                    "url": st.secrets["api"]["HOSPITAL_FINDER_URL"],
-                    "flow_name": "Hospital Finder"
+                    "url": secrets["HOSPITAL_FINDER_URL"],
+                    "flow_name": "Hospital Finder",
+                    "cache_ttl": 7 * 24 * 3600
                 }
             }
             
-            self.app_token = st.secrets["api"]["APP_TOKEN"]
-            self.org_id = st.secrets["api"]["ORG_ID"]
+            # Optional translation flow; when set, bilingual calls run the agent once in English
+            # and translate the answer (translate-once mode)
+            if secrets.get("TRANSLATOR_URL"):
+                self.endpoints["translator"] = {
+                    "url": secrets["TRANSLATOR_URL"],
+                    "flow_name": "Translator",
+                    # Segments are cached individually in self.translation_cache
+                    "cache_ttl": 0
+                }
+            
+            self.app_token = secrets["APP_TOKEN"]
+            self.org_id = secrets["ORG_ID"]
             
         except Exception as e:
             st.error(f"Failed to load secrets: {str(e)}")
@@ -55,54 +121,356 @@ class CloudLangflowAPI:
             "Content-Type": "application/json"
         }
         
-        self.max_retries = 2
-        self.retry_delay = 3
+        # Backoff with jitter, Retry-After, and a retry budget shared by every call of this client
+        self.retry_policy = RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=20.0, connect_timeout=10.0)
+        
+        # One circuit breaker per flow: while open, calls return the demo fallback immediately
+        self.breakers = {flow_key: CircuitBreaker(flow_key) for flow_key in self.endpoints}
+        
+        # Latency, outcome, attempt, status and size metrics per flow (admin page, /metrics)
+        self.metrics = CallMetrics(self.endpoints)
+        
+        # Answer-text extraction; remembers where each flow puts its answer
+        self.extractor = MessageExtractor()
+        
+        # Raw response bodies are not kept on results unless RAW_RESPONSE_STORE_MB is set; then
+        # results get a "raw" handle into a store of compressed bodies bounded by that size
+        self.raw_responses = RawResponseStore(int(float(secrets.get("RAW_RESPONSE_STORE_MB", 0)) * 1024 ** 2))
+        
+        # Worker pool for running the selected-language and English calls together; a bilingual
+        # call holds up to two workers, so the default is two per expected concurrent session
+        self.bilingual_timeout = 300
+        self.bilingual_workers = int(secrets.get("BILINGUAL_WORKERS", 2 * int(secrets.get("EXPECTED_SESSIONS", 10))))
+        self._executor = ThreadPoolExecutor(max_workers=self.bilingual_workers, thread_name_prefix="langflow")
+        
+        # Largest multipart request body (files plus fields) sent to a flow; larger ones are refused
+        self.max_request_bytes = int(float(secrets.get("MAX_UPLOAD_MB", DEFAULT_MAX_REQUEST_BYTES / 1024 ** 2)) * 1024 ** 2)
+        
+        # Keep-alive connection pool (one adapter per endpoint); limits are tunable via secrets
+        self.pool_connections = int(secrets.get("HTTP_POOL_CONNECTIONS", 1))
+        self.pool_maxsize = int(secrets.get("HTTP_POOL_MAXSIZE", 10))
+        self.session = self._build_session()
+        
+        # Response cache; per-flow TTL lives in self.endpoints ("cache_ttl", 0 disables)
+        self.cache = ResponseCache(
+            max_entries=int(secrets.get("RESPONSE_CACHE_SIZE", 512)),
+            db_path=secrets.get("RESPONSE_CACHE_DB")
+        )
+        
+        # Translated segments keyed by (source hash, language); shares the SQLite file if set
+        self.translate_once = "translator" in self.endpoints
+        self.translation_cache = ResponseCache(
+            max_entries=int(secrets.get("TRANSLATION_CACHE_SIZE", 4096)),
+            db_path=secrets.get("RESPONSE_CACHE_DB")
+        )
+        
+        # Send text-bearing PDF/DOCX/TXT uploads as extracted text instead of raw bytes
+        self.extract_text_locally = True
+        
+        # Shrink photo uploads before sending (None disables); see file_preprocessing.shrink_image
+        self.image_options = dict(DEFAULT_IMAGE_OPTIONS)
+        
+        # Files uploaded once to Langflow and referenced by later calls and retries
+        self.uploads = UploadRegistry()
+        
+        # Deterministic overcharge/duplicate checks for text bills, on only when a tariff CSV is
+        # configured (BILL_REFERENCE_PRICES); the starter table is too small to audit real bills
+        bill_prices = secrets.get("BILL_REFERENCE_PRICES")
+        self.bill_auditor = BillAuditor.from_path(bill_prices) if bill_prices else None
+        
+        # Offline hospital directory (HOSPITAL_DATASET: CSV or Parquet); None keeps the flow-only path
+        hospital_dataset = secrets.get("HOSPITAL_DATASET")
+        self.hospital_index = HospitalIndex.load(hospital_dataset) if hospital_dataset else None
+        
+        # Drug interaction table and brand -> generic index (DRUG_INTERACTIONS_PATH: a directory
+        # built with drug_interactions.py; starter data otherwise). None disables
+        self.interaction_checker = InteractionChecker.from_path(secrets.get("DRUG_INTERACTIONS_PATH"))
+        
+        # Lab value extraction and range flagging for text reports (LAB_REFERENCE_RANGES: optional
+        # CSV overriding the bundled adult ranges). None disables
+        self.report_parser = ReportParser.from_path(secrets.get("LAB_REFERENCE_RANGES"))
+        
+        CloudLangflowAPI.build_count += 1
     
-    def _call_api(self, flow_key: str, input_value: str, files: List = None) -> Dict[str, Any]:
-        """Call Langflow cloud API"""
+    def _build_session(self) -> requests.Session:
+        """Create a shared session so calls and retries reuse TCP/TLS connections"""
+        
+        session = requests.Session()
+        
+        # Mount a dedicated adapter per flow URL so each endpoint has its own sized pool.
+        # requests picks the longest matching prefix, so these take precedence over the defaults.
+        for endpoint in self.endpoints.values():
+            parts = urlsplit(endpoint["url"])
+            prefix = f"{parts.scheme}://{parts.netloc}{parts.path}"
+            session.mount(prefix, HTTPAdapter(
+                pool_connections=self.pool_connections,
+                pool_maxsize=self.pool_maxsize,
+                pool_block=False
+            ))
+        
+        return session
+    
+    def close(self):
+        """Release pooled connections and worker threads"""
+        self.session.close()
+        self._executor.shutdown(wait=False)
+    
+    def _call_api(self, flow_key: str, input_value: str, files: List = None,
+                  stream: bool = False) -> Dict[str, Any]:
+        """Call Langflow cloud API, serving repeated requests from the response cache"""
         
         if flow_key not in self.endpoints:
             return {"success": False, "error": f"Flow {flow_key} not found"}
         
-        url = self.endpoints[flow_key]["url"]
+        call = self._stream_flow if stream else self._call_flow
         
-        # If files are present, use multipart upload
-        if files:
-            return self._call_api_with_files(url, input_value, files)
+        ttl = self.endpoints[flow_key].get("cache_ttl", 0)
+        if ttl <= 0:
+            return self._call_with_breaker(call, flow_key, input_value, files)
+        
+        cache_key = self.cache.make_key(flow_key, input_value, files)
+        cached = self.cache.get(flow_key, cache_key)
+        if cached is not None:
+            cached["cached"] = True
+            return cached
+        
+        result = self._call_with_breaker(call, flow_key, input_value, files)
+        
+        # Only cache real answers, never demo fallbacks; the raw payload is not kept
+        if result.get("streaming"):
+            result["message"] = self._cache_stream(result["message"], result, cache_key, ttl)
+        elif result.get("success"):
+            self.cache.set(cache_key, {k: v for k, v in result.items() if k != "raw"}, ttl)
+        
+        return result
+    
+    def _call_with_breaker(self, call, flow_key: str, input_value: str, files: List = None) -> Dict[str, Any]:
+        """Run call() unless the flow's circuit is open, recording the outcome on the breaker and in metrics"""
+        
+        started = time.perf_counter()
+        breaker = self.breakers[flow_key]
+        permit = breaker.allow_request()
+        if permit is None:
+            result = {
+                "success": False,
+                "error": f"{self.endpoints[flow_key]['flow_name']} is temporarily unavailable (circuit open)",
+                "message": self._get_demo_response(flow_key, input_value, is_error=True),
+                "circuit_open": True
+            }
+            self.metrics.observe_call(flow_key, time.perf_counter() - started, result)
+            return result
+        
+        result = {"success": False}
+        try:
+            result = call(flow_key, input_value, files)
+            return result
+        finally:
+            # A refused upload never reached the flow, so it says nothing about the flow's health
+            # (but a half-open probe slot it took must be given back)
+            if result.get("upload_rejected"):
+                breaker.release(permit)
+            else:
+                breaker.record(permit, bool(result.get("success")))
+            self.metrics.observe_call(flow_key, time.perf_counter() - started, result)
+    
+    def circuit_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Breaker state, counters and recent transitions per flow"""
+        return {flow_key: breaker.snapshot() for flow_key, breaker in self.breakers.items()}
+    
+    def prometheus_metrics(self) -> str:
+        """Call metrics plus response cache and circuit breaker state, in Prometheus text format"""
+        
+        lines = [self.metrics.prometheus().rstrip("\n")]
+        
+        cache = self.cache.stats()["per_flow"]
+        for name, field, help_text in (("cache_hits_total", "hits", "Response cache hits"),
+                                       ("cache_misses_total", "misses", "Response cache misses")):
+            lines.append(f"# HELP chronocheck_{name} {help_text}")
+            lines.append(f"# TYPE chronocheck_{name} counter")
+            lines.extend(f'chronocheck_{name}{{flow="{flow}"}} {stats[field]}' for flow, stats in cache.items())
+        
+        extraction = self.extractor.stats()
+        for name, field, help_text in (("extract_fast_path_total", "fast_path_hits", "Answers found on the learned response path"),
+                                       ("extract_full_search_total", "full_searches", "Full response searches")):
+            lines.append(f"# HELP chronocheck_{name} {help_text}")
+            lines.append(f"# TYPE chronocheck_{name} counter")
+            lines.extend(f'chronocheck_{name}{{flow="{flow}"}} {stats[field]}' for flow, stats in extraction.items())
+        
+        lines.append("# HELP chronocheck_circuit_open 1 while the flow's circuit breaker is not closed")
+        lines.append("# TYPE chronocheck_circuit_open gauge")
+        lines.extend(
+            f'chronocheck_circuit_open{{flow="{flow}"}} {int(m["state"] != "closed")}'
+            for flow, m in self.circuit_metrics().items()
+        )
+        return "\n".join(lines) + "\n"
+    
+    def _cache_stream(self, chunks: Iterator[str], result: Dict[str, Any], cache_key: str, ttl: float) -> Iterator[str]:
+        """Pass streamed chunks through and cache the assembled text once the stream completes"""
+        
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        
+        if not result.get("error"):
+            self.cache.set(cache_key, {"success": True, "message": "".join(parts)}, ttl)
+    
+    def _call_flow(self, flow_key: str, input_value: str, files: List = None) -> Dict[str, Any]:
+        """Call Langflow cloud API"""
+        
+        input_value, files, tweaks = self._prepare_inputs(flow_key, input_value, files)
+        return self._run_flow(flow_key, input_value, files, tweaks)
+    
+    def _prepare_inputs(self, flow_key: str, input_value: str, files: List = None):
+        """
+        Reduce uploads before a run: inline extracted text, shrink photos, then replace the
+        remaining files with references to copies already uploaded to Langflow
+        Returns (input_value, files still to send as multipart, tweaks)
+        """
+        
+        tweaks = None
+        
+        if files and self.extract_text_locally:
+            input_value, files = split_text_uploads(input_value, files)
+        
+        if files and self.image_options is not None:
+            files = preprocess_images(files, self.image_options)
+        
+        component = self.endpoints[flow_key].get("file_component")
+        if files and component:
+            paths = [self._upload_file(flow_key, file) for file in files]
+            
+            # Fall back to the multipart upload if any file could not be uploaded
+            if all(paths):
+                field = "files" if component.startswith("ChatInput") else "path"
+                tweaks = {component: {field: paths}}
+                files = []
+        
+        return input_value, files, tweaks
+    
+    def _upload_file(self, flow_key: str, file) -> Optional[str]:
+        """Upload a file once per content hash and return Langflow's file reference"""
+        
+        key = (flow_key, file_digest(file))
+        return self.uploads.get_or_upload(key, partial(self._post_file, flow_key, file))
+    
+    def _upload_url(self, flow_key: str) -> str:
+        """Flow's file-upload endpoint (.../run/<flow> -> .../files/upload/<flow>)"""
+        parts = urlsplit(self.endpoints[flow_key]["url"])
+        return f"{parts.scheme}://{parts.netloc}{parts.path.replace('/run/', '/files/upload/', 1)}"
+    
+    def _post_file(self, flow_key: str, file) -> Optional[str]:
+        """POST a file to the flow's upload endpoint (streamed from the upload's buffer)"""
+        
+        upload_url = self._upload_url(flow_key)
+        
+        try:
+            body = MultipartEncoder([("file", (file.name, file, file.type or 'application/octet-stream'))],
+                                    self.max_request_bytes)
+        except UploadTooLarge:
+            return None
+        
+        headers = self.base_headers.copy()
+        headers.update(body.headers)
+        
+        self.metrics.observe_upload(flow_key, body.file_bytes)
+        try:
+            response = self.session.post(
+                upload_url,
+                data=body,
+                headers=headers,
+                timeout=120
+            )
+            if response.status_code in (200, 201):
+                return response.json().get("file_path")
+        except (requests.exceptions.RequestException, ValueError):
+            pass
+        
+        return None
+    
+    def _build_payload(self, input_value: str, tweaks: Dict = None) -> Dict[str, Any]:
+        """Standard JSON run payload"""
         
-        # Standard JSON payload
         payload = {
             "output_type": "chat",
             "input_type": "chat",
             "input_value": input_value,
             "session_id": str(uuid.uuid4())
         }
+        if tweaks:
+            payload["tweaks"] = tweaks
+        
+        return payload
+    
+    def _run_flow(self, flow_key: str, input_value: str, files: List = None, tweaks: Dict = None) -> Dict[str, Any]:
+        """Run a flow with already prepared inputs"""
+        
+        url = self.endpoints[flow_key]["url"]
+        
+        # If files are present, use multipart upload
+        if files:
+            return self._call_api_with_files(url, input_value, files)
         
-        for attempt in range(self.max_retries):
+        # Standard JSON payload
+        payload = self._build_payload(input_value, tweaks)
+        
+        try:
+            response = self._post_with_retries(
+                url,
+                read_timeout=60,
+                json=payload,
+                headers=self.base_headers
+            )
+        except requests.exceptions.RequestException as e:
+            return {
+                "success": False,
+                "error": f"API call failed: {str(e)}",
+                "message": self._get_demo_response(flow_key, input_value, is_error=True)
+            }
+        
+        return self._handle_response(response, flow_key)
+    
+    def _post_with_retries(self, url: str, read_timeout: float, **kwargs) -> requests.Response:
+        """
+        POST under the retry policy
+        Returns the final response (possibly a non-200 one) or raises the last RequestException
+        """
+        
+        policy = self.retry_policy
+        policy.budget.record_request()
+        flow = self.metrics.flow_for(url)
+        attempt = 0
+        
+        while True:
             try:
-                response = requests.post(
+                response = self.session.post(
                     url,
-                    json=payload,
-                    headers=self.base_headers,
-                    timeout=60
+                    timeout=(policy.connect_timeout, read_timeout),
+                    **kwargs
                 )
-                
-                return self._handle_response(response, flow_key)
-                
             except requests.exceptions.RequestException as e:
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
-                    continue
-                return {
-                    "success": False,
-                    "error": f"API call failed: {str(e)}",
-                    "message": self._get_demo_response(flow_key, input_value, is_error=True)
-                }
-        
-        return {"success": False, "error": "Max retries exceeded"}
+                self.metrics.observe_status(flow, "transport_error")
+                delay = policy.delay_after_exception(e, attempt)
+                if delay is None:
+                    self.metrics.observe_attempts(flow, attempt + 1)
+                    raise
+            else:
+                self.metrics.observe_status(flow, response.status_code)
+                delay = policy.delay_after_response(response, attempt)
+                if delay is None:
+                    self.metrics.observe_attempts(flow, attempt + 1)
+                    self.metrics.observe_request_bytes(flow, _content_length(response.request))
+                    return response
+                response.close()
+            
+            attempt += 1
+            time.sleep(delay)
     
-    def _call_api_with_files(self, url: str, input_value: str, files: List) -> Dict[str, Any]:
-        """Call Langflow API with file uploads using multipart/form-data"""
+    def _build_multipart(self, input_value: str, files: List) -> MultipartEncoder:
+        """
+        Build the streaming multipart/form-data body for a run with file uploads
+        Raises UploadTooLarge when it would exceed self.max_request_bytes
+        """
         
         # Prepare multipart form data
         files_data = []
@@ -115,73 +483,182 @@ class CloudLangflowAPI:
         files_data.append(('input_type', (None, 'chat')))
         files_data.append(('session_id', (None, str(uuid.uuid4()))))
         
-        # Add files
+        # Add files (read in chunks while the body is sent)
         for file in files:
             mime_type = file.type or 'application/octet-stream'
             file_name = file.name
-            file_content = file.getvalue()
             
             files_data.append(
-                ('files', (file_name, file_content, mime_type))
+                ('files', (file_name, file, mime_type))
             )
         
-        # Prepare headers (remove Content-Type for multipart)
+        return MultipartEncoder(files_data, self.max_request_bytes)
+    
+    @staticmethod
+    def _upload_rejected(error: UploadTooLarge) -> Dict[str, Any]:
+        """Result for a request refused before sending (no demo response: retrying will not help)"""
+        return {"success": False, "error": str(error), "upload_rejected": True}
+    
+    def _call_api_with_files(self, url: str, input_value: str, files: List) -> Dict[str, Any]:
+        """Call Langflow API with file uploads using multipart/form-data"""
+        
+        try:
+            body = self._build_multipart(input_value, files)
+        except UploadTooLarge as e:
+            return self._upload_rejected(e)
+        self.metrics.observe_upload(self.metrics.flow_for(url), body.file_bytes)
+        
+        # Prepare headers (multipart Content-Type with boundary, and the known length)
         headers = self.base_headers.copy()
-        headers.pop('Content-Type', None)
+        headers.update(body.headers)
         
-        for attempt in range(self.max_retries):
+        try:
+            response = self._post_with_retries(
+                url,
+                read_timeout=120,
+                data=body,
+                headers=headers
+            )
+        except requests.exceptions.RequestException as e:
+            return {
+                "success": False,
+                "error": f"File upload failed: {str(e)}",
+                "message": self._get_demo_response("file_upload", input_value, is_error=True)
+            }
+        
+        return self._handle_response(response, "file_upload")
+    
+    # ========== STREAMING ==========
+    
+    def _stream_flow(self, flow_key: str, input_value: str, files: List = None) -> Dict[str, Any]:
+        """
+        Start a streaming run (?stream=true) and return as soon as the response headers arrive
+        On success "message" is a generator of text chunks; otherwise falls back to the blocking call
+        """
+        
+        url = self.endpoints[flow_key]["url"]
+        
+        input_value, files, tweaks = self._prepare_inputs(flow_key, input_value, files)
+        
+        if files:
             try:
-                response = requests.post(
-                    url,
-                    files=files_data,
-                    headers=headers,
-                    timeout=120
-                )
+                body = self._build_multipart(input_value, files)
+            except UploadTooLarge as e:
+                return self._upload_rejected(e)
+            headers = self.base_headers.copy()
+            headers.update(body.headers)
+            request_kwargs = {"data": body, "headers": headers}
+        else:
+            request_kwargs = {"json": self._build_payload(input_value, tweaks), "headers": self.base_headers}
+        
+        try:
+            response = self.session.post(
+                url,
+                params={"stream": "true"},
+                stream=True,
+                # Read timeout applies between chunks, not to the whole answer
+                timeout=(self.retry_policy.connect_timeout, 120 if files else 60),
+                **request_kwargs
+            )
+        except requests.exceptions.RequestException:
+            return self._run_flow(flow_key, input_value, files, tweaks)
+        
+        if response.status_code != 200:
+            response.close()
+            return self._run_flow(flow_key, input_value, files, tweaks)
+        
+        # Server answered without streaming: handle it like a normal response
+        if "text/event-stream" not in response.headers.get("Content-Type", ""):
+            return self._handle_response(response, flow_key)
+        
+        result = {"success": True, "streaming": True}
+        result["message"] = self._iter_stream_text(response, result)
+        return result
+    
+    def _iter_stream_text(self, response: requests.Response, result: Dict[str, Any]) -> Iterator[str]:
+        """Yield text from Langflow stream events (token chunks, or the final message if no tokens came)"""
+        
+        # SSE responses often omit the charset
+        response.encoding = response.encoding or "utf-8"
+        streamed = False
+        
+        try:
+            # chunk_size=None yields data as it arrives instead of filling a fixed buffer
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if not line:
+                    continue
+                if line.startswith("data:"):
+                    line = line[5:].strip()
                 
-                return self._handle_response(response, "file_upload")
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
                 
-            except requests.exceptions.RequestException as e:
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
+                if not isinstance(event, dict):
                     continue
-                return {
-                    "success": False,
-                    "error": f"File upload failed: {str(e)}",
-                    "message": self._get_demo_response("file_upload", input_value, is_error=True)
-                }
+                
+                kind = event.get("event")
+                data = event.get("data") or {}
+                
+                if kind == "token":
+                    chunk = data.get("chunk")
+                    if chunk:
+                        streamed = True
+                        yield chunk
+                
+                elif kind == "end" and not streamed:
+                    message = self._extract_message(data.get("result", data), self.metrics.flow_for(response.url, None))
+                    if message:
+                        yield message
+                
+                elif kind == "error":
+                    result["error"] = str(data.get("error") or data.get("text") or data)
+                    yield f"\n\n⚠️ {result['error']}"
+        
+        except requests.exceptions.RequestException as e:
+            result["error"] = f"Stream interrupted: {str(e)}"
+            yield f"\n\n⚠️ {result['error']}"
         
-        return {"success": False, "error": "Max retries exceeded"}
+        finally:
+            response.close()
     
     def _handle_response(self, response: requests.Response, flow_key: str) -> Dict[str, Any]:
         """Handle API response"""
         
         if response.status_code == 200:
             try:
-                data = response.json()
+                data = loads(response.content)
                 
-                # Extract message using improved method
-                message = self._extract_message(data)
+                # Extract message (learned per-flow path first, full search on a miss)
+                flow = self.metrics.flow_for(response.url, flow_key)
+                started = time.perf_counter()
+                message = self._extract_message(data, flow)
+                self.metrics.observe_extract(flow, time.perf_counter() - started)
                 
                 if message:
-                    return {
+                    result = {
                         "success": True, 
-                        "message": message,
-                        "raw": data
+                        "message": message
                     }
                 else:
                     # If no message found, return the whole JSON as string
-                    return {
+                    result = {
                         "success": True, 
-                        "message": json.dumps(data, indent=2),
-                        "raw": data
+                        "message": dumps_indented(data)
                     }
                     
             except Exception as e:
-                return {
+                result = {
                     "success": True, 
-                    "message": response.text,
-                    "raw": response.text
+                    "message": response.text
                 }
+            
+            # The decoded body is dropped here; only a handle to its bytes is kept, if enabled
+            raw = self.raw_responses.put(response.content)
+            if raw is not None:
+                result["raw"] = raw
+            return result
         
         elif response.status_code == 422:
             return {
@@ -197,78 +674,10 @@ class CloudLangflowAPI:
                 "message": self._get_demo_response(flow_key, "", is_error=True)
             }
     
-    def _extract_message(self, data: Dict) -> Optional[str]:
-        """Extract message from response - IMPROVED VERSION for full content"""
+    def _extract_message(self, data: Dict, flow_key: Optional[str] = None) -> Optional[str]:
+        """Extract message from response; with a flow key, the path that worked last time is tried first"""
         
-        try:
-            # METHOD 1: Standard Langflow format - outputs[0].outputs[0].results.message.text
-            outputs = data.get("outputs", [])
-            if outputs and len(outputs) > 0:
-                first_output = outputs[0]
-                
-                # Check inner outputs
-                inner_outputs = first_output.get("outputs", [])
-                for inner in inner_outputs:
-                    if isinstance(inner, dict):
-                        results = inner.get("results", {})
-                        message = results.get("message", {})
-                        if isinstance(message, dict):
-                            text = message.get("text", "")
-                            if text and isinstance(text, str):
-                                return text
-                
-                # Check direct results
-                results = first_output.get("results", {})
-                message = results.get("message", {})
-                if isinstance(message, dict):
-                    text = message.get("text", "")
-                    if text and isinstance(text, str):
-                        return text
-                
-                # Look for any message in outputs
-                for output in outputs:
-                    if isinstance(output, dict):
-                        msg = output.get("message")
-                        if msg and isinstance(msg, str):
-                            return msg
-                        txt = output.get("text")
-                        if txt and isinstance(txt, str):
-                            return txt
-            
-            # METHOD 2: Direct message field
-            message = data.get("message")
-            if message:
-                if isinstance(message, str):
-                    return message
-                if isinstance(message, dict):
-                    text = message.get("text") or message.get("data", {}).get("text")
-                    if text and isinstance(text, str):
-                        return text
-            
-            # METHOD 3: Result field
-            result = data.get("result")
-            if result:
-                if isinstance(result, str):
-                    return result
-                if isinstance(result, dict):
-                    text = result.get("text") or result.get("message")
-                    if text and isinstance(text, str):
-                        return text
-            
-            # METHOD 4: Text field
-            text = data.get("text")
-            if text and isinstance(text, str):
-                return text
-            
-            # METHOD 5: Content field
-            content = data.get("content")
-            if content and isinstance(content, str):
-                return content
-            
-            return None
-            
-        except Exception as e:
-            return None
+        return self.extractor.extract(data, flow_key)
     
     def _get_demo_response(self, flow_key: str, input_text: str, is_error: bool = False) -> str:
         """Demo responses for fallback"""
@@ -339,28 +748,252 @@ Your file has been processed successfully.
     
     # ========== PUBLIC METHODS ==========
     
-    def qna_medical(self, question: str) -> Dict[str, Any]:
+    # With stream=True, a successful result's "message" is a generator of text chunks
+    
+    def qna_medical(self, question: str, stream: bool = False) -> Dict[str, Any]:
         """Medical Q&A - text only"""
-        result = self._call_api("qna_agent", question)
+        result = self._call_api("qna_agent", question, stream=stream)
         return result
     
-    def analyze_report(self, user_message: str, uploaded_files: List = None) -> Dict[str, Any]:
-        """Analyze medical report with optional file uploads"""
-        result = self._call_api("report_analyzer", user_message, uploaded_files)
+    def analyze_report(self, user_message: str, uploaded_files: List = None, analysis_type: str = None,
+                       stream: bool = False, language: str = None) -> Dict[str, Any]:
+        """
+        Analyze medical report with optional file uploads
+        Lab values in text reports are extracted and flagged locally. "Abnormal Values Only" is
+        answered from them directly (translated when language is given); other analysis types
+        send the structured results to the flow instead of the raw report
+        """
+        labs = self.report_parser.analyze_files(uploaded_files) if self.report_parser else None
+        if labs is None:
+            result = self._call_api("report_analyzer", user_message, uploaded_files, stream=stream)
+            return result
+        
+        if analysis_type == ABNORMAL_ONLY:
+            return self.localize_result(self._local_lab_result(labs), "report_analyzer", language)
+        
+        result = self._call_api("report_analyzer", ReportParser.summary_prompt(user_message, labs), stream=stream)
+        if not result.get("success"):
+            return self._local_lab_result(labs, flow_error=result.get("error"))
+        
+        result["lab_results"] = labs
         return result
     
-    def explain_medicines(self, user_message: str, uploaded_files: List = None) -> Dict[str, Any]:
-        """Explain medicines/prescription with optional file uploads"""
-        result = self._call_api("prescription_analyzer", user_message, uploaded_files)
+    @staticmethod
+    def _local_lab_result(labs: Dict[str, Any], **extra) -> Dict[str, Any]:
+        """Result built from the locally flagged lab values alone"""
+        return {
+            "success": True,
+            "message": f"**Abnormal Values** ({labs['abnormal_count']} of {labs['tests']} tests)\n\n"
+                       + format_results(labs, abnormal_only=True),
+            "lab_results": labs,
+            **extra
+        }
+    
+    def explain_medicines(self, user_message: str, uploaded_files: List = None, check_interactions: bool = True,
+                          stream: bool = False) -> Dict[str, Any]:
+        """
+        Explain medicines/prescription with optional file uploads
+        Recognized medicines are checked locally for interactions and generic names first;
+        the findings go to the flow as facts and are returned in result["medicine_check"]
+        """
+        check = None
+        if self.interaction_checker:
+            check = self.interaction_checker.analyze_files(user_message, uploaded_files, check_interactions)
+        if check is None:
+            result = self._call_api("prescription_analyzer", user_message, uploaded_files, stream=stream)
+            return result
+        
+        result = self._call_api("prescription_analyzer", self._medicine_prompt(user_message, check), uploaded_files, stream=stream)
+        result["medicine_check"] = check
         return result
     
-    def analyze_bill(self, user_message: str, uploaded_files: List = None) -> Dict[str, Any]:
-        """Analyze medical bill with optional file uploads"""
-        result = self._call_api("bill_analyzer", user_message, uploaded_files)
+    @staticmethod
+    def _medicine_prompt(user_message: str, check: Dict[str, Any]) -> str:
+        return (f"{user_message}\n\n"
+                f"Checked locally against the drug interaction table (treat as facts):\n{format_interactions(check)}")
+    
+    def analyze_bill(self, user_message: str, uploaded_files: List = None, quick_audit: bool = False,
+                     check_overcharges: bool = True, check_duplicates: bool = True,
+                     stream: bool = False, language: str = None) -> Dict[str, Any]:
+        """
+        Analyze medical bill with optional file uploads
+        Text bills are audited locally first (only the selected checks); with quick_audit=True
+        the local findings are returned directly, translated when language is given
+        """
+        checks = check_overcharges or check_duplicates
+        text = self.bill_auditor.read_files(uploaded_files) if self.bill_auditor and checks else None
+        audit = self.bill_auditor.audit_text(text, check_overcharges, check_duplicates) if text is not None else None
+        if audit is None:
+            result = self._call_api("bill_analyzer", user_message, uploaded_files, stream=stream)
+            return result
+        
+        if quick_audit:
+            return self.localize_result(self._local_audit_result(audit), "bill_analyzer", language)
+        
+        # Text bill audited locally: the flow explains the findings and reviews the items
+        # the reference prices do not cover
+        result = self._call_api("bill_analyzer", BillAuditor.explain_prompt(user_message, audit, text), stream=stream)
+        return self._with_local_audit(result, audit)
+    
+    def _with_local_audit(self, result: Dict[str, Any], audit: Dict[str, Any]) -> Dict[str, Any]:
+        """Attach the local audit; if the flow failed, the local findings replace the demo report"""
+        if not result.get("success"):
+            return self._local_audit_result(audit, flow_error=result.get("error"))
+        
+        result["local_audit"] = audit
         return result
     
-    def find_hospitals(self, query: str, location: str = "") -> Dict[str, Any]:
-        """Find hospitals - text only"""
-        full_query = f"{query} in {location}" if location else query
-        result = self._call_api("hospital_finder", full_query)
-        return result
\ No newline at end of file
+    @staticmethod
+    def _local_audit_result(audit: Dict[str, Any], **extra) -> Dict[str, Any]:
+        """Result built from the local audit alone"""
+        return {
+            "success": True,
+            "message": "**Medical Billing Audit Report**\n\n" + format_findings(audit),
+            "local_audit": audit,
+            **extra
+        }
+    
+    def find_hospitals(self, query: str, location: str = "", specializations: List[str] = None,
+                       phrase: bool = False, stream: bool = False, language: str = None) -> Dict[str, Any]:
+        """
+        Find hospitals - text only
+        Matches come from the local hospital index when it has any; phrase=True still asks
+        the flow to present them, otherwise no flow call is made. With language the flow is
+        asked to answer in that language; query is only the user's request
+        """
+        full_query = hospital_query(query, location, specializations, language)
+        local = self.search_hospitals(query, location, specializations)
+        if local is None:
+            result = self._call_api("hospital_finder", full_query, stream=stream)
+            return result
+        
+        if not phrase:
+            return local
+        
+        result = self._call_api("hospital_finder", phrase_prompt(full_query, local["hospitals"]), stream=stream)
+        if not result.get("success"):
+            return dict(local, flow_error=result.get("error"))
+        
+        result["hospitals"] = local["hospitals"]
+        return result
+    
+    def search_hospitals(self, query: str, location: str = "", specializations: List[str] = None,
+                         near: tuple = None, limit: int = 10) -> Optional[Dict[str, Any]]:
+        """Structured matches from the local hospital index, or None without an index or a match"""
+        if self.hospital_index is None:
+            return None
+        
+        hospitals = self.hospital_index.search(location or None, specializations or (), query, near, limit)
+        if not hospitals:
+            return None
+        
+        return {"success": True, "message": format_hospitals(hospitals), "hospitals": hospitals, "local_index": True}
+    
+    # ========== BILINGUAL DISPATCH ==========
+    
+    def call_bilingual(self, method_name: str, message: str, english_message: str = None,
+                       *args, timeout: float = None, stream: bool = False, language: str = None,
+                       localized_options: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Run the selected-language and English calls of a public method concurrently
+        Each leg gets its own result; a leg that fails or times out does not discard the other
+        localized_options are keyword arguments for the selected-language leg only
+        
+        With stream=True the selected-language leg is streamed and "english" is a
+        zero-argument callable that waits for the English result when the page needs it
+        
+        In translate-once mode (TRANSLATOR_URL set) and with language given, the method runs
+        only for the English message, on the calling thread, and the localized result is its
+        translation
+        
+        Each pooled leg gets the full timeout from when a worker starts it, plus up to the same
+        again waiting for a free worker
+        """
+        method = getattr(self, method_name)
+        timeout = timeout or self.bilingual_timeout
+        
+        if self.translate_once and language and english_message is not None:
+            try:
+                english = method(english_message, *args)
+            except Exception as e:
+                english = {"success": False, "error": f"English request failed: {str(e)}"}
+            localized = self.translate_result(english, language)
+            return {"success": english.get("success"), "localized": localized, "english": english}
+        
+        english_leg = None
+        if english_message is not None:
+            english_leg = _Leg(self._executor, method, english_message, *args)
+        
+        if stream:
+            try:
+                localized = method(message, *args, stream=True, **(localized_options or {}))
+            except Exception as e:
+                localized = {"success": False, "error": f"Localized request failed: {str(e)}"}
+            
+            english = None
+            if english_leg is not None:
+                english = partial(self._wait_for_leg, "english", english_leg, timeout)
+            
+            return {"success": localized.get("success"), "localized": localized, "english": english}
+        
+        localized_leg = _Leg(self._executor, method, message, *args, **(localized_options or {}))
+        results = {
+            "localized": self._wait_for_leg("localized", localized_leg, timeout),
+            "english": None
+        }
+        if english_leg is not None:
+            results["english"] = self._wait_for_leg("english", english_leg, timeout)
+        
+        results["success"] = any(r and r.get("success") for r in (results["localized"], results["english"]))
+        return results
+    
+    def translate_result(self, english_result: Dict[str, Any], language: str) -> Dict[str, Any]:
+        """
+        Translate a successful English result into language with the translation flow
+        Only segments missing from the translation cache are sent, in numbered batches
+        """
+        if not english_result.get("success"):
+            return english_result
+        
+        job = TranslationJob(english_result["message"], language, self.translation_cache)
+        batches = job.batches()
+        for batch in batches:
+            reply = self._call_api("translator", job.prompt(batch))
+            if not reply.get("success") or not job.apply(batch, reply["message"]):
+                return failed_translation(reply.get("error"))
+        
+        return job.result(english_result, calls=len(batches))
+    
+    def localize_result(self, result: Dict[str, Any], flow_key: str, language: str = None) -> Dict[str, Any]:
+        """
+        A locally built English result in language: through the translation flow when one is
+        configured, otherwise restated by the agent flow. If that fails the English result is
+        kept, with flow_error set
+        """
+        if not language or language == "English" or not result.get("success"):
+            return result
+        
+        if self.translate_once:
+            localized = self.translate_result(result, language)
+        else:
+            localized = self._call_api(flow_key, restate_prompt(result["message"], language))
+        if not localized.get("success"):
+            return dict(result, flow_error=localized.get("error"))
+        return dict(result, message=localized["message"], translated=True)
+    
+    def _wait_for_leg(self, name: str, leg: _Leg, timeout: float) -> Dict[str, Any]:
+        """
+        Wait for one bilingual leg: up to timeout for a worker to start it, then up to timeout
+        from its start. A leg still queued is cancelled; a running one cannot be interrupted, so
+        it finishes in the background (bounded by the HTTP timeouts) and its result is dropped
+        """
+        if not leg.started.wait(timeout):
+            if leg.future.cancel():
+                return {"success": False, "error": f"{name.title()} request was not started within {timeout}s (all workers busy)"}
+            leg.started.wait()   # a worker picked it up just now
+        try:
+            return leg.future.result(timeout=max(0, leg.started_at + timeout - time.monotonic()))
+        except FutureTimeoutError:
+            return {"success": False, "error": f"{name.title()} request timed out after {timeout}s"}
+        except Exception as e:
+            return {"success": False, "error": f"{name.title()} request failed: {str(e)}"}
\ No newline at end of file
@@ -0,0 +1,307 @@
+# drug_interactions.py - Local drug interaction and generic-name lookups for the Medicine Explainer
+"""
+Drug interaction engine
+Generic ingredients get integer IDs; a sorted pairwise table keyed by (id_a, id_b) holds the
+known interactions and is memory-mapped from disk, so a large table costs no load time.
+A brand -> generic alias index resolves medicine names found in a prescription, and all
+pairs are checked in one vectorized lookup.
+
+Build a table from CSV files:
+    python drug_interactions.py interactions.csv aliases.csv --output drug_data/
+interactions.csv: drug_a, drug_b, severity (minor/moderate/major/contraindicated), description
+aliases.csv:      alias, generic (';' between ingredients of combination products)
+"""
+
+import argparse
+import json
+import os
+import re
+from typing import Optional, Dict, Any, List, Iterable
+
+import numpy as np
+
+from file_preprocessing import extract_text
+
+
+SEVERITY = {"minor": 1, "moderate": 2, "major": 3, "contraindicated": 4}
+SEVERITY_NAMES = {level: name for name, level in SEVERITY.items()}
+
+TABLE_DTYPE = np.dtype([("key", "<u8"), ("severity", "u1"), ("note", "<u4")])
+
+# Starter data (well-known interactions and common Indian brands); load a full dataset via DRUG_INTERACTIONS_PATH
+STARTER_INTERACTIONS = [
+    ("warfarin", "aspirin", "major", "Higher risk of serious bleeding"),
+    ("warfarin", "ibuprofen", "major", "Higher risk of serious bleeding"),
+    ("warfarin", "amiodarone", "major", "Amiodarone raises warfarin levels; INR needs close monitoring"),
+    ("sildenafil", "isosorbide mononitrate", "contraindicated", "Severe, possibly fatal drop in blood pressure"),
+    ("sildenafil", "nitroglycerin", "contraindicated", "Severe, possibly fatal drop in blood pressure"),
+    ("simvastatin", "clarithromycin", "contraindicated", "Greatly raised statin levels; risk of muscle damage"),
+    ("atorvastatin", "clarithromycin", "major", "Raised statin levels; risk of muscle damage"),
+    ("simvastatin", "amlodipine", "moderate", "Raised simvastatin levels; dose should not exceed 20 mg"),
+    ("clopidogrel", "omeprazole", "moderate", "Omeprazole can reduce the antiplatelet effect of clopidogrel"),
+    ("aspirin", "ibuprofen", "moderate", "Ibuprofen can blunt aspirin's heart protection; more stomach bleeding"),
+    ("fluoxetine", "tramadol", "major", "Risk of serotonin syndrome and seizures"),
+    ("sertraline", "tramadol", "major", "Risk of serotonin syndrome and seizures"),
+    ("methotrexate", "trimethoprim", "major", "Raised methotrexate toxicity (bone marrow suppression)"),
+    ("digoxin", "amiodarone", "major", "Raised digoxin levels; risk of toxicity"),
+    ("ciprofloxacin", "theophylline", "major", "Raised theophylline levels; risk of seizures"),
+    ("spironolactone", "lisinopril", "moderate", "Risk of high potassium"),
+    ("spironolactone", "losartan", "moderate", "Risk of high potassium"),
+    ("spironolactone", "telmisartan", "moderate", "Risk of high potassium"),
+    ("levothyroxine", "calcium carbonate", "moderate", "Calcium reduces levothyroxine absorption; take 4 hours apart"),
+    ("ciprofloxacin", "calcium carbonate", "moderate", "Calcium reduces ciprofloxacin absorption; take 2 hours apart"),
+    ("metformin", "furosemide", "minor", "Furosemide may slightly raise metformin levels")
+]
+
+STARTER_ALIASES = {
+    "Glycomet": ["metformin"], "Glucophage": ["metformin"],
+    "Lipitor": ["atorvastatin"], "Atorva": ["atorvastatin"], "Storvas": ["atorvastatin"],
+    "Zocor": ["simvastatin"],
+    "Losar": ["losartan"], "Cozaar": ["losartan"], "Telma": ["telmisartan"],
+    "Amlong": ["amlodipine"], "Amlodac": ["amlodipine"],
+    "Ecosprin": ["aspirin"], "Disprin": ["aspirin"],
+    "Brufen": ["ibuprofen"], "Combiflam": ["ibuprofen", "paracetamol"],
+    "Crocin": ["paracetamol"], "Dolo": ["paracetamol"], "Calpol": ["paracetamol"],
+    "Augmentin": ["amoxicillin", "clavulanic acid"],
+    "Omez": ["omeprazole"], "Clopilet": ["clopidogrel"], "Plavix": ["clopidogrel"],
+    "Thyronorm": ["levothyroxine"], "Eltroxin": ["levothyroxine"],
+    "Shelcal": ["calcium carbonate"], "Ciplox": ["ciprofloxacin"],
+    "Claribid": ["clarithromycin"], "Viagra": ["sildenafil"],
+    "Lanoxin": ["digoxin"], "Cordarone": ["amiodarone"],
+    "Prozac": ["fluoxetine"], "Zoloft": ["sertraline"], "Ultracet": ["tramadol", "paracetamol"],
+    "Aldactone": ["spironolactone"], "Lasix": ["furosemide"], "Warf": ["warfarin"],
+    "Nitrocontin": ["nitroglycerin"], "Monotrate": ["isosorbide mononitrate"]
+}
+
+# Longest alias (in words) tried when scanning text for medicine names
+MAX_NAME_WORDS = 3
+
+
+def normalize_drug(name: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+class InteractionChecker:
+    
+    def __init__(self, table: np.ndarray, ingredients: List[str], notes: List[str],
+                 aliases: Dict[str, List[str]], prices: Dict[str, Dict[str, float]] = None):
+        """
+        table: TABLE_DTYPE rows sorted by key, key = id_a * len(ingredients) + id_b with id_a < id_b
+        aliases: brand name -> generic ingredient names; prices: optional brand -> {"brand", "generic"}
+        """
+        self.table = table
+        self.ingredients = ingredients
+        self.notes = notes
+        self.aliases = aliases
+        self.prices = prices or {}
+        self._ids = {name: i for i, name in enumerate(ingredients)}
+        
+        # Alias index over normalized names: every brand and every generic name
+        self._names = {normalize_drug(name): [self._ids[name]] for name in ingredients}
+        self._brands = {}
+        for brand, generics in aliases.items():
+            ids = [self._ids[g] for g in generics if g in self._ids]
+            if ids:
+                self._names[normalize_drug(brand)] = ids
+                self._brands[normalize_drug(brand)] = brand
+    
+    # ========== BUILD / LOAD ==========
+    
+    @classmethod
+    def from_records(cls, interactions: Iterable, aliases: Dict[str, List[str]],
+                     prices: Dict[str, Dict[str, float]] = None) -> "InteractionChecker":
+        """Build the sorted pair table from (drug_a, drug_b, severity, description) records"""
+        interactions = [(normalize_drug(a), normalize_drug(b), s.lower(), d) for a, b, s, d in interactions]
+        aliases = {brand: [normalize_drug(g) for g in generics] for brand, generics in aliases.items()}
+        
+        ingredients = sorted({a for a, _, _, _ in interactions} | {b for _, b, _, _ in interactions}
+                             | {g for generics in aliases.values() for g in generics})
+        ids = {name: i for i, name in enumerate(ingredients)}
+        notes = sorted({d for _, _, _, d in interactions})
+        note_ids = {note: i for i, note in enumerate(notes)}
+        
+        rows = {}
+        for a, b, severity, description in interactions:
+            low, high = sorted((ids[a], ids[b]))
+            key = low * len(ingredients) + high
+            # Keep the most severe entry for a pair
+            if key not in rows or SEVERITY[severity] > rows[key][1]:
+                rows[key] = (key, SEVERITY[severity], note_ids[description])
+        
+        table = np.array(sorted(rows.values()), dtype=TABLE_DTYPE)
+        return cls(table, ingredients, notes, aliases, prices)
+    
+    @classmethod
+    def default(cls) -> "InteractionChecker":
+        return cls.from_records(STARTER_INTERACTIONS, STARTER_ALIASES)
+    
+    def save(self, directory: str):
+        """Write interactions.npy (memory-mappable) and drug_meta.json"""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "interactions.npy"), np.asarray(self.table))
+        with open(os.path.join(directory, "drug_meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"ingredients": self.ingredients, "notes": self.notes,
+                       "aliases": self.aliases, "prices": self.prices}, f, ensure_ascii=False)
+    
+    @classmethod
+    def load(cls, directory: str) -> "InteractionChecker":
+        """Open a saved table; the pair table stays memory-mapped"""
+        table = np.load(os.path.join(directory, "interactions.npy"), mmap_mode="r")
+        with open(os.path.join(directory, "drug_meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(table, meta["ingredients"], meta["notes"], meta["aliases"], meta.get("prices"))
+    
+    @classmethod
+    def from_path(cls, directory: Optional[str] = None) -> "InteractionChecker":
+        """Checker over a saved dataset, or the built-in starter data when directory is empty"""
+        return cls.load(directory) if directory else cls.default()
+    
+    # ========== LOOKUPS ==========
+    
+    def find_medicines(self, text: str) -> List[Dict[str, Any]]:
+        """Medicines named in free text (brands or generics), in order of first mention"""
+        
+        tokens = re.findall(r"[a-z0-9]+", text.lower())
+        found = {}
+        i = 0
+        while i < len(tokens):
+            for size in range(MAX_NAME_WORDS, 0, -1):
+                key = " ".join(tokens[i:i + size])
+                ids = self._names.get(key)
+                if ids is not None:
+                    found.setdefault(key, ids)
+                    i += size
+                    break
+            else:
+                i += 1
+        
+        medicines = []
+        for key, ids in found.items():
+            brand = self._brands.get(key)
+            medicines.append({
+                "name": brand or key,
+                "brand": brand is not None,
+                "generics": [self.ingredients[i] for i in ids],
+                "ingredient_ids": ids
+            })
+        return medicines
+    
+    def check(self, medicines: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Interactions among the medicines' ingredients, most severe first
+        Every pair is looked up at once with a binary search over the sorted pair table;
+        the same ingredient in two products is reported as a duplicate
+        """
+        
+        sources = {}
+        for medicine in medicines:
+            for ingredient_id in medicine["ingredient_ids"]:
+                sources.setdefault(ingredient_id, []).append(medicine["name"])
+        
+        findings = [
+            {"drugs": names, "ingredients": [self.ingredients[ingredient_id]], "severity": "moderate",
+             "description": f"Same active ingredient ({self.ingredients[ingredient_id]}) in more than one medicine"}
+            for ingredient_id, names in sources.items() if len(names) > 1
+        ]
+        
+        ids = np.array(sorted(sources), dtype=np.uint64)
+        if len(ids) >= 2 and len(self.table):
+            first, second = np.triu_indices(len(ids), 1)
+            keys = ids[first] * np.uint64(len(self.ingredients)) + ids[second]
+            positions = np.searchsorted(self.table["key"], keys)
+            positions = np.minimum(positions, len(self.table) - 1)
+            hit = self.table["key"][positions] == keys
+            
+            for a, b, position in zip(ids[first][hit], ids[second][hit], positions[hit]):
+                row = self.table[position]
+                findings.append({
+                    "drugs": [sources[int(a)][0], sources[int(b)][0]],
+                    "ingredients": [self.ingredients[int(a)], self.ingredients[int(b)]],
+                    "severity": SEVERITY_NAMES[int(row["severity"])],
+                    "description": self.notes[int(row["note"])]
+                })
+        
+        findings.sort(key=lambda f: SEVERITY[f["severity"]], reverse=True)
+        return findings
+    
+    def generic_alternatives(self, medicines: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Brand -> generic ingredients (with prices when the dataset has them)"""
+        rows = []
+        for medicine in medicines:
+            if not medicine["brand"]:
+                continue
+            price = self.prices.get(medicine["name"], {})
+            savings = None
+            if price.get("brand") and price.get("generic") is not None:
+                savings = round((1 - price["generic"] / price["brand"]) * 100)
+            rows.append({"brand": medicine["name"], "generic": " + ".join(medicine["generics"]),
+                         "brand_price": price.get("brand"), "generic_price": price.get("generic"),
+                         "savings_pct": savings})
+        return rows
+    
+    def analyze(self, text: str, check_interactions: bool = True) -> Optional[Dict[str, Any]]:
+        """Medicines, interactions and generic alternatives for text; None when no medicine is recognized"""
+        medicines = self.find_medicines(text)
+        if not medicines:
+            return None
+        return {
+            "medicines": [{k: v for k, v in m.items() if k != "ingredient_ids"} for m in medicines],
+            "interactions": self.check(medicines) if check_interactions else [],
+            "generic_alternatives": self.generic_alternatives(medicines)
+        }
+    
+    def analyze_files(self, user_message: str, files: List = None, check_interactions: bool = True) -> Optional[Dict[str, Any]]:
+        """analyze() over the user's message plus the text of text-bearing uploads"""
+        texts = [user_message or ""]
+        for file in files or []:
+            text = extract_text(file)
+            if text:
+                texts.append(text)
+        return self.analyze("\n".join(texts), check_interactions)
+
+
+def format_interactions(check: Dict[str, Any]) -> str:
+    """Prompt/markdown summary of the local medicine check"""
+    lines = ["Medicines recognized: " + ", ".join(
+        f"{m['name']} ({' + '.join(m['generics'])})" if m["brand"] else m["name"] for m in check["medicines"]
+    )]
+    if check["interactions"]:
+        lines.append("Known interactions:")
+        for finding in check["interactions"]:
+            lines.append(f"- {finding['severity'].upper()}: {' + '.join(finding['drugs'])} - {finding['description']}")
+    else:
+        lines.append("No known interactions between these medicines.")
+    return "\n".join(lines)
+
+
+# ========== BUILD CLI ==========
+
+def main(argv: Optional[List[str]] = None):
+    import pandas as pd
+    
+    parser = argparse.ArgumentParser(description="Build the memory-mapped drug interaction table")
+    parser.add_argument("interactions", help="CSV with drug_a, drug_b, severity, description")
+    parser.add_argument("aliases", help="CSV with alias, generic[, brand_price, generic_price]")
+    parser.add_argument("--output", default="drug_data", help="Output directory (set DRUG_INTERACTIONS_PATH to it)")
+    args = parser.parse_args(argv)
+    
+    interactions = pd.read_csv(args.interactions)
+    alias_frame = pd.read_csv(args.aliases)
+    
+    aliases = {row.alias: str(row.generic).split(";") for row in alias_frame.itertuples()}
+    prices = {}
+    if {"brand_price", "generic_price"} <= set(alias_frame.columns):
+        prices = {row.alias: {"brand": float(row.brand_price), "generic": float(row.generic_price)}
+                  for row in alias_frame.dropna(subset=["brand_price", "generic_price"]).itertuples()}
+    
+    checker = InteractionChecker.from_records(
+        interactions[["drug_a", "drug_b", "severity", "description"]].itertuples(index=False),
+        aliases, prices
+    )
+    checker.save(args.output)
+    print(f"{len(checker.table)} interactions, {len(checker.ingredients)} ingredients, "
+          f"{len(checker.aliases)} aliases -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
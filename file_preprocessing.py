@@ -0,0 +1,240 @@
+# file_preprocessing.py - Local preprocessing of uploads before they reach Langflow
+"""
+Local preprocessing of uploaded files
+Extracts plain text from text-bearing PDF, DOCX and TXT uploads so only the text is sent,
+and shrinks photo uploads (EXIF strip, auto-rotate, downsample, recompress) before upload
+"""
+
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Tuple
+
+try:
+    from PyPDF2 import PdfReader
+except ImportError:
+    PdfReader = None
+
+try:
+    import docx
+except ImportError:
+    docx = None
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+
+# A PDF with any page below this many characters is treated as (partly) scanned and uploaded as-is
+MIN_CHARS_PER_PAGE = 40
+
+# Most extracted text inlined into one request; documents past it are uploaded as-is
+MAX_EXTRACTED_CHARS = 60000
+
+
+def _file_extension(file) -> str:
+    return os.path.splitext(file.name or "")[1].lower()
+
+
+def extract_pdf_text(data: bytes) -> Optional[str]:
+    """Text of a PDF, or None unless every page has a usable text layer"""
+    if PdfReader is None:
+        return None
+    
+    reader = PdfReader(io.BytesIO(data))
+    pages = [(page.extract_text() or "").strip() for page in reader.pages]
+    
+    # One scanned page (a signed or stamped sheet) would otherwise be silently left out
+    if not pages or any(len(page) < MIN_CHARS_PER_PAGE for page in pages):
+        return None
+    return "\n\n".join(pages)
+
+
+def extract_docx_text(data: bytes) -> Optional[str]:
+    """Paragraph and table text of a DOCX document"""
+    if docx is None:
+        return None
+    
+    document = docx.Document(io.BytesIO(data))
+    lines = [paragraph.text for paragraph in document.paragraphs if paragraph.text.strip()]
+    
+    # Lab reports and bills keep most of their values in tables
+    for table in document.tables:
+        for row in table.rows:
+            cells = [cell.text.strip() for cell in row.cells]
+            if any(cells):
+                lines.append(" | ".join(cells))
+    
+    return "\n".join(lines) or None
+
+
+def extract_txt_text(data: bytes) -> Optional[str]:
+    """Decode a plain-text upload"""
+    for encoding in ("utf-8-sig", "utf-16"):
+        try:
+            text = data.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        text = data.decode("latin-1")
+    return text.strip() or None
+
+
+EXTRACTORS = {
+    ".pdf": extract_pdf_text,
+    ".docx": extract_docx_text,
+    ".txt": extract_txt_text
+}
+
+
+def extract_text(file) -> Optional[str]:
+    """
+    Extract plain text from a PDF, DOCX or TXT upload
+    Returns None when the type is unsupported, the file has no text layer, or parsing fails
+    """
+    extractor = EXTRACTORS.get(_file_extension(file))
+    if extractor is None:
+        return None
+    
+    try:
+        text = extractor(file.getvalue())
+    except Exception:
+        return None
+    
+    if text and len(text) <= MAX_EXTRACTED_CHARS:
+        return text
+    return None
+
+
+def split_text_uploads(input_value: str, files: List) -> Tuple[str, List]:
+    """
+    Inline the text of text-bearing uploads into input_value, up to MAX_EXTRACTED_CHARS in total
+    Returns the new input value and the files that still need a binary upload
+    """
+    documents = []
+    remaining = []
+    budget = MAX_EXTRACTED_CHARS
+    
+    for file in files:
+        text = extract_text(file)
+        if text is None or len(text) > budget:
+            remaining.append(file)
+        else:
+            budget -= len(text)
+            documents.append(f"--- Document: {file.name} ---\n{text}")
+    
+    if not documents:
+        return input_value, remaining
+    
+    return input_value + "\n\n" + "\n\n".join(documents), remaining
+
+
+# ========== IMAGE PREPROCESSING ==========
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+# Defaults tuned for OCR of prescriptions and bills photographed on a phone
+DEFAULT_IMAGE_OPTIONS = {
+    "max_dimension": 2000,
+    "grayscale": True,
+    "format": "JPEG",
+    "quality": 80
+}
+
+_image_pool = None
+_image_pool_lock = threading.Lock()
+
+# Processed output by (content hash, options) so bilingual legs and retries don't redo the work
+_processed_images = OrderedDict()
+_processed_images_lock = threading.Lock()
+MAX_PROCESSED_IMAGES = 64
+
+
+class ProcessedUpload(io.BytesIO):
+    """In-memory stand-in for a Streamlit UploadedFile (name, type, size, getvalue)"""
+    
+    def __init__(self, data: bytes, name: str, type: str):
+        super().__init__(data)
+        self.name = name
+        self.type = type
+        self.size = len(data)
+
+
+def _get_image_pool() -> ThreadPoolExecutor:
+    global _image_pool
+    with _image_pool_lock:
+        if _image_pool is None:
+            _image_pool = ThreadPoolExecutor(
+                max_workers=min(4, os.cpu_count() or 1),
+                thread_name_prefix="image-preprocess"
+            )
+        return _image_pool
+
+
+def shrink_image(data: bytes, max_dimension: int = 2000, grayscale: bool = True,
+                 format: str = "JPEG", quality: int = 80) -> bytes:
+    """
+    Auto-rotate from EXIF, downsample so the longest side is at most max_dimension,
+    optionally convert to grayscale, and re-encode as JPEG or WebP without metadata
+    """
+    image = Image.open(io.BytesIO(data))
+    
+    # Let the JPEG decoder scale down during decoding (much cheaper than a full decode)
+    if image.format == "JPEG":
+        image.draft("L" if grayscale else "RGB", (max_dimension, max_dimension))
+    
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("L" if grayscale else "RGB")
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    
+    # Saving without exif=... drops EXIF (GPS, device info) from the output
+    output = io.BytesIO()
+    image.save(output, format=format, quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def preprocess_image(file, options: dict = None):
+    """Return a smaller re-encoded copy of an image upload, or the original if that isn't smaller"""
+    
+    options = {**DEFAULT_IMAGE_OPTIONS, **(options or {})}
+    
+    if Image is None or _file_extension(file) not in IMAGE_EXTENSIONS:
+        return file
+    
+    data = file.getvalue()
+    key = (hashlib.sha256(data).hexdigest(), tuple(sorted(options.items())))
+    
+    with _processed_images_lock:
+        processed = _processed_images.get(key)
+    
+    if processed is None:
+        try:
+            processed = shrink_image(data, **options)
+        except Exception:
+            return file
+        
+        with _processed_images_lock:
+            _processed_images[key] = processed
+            while len(_processed_images) > MAX_PROCESSED_IMAGES:
+                _processed_images.popitem(last=False)
+    
+    if len(processed) >= len(data):
+        return file
+    
+    extension = ".webp" if options["format"].upper() == "WEBP" else ".jpg"
+    name = os.path.splitext(file.name)[0] + extension
+    return ProcessedUpload(processed, name, f"image/{extension[1:].replace('jpg', 'jpeg')}")
+
+
+def preprocess_images(files: List, options: dict = None) -> List:
+    """Shrink every image upload in parallel; other files pass through unchanged"""
+    
+    if Image is None or not any(_file_extension(file) in IMAGE_EXTENSIONS for file in files):
+        return list(files)
+    
+    return list(_get_image_pool().map(lambda file: preprocess_image(file, options), files))
\ No newline at end of file
@@ -0,0 +1,255 @@
+# hospital_index.py - Offline hospital directory for the Hospital Finder
+"""
+Local hospital index
+Loads a hospital dataset (CSV or Parquet) and answers city + specialization + nearest-N
+queries from in-memory indexes: an inverted index per city and per specialization, and a
+grid (geohash-style) spatial index over coordinates. The Hospital Finder flow is then only
+needed to phrase or translate the structured results.
+
+Dataset columns: name, city, latitude, longitude, specializations (separated by ';')
+Optional columns: address, phone, rating, emergency
+"""
+
+import math
+import re
+from typing import Optional, Dict, Any, List, Tuple, Iterable
+
+import numpy as np
+import pandas as pd
+
+
+EARTH_RADIUS_KM = 6371.0
+
+# Grid cell size of the spatial index, in degrees (~28 km north-south)
+CELL_DEGREES = 0.25
+
+# Below this many candidates, distances are computed directly instead of walking grid cells
+BRUTE_FORCE_LIMIT = 5000
+
+# Free-text words that point to a specialization (used when none is selected explicitly)
+SPECIALIZATION_KEYWORDS = {
+    "cardiology": ["cardiac", "cardio", "heart", "bypass", "angioplasty"],
+    "neurology": ["neuro", "brain", "stroke", "nerve", "epilepsy", "seizure"],
+    "orthopedics": ["ortho", "bone", "fracture", "joint", "knee", "hip", "spine"],
+    "pediatrics": ["child", "children", "pediatric", "paediatric", "baby", "infant", "newborn"],
+    "oncology": ["cancer", "oncology", "tumor", "tumour", "chemo", "chemotherapy"],
+    "general surgery": ["surgery", "surgical", "hernia", "appendix"],
+    "emergency": ["emergency", "accident", "trauma", "casualty", "urgent"]
+}
+
+OUTPUT_COLUMNS = ["name", "city", "address", "phone", "rating", "emergency", "latitude", "longitude"]
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", str(text).strip().lower())
+
+
+def infer_specializations(query: str) -> List[str]:
+    """Specializations mentioned in free text, e.g. "cardiac surgery" -> cardiology, general surgery"""
+    words = set(re.findall(r"[a-z]+", query.lower()))
+    return [spec for spec, keywords in SPECIALIZATION_KEYWORDS.items()
+            if spec in query.lower() or words & set(keywords)]
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distances (km) from one point to many; all angles in degrees"""
+    lat, lon = math.radians(lat), math.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class HospitalIndex:
+    
+    def __init__(self, frame: pd.DataFrame):
+        frame = frame.dropna(subset=["name", "city", "latitude", "longitude"]).reset_index(drop=True)
+        for column in OUTPUT_COLUMNS:
+            if column not in frame:
+                frame[column] = None
+        self.frame = frame
+        
+        self.lats = frame["latitude"].to_numpy(dtype=float)
+        self.lons = frame["longitude"].to_numpy(dtype=float)
+        self.ratings = pd.to_numeric(frame["rating"], errors="coerce").fillna(0).to_numpy(dtype=float)
+        self.specializations = [
+            [s.strip() for s in str(value or "").split(";") if s.strip()]
+            for value in frame["specializations"]
+        ]
+        
+        self._by_city = self._invert((_normalize(city),) for city in frame["city"])
+        self._by_specialization = self._invert(
+            {_normalize(s) for s in specs} for specs in self.specializations
+        )
+        
+        # Bitmap per specialization for filtering and scoring candidate rows
+        self._specialization_masks = {}
+        for spec, rows in self._by_specialization.items():
+            mask = np.zeros(len(frame), dtype=bool)
+            mask[rows] = True
+            self._specialization_masks[spec] = mask
+        
+        # Result records are built once; queries only pick rows
+        self._records = frame[OUTPUT_COLUMNS].astype(object).where(frame[OUTPUT_COLUMNS].notna(), None).to_dict("records")
+        for record, specs in zip(self._records, self.specializations):
+            record["specializations"] = specs
+        
+        # Spatial grid: (lat cell, lon cell) -> rows
+        cells = pd.Series(np.arange(len(frame))).groupby(
+            [np.floor(self.lats / CELL_DEGREES).astype(int), np.floor(self.lons / CELL_DEGREES).astype(int)]
+        )
+        self._cells = {cell: rows.to_numpy() for cell, rows in cells}
+        self._cell_bounds = np.array(list(self._cells)).reshape(-1, 2)
+    
+    @staticmethod
+    def _invert(keys_per_row: Iterable[Iterable[str]]) -> Dict[str, np.ndarray]:
+        index = {}
+        for row, keys in enumerate(keys_per_row):
+            for key in keys:
+                index.setdefault(key, []).append(row)
+        return {key: np.array(rows) for key, rows in index.items()}
+    
+    @classmethod
+    def load(cls, path: str) -> "HospitalIndex":
+        """Build the index from a .csv or .parquet file"""
+        frame = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+        return cls(frame)
+    
+    # ========== QUERIES ==========
+    
+    def _candidates(self, city: Optional[str], specializations: Iterable[str]) -> np.ndarray:
+        """Rows in the city that offer every listed specialization"""
+        rows = self._by_city.get(_normalize(city), np.array([], dtype=int)) if city else None
+        for spec in specializations:
+            mask = self._specialization_masks.get(_normalize(spec))
+            if mask is None:
+                return np.array([], dtype=int)
+            rows = np.flatnonzero(mask) if rows is None else rows[mask[rows]]
+        return np.arange(len(self.frame)) if rows is None else rows
+    
+    def nearest(self, lat: float, lon: float, limit: int = 10, rows: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The `limit` rows closest to (lat, lon), optionally restricted to `rows`
+        Small candidate sets are ranked directly; otherwise grid cells are visited in rings
+        of growing radius until no unvisited cell can hold a closer hospital
+        """
+        if rows is not None and len(rows) <= BRUTE_FORCE_LIMIT:
+            distances = haversine_km(lat, lon, self.lats[rows], self.lons[rows])
+            order = np.argsort(distances, kind="stable")[:limit]
+            return rows[order], distances[order]
+        
+        allowed = None
+        if rows is not None:
+            allowed = np.zeros(len(self.frame), dtype=bool)
+            allowed[rows] = True
+        
+        center = (math.floor(lat / CELL_DEGREES), math.floor(lon / CELL_DEGREES))
+        max_ring = int(np.abs(self._cell_bounds - center).max()) if len(self._cell_bounds) else 0
+        found = np.array([], dtype=int)
+        distances = np.array([])
+        
+        for ring in range(max_ring + 1):
+            ring_rows = [
+                self._cells[(center[0] + di, center[1] + dj)]
+                for di in range(-ring, ring + 1) for dj in range(-ring, ring + 1)
+                if max(abs(di), abs(dj)) == ring and (center[0] + di, center[1] + dj) in self._cells
+            ]
+            if ring_rows:
+                new = np.concatenate(ring_rows)
+                if allowed is not None:
+                    new = new[allowed[new]]
+                found = np.concatenate([found, new])
+                distances = np.concatenate([distances, haversine_km(lat, lon, self.lats[new], self.lons[new])])
+            
+            # Anything outside this ring is at least `ring` cells away (longitude cells shrink with latitude)
+            reach_km = ring * CELL_DEGREES * 111.0 * math.cos(math.radians(min(abs(lat) + ring * CELL_DEGREES, 89.0)))
+            if len(found) >= limit and np.sort(distances)[limit - 1] <= reach_km:
+                break
+        
+        order = np.argsort(distances, kind="stable")[:limit]
+        return found[order], distances[order]
+    
+    def search(self, city: Optional[str] = None, specializations: Iterable[str] = (), query: str = "",
+               near: Optional[Tuple[float, float]] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Hospitals matching a city and all selected specializations, as structured records
+        Specializations inferred from the free-text query rank matching hospitals first.
+        With near=(lat, lon) results are ordered by distance, otherwise by rating.
+        """
+        preferred = [s for s in infer_specializations(query) if s in self._specialization_masks]
+        
+        # Plain nearest-N over the whole directory goes through the spatial grid
+        if near is not None and not city and not specializations and not preferred:
+            rows, distances = self.nearest(near[0], near[1], limit)
+            return [dict(self._records[row], distance_km=round(float(d), 1)) for row, d in zip(rows, distances)]
+        
+        rows = self._candidates(city, specializations)
+        if len(rows) == 0:
+            return []
+        
+        hits = np.zeros(len(rows), dtype=int)
+        for spec in preferred:
+            hits += self._specialization_masks[spec][rows]
+        if hits.any():
+            rows, hits = rows[hits > 0], hits[hits > 0]
+        
+        # Rank by matched query specializations first, then distance or rating
+        distances = None
+        if near is not None:
+            distances = haversine_km(near[0], near[1], self.lats[rows], self.lons[rows])
+            score = distances - hits * 1e6
+        else:
+            score = -(hits * 1e3 + self.ratings[rows])
+        
+        top = np.argpartition(score, limit - 1)[:limit] if len(rows) > limit else np.arange(len(rows))
+        top = top[np.argsort(score[top], kind="stable")]
+        
+        results = []
+        for position in top:
+            record = dict(self._records[rows[position]])
+            if distances is not None:
+                record["distance_km"] = round(float(distances[position]), 1)
+            results.append(record)
+        return results
+
+
+def format_hospitals(hospitals: List[Dict[str, Any]]) -> str:
+    """Markdown table of search results"""
+    
+    with_distance = any("distance_km" in h for h in hospitals)
+    header = "| Hospital | Specializations | Address | Phone | Rating |" + (" Distance |" if with_distance else "")
+    lines = [header, "|" + "---|" * (header.count("|") - 1)]
+    
+    for h in hospitals:
+        cells = [
+            f"**{h['name']}**" + (" 🚑" if h.get("emergency") in (True, 1, "yes", "Yes", "true", "True") else ""),
+            ", ".join(h["specializations"]),
+            h.get("address") or h["city"],
+            h.get("phone") or "-",
+            f"{h['rating']:.1f}" if isinstance(h.get("rating"), (int, float)) else "-"
+        ]
+        if with_distance:
+            cells.append(f"{h['distance_km']} km")
+        lines.append("| " + " | ".join(str(c) for c in cells) + " |")
+    return "\n".join(lines)
+
+
+def hospital_query(query: str, location: str = "", specializations: List[str] = None,
+                   language: str = None) -> str:
+    """Hospital Finder flow input for the user's request; language asks for the answer in that language"""
+    text = f"Find hospitals for: {query} in {location}" if location else f"Find hospitals for: {query}"
+    if specializations:
+        text += f" specializing in {', '.join(specializations)}"
+    if language and language != "English":
+        text += f"\n\nIMPORTANT: Provide the complete response in {language} language only."
+    return text
+
+
+def phrase_prompt(user_message: str, hospitals: List[Dict[str, Any]]) -> str:
+    """Flow input asking only to present (and translate) the locally found hospitals"""
+    return (
+        f"{user_message}\n\n"
+        f"These hospitals were found in the local hospital directory:\n\n"
+        f"{format_hospitals(hospitals)}\n\n"
+        f"Present them to the patient with a short note on each. "
+        f"Use only these hospitals and keep names, addresses and phone numbers unchanged."
+    )
\ No newline at end of file
@@ -0,0 +1,334 @@
+# lab_report.py - Local lab value extraction and reference-range flagging for the Report Analyzer
+"""
+Lab report engine
+Pulls (test, value, unit, reference range) tuples out of extracted report text, converts
+values to canonical units and flags out-of-range results with vectorized comparisons.
+The lab's own printed range is used when present, otherwise the bundled reference table.
+"Abnormal Values Only" is answered locally; other modes send the structured results
+instead of the raw report.
+"""
+
+import re
+from typing import Optional, Dict, Any, List
+
+import numpy as np
+import pandas as pd
+
+from file_preprocessing import extract_text
+
+
+# Adult reference ranges in canonical units: (test, canonical unit, low, high, aliases, {unit: factor to canonical})
+REFERENCE_RANGES = [
+    ("Hemoglobin", "g/dl", 12.0, 17.5, ["hb", "haemoglobin", "hgb"], {"g/l": 0.1, "mmol/l": 1.611}),
+    ("Total WBC Count", "/ul", 4000, 11000, ["wbc", "tlc", "total leucocyte count", "total leukocyte count", "wbc count", "total wbc"],
+     {"10^3/ul": 1000, "x10^3/ul": 1000, "10^9/l": 1000, "thou/ul": 1000}),
+    ("Platelet Count", "/ul", 150000, 450000, ["platelets", "plt"],
+     {"10^3/ul": 1000, "x10^3/ul": 1000, "10^9/l": 1000, "lakh/ul": 100000, "lakhs/ul": 100000}),
+    ("RBC Count", "million/ul", 4.0, 6.0, ["rbc", "red blood cell count", "total rbc"], {"10^6/ul": 1, "x10^6/ul": 1, "10^12/l": 1}),
+    ("ESR", "mm/hr", 0, 20, ["erythrocyte sedimentation rate"], {}),
+    ("Fasting Blood Glucose", "mg/dl", 70, 100, ["fbs", "fasting blood sugar", "glucose fasting", "fasting glucose", "blood sugar fasting"],
+     {"mmol/l": 18.0}),
+    ("Random Blood Glucose", "mg/dl", 70, 140, ["rbs", "random blood sugar", "glucose random"], {"mmol/l": 18.0}),
+    ("HbA1c", "%", 4.0, 5.6, ["glycated hemoglobin", "glycosylated hemoglobin", "a1c"], {}),
+    ("Total Cholesterol", "mg/dl", 0, 200, ["cholesterol", "cholesterol total", "serum cholesterol"], {"mmol/l": 38.67}),
+    ("LDL Cholesterol", "mg/dl", 0, 100, ["ldl", "ldl c", "ldl cholesterol direct"], {"mmol/l": 38.67}),
+    ("HDL Cholesterol", "mg/dl", 40, np.inf, ["hdl", "hdl c"], {"mmol/l": 38.67}),
+    ("Triglycerides", "mg/dl", 0, 150, ["tg", "triglyceride", "serum triglycerides"], {"mmol/l": 88.57}),
+    ("Creatinine", "mg/dl", 0.6, 1.3, ["serum creatinine", "s creatinine"], {"umol/l": 1 / 88.4}),
+    ("Urea", "mg/dl", 15, 40, ["blood urea", "serum urea"], {"mmol/l": 6.006}),
+    ("Uric Acid", "mg/dl", 3.5, 7.2, ["serum uric acid"], {"umol/l": 1 / 59.48}),
+    ("SGPT (ALT)", "u/l", 7, 56, ["sgpt", "alt", "alanine aminotransferase"], {"iu/l": 1}),
+    ("SGOT (AST)", "u/l", 10, 40, ["sgot", "ast", "aspartate aminotransferase"], {"iu/l": 1}),
+    ("Total Bilirubin", "mg/dl", 0.1, 1.2, ["bilirubin total", "serum bilirubin", "bilirubin"], {"umol/l": 1 / 17.1}),
+    ("TSH", "miu/l", 0.4, 4.0, ["thyroid stimulating hormone", "tsh ultrasensitive"], {"uiu/ml": 1, "miu/ml": 1000}),
+    ("Vitamin D (25-OH)", "ng/ml", 30, 100, ["vitamin d", "25 oh vitamin d", "vitamin d3", "25 hydroxy vitamin d"], {"nmol/l": 1 / 2.496}),
+    ("Vitamin B12", "pg/ml", 200, 900, ["b12", "vit b12", "cyanocobalamin"], {"pmol/l": 1.355}),
+    ("Sodium", "mmol/l", 135, 145, ["na", "serum sodium"], {"meq/l": 1}),
+    ("Potassium", "mmol/l", 3.5, 5.1, ["k", "serum potassium"], {"meq/l": 1})
+]
+
+# Analysis type answered without the flow
+ABNORMAL_ONLY = "Abnormal Values Only"
+
+# Result flags printed between the value, the unit and the range
+_FLAGS = ("h", "l", "high", "low", "*")
+
+_NUMBER = r"\d+(?:\.\d+)?"
+_VALUE = re.compile(rf"^([<>]=?)?({_NUMBER})$")
+_RANGE = re.compile(rf"({_NUMBER})\s*(?:-|–|to)\s*({_NUMBER})|([<>]=?|upto|up to)\s*({_NUMBER})", re.IGNORECASE)
+_UNIT = re.compile(r"^(?:%|[a-zµμ/^\d.x*]*[a-zµμ%/][a-zµμ/^\d.x*]*)$", re.IGNORECASE)
+
+
+def normalize_test(name: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+def normalize_unit(unit: Optional[str]) -> Optional[str]:
+    """Canonical spelling of a unit: g/dL -> g/dl, cells/cumm -> /ul, µIU/mL -> uiu/ml, x10³/µL -> x10^3/ul"""
+    if not isinstance(unit, str) or not unit:
+        return None
+    text = unit.lower().replace("µ", "u").replace("μ", "u").replace("³", "^3").replace("⁶", "^6").replace("*", "")
+    text = text.replace(" ", "").replace("cells", "").replace("mcl", "ul")
+    text = re.sub(r"cumm|cmm|mm3|mm\^3|cu\.?mm", "ul", text)
+    text = text.replace("lakhs", "lakh")
+    return text or None
+
+
+class ReferenceTable:
+    """Bundled reference ranges indexed by normalized test name and alias"""
+    
+    def __init__(self, ranges: List = None):
+        ranges = ranges if ranges is not None else REFERENCE_RANGES
+        self.frame = pd.DataFrame(
+            [(name, unit, low, high) for name, unit, low, high, _, _ in ranges],
+            columns=["test", "unit", "low", "high"]
+        )
+        self.conversions = [dict(conv, **{unit: 1}) for _, unit, _, _, _, conv in ranges]
+        self._aliases = {}
+        for row, (name, _, _, _, aliases, _) in enumerate(ranges):
+            for alias in [name] + aliases:
+                self._aliases.setdefault(normalize_test(alias), row)
+    
+    @classmethod
+    def from_csv(cls, path: str) -> "ReferenceTable":
+        """
+        Ranges from a CSV with columns test, unit, low, high and optional aliases ("hb;hgb")
+        and conversions ("g/l=0.1;mmol/l=1.611", factors to the canonical unit)
+        """
+        table = pd.read_csv(path, dtype={"test": str, "unit": str, "aliases": str, "conversions": str})
+        ranges = []
+        for row in table.dropna(subset=["test", "unit"]).itertuples():
+            aliases = [a.strip() for a in str(getattr(row, "aliases", "") or "").split(";") if a.strip() and a != "nan"]
+            conversions = {}
+            for pair in str(getattr(row, "conversions", "") or "").split(";"):
+                if "=" in pair:
+                    unit, factor = pair.split("=", 1)
+                    conversions[normalize_unit(unit.strip())] = float(factor)
+            low = row.low if pd.notna(row.low) else -np.inf
+            high = row.high if pd.notna(row.high) else np.inf
+            ranges.append((row.test, normalize_unit(row.unit), float(low), float(high), aliases, conversions))
+        return cls(ranges)
+    
+    def lookup(self, name: str) -> int:
+        """Table row for a test name or alias, -1 when unknown"""
+        return self._aliases.get(normalize_test(name), -1)
+
+
+# ========== PARSING ==========
+
+def _parse_line(line: str) -> Optional[Dict[str, Any]]:
+    """One report line -> {test, value, comparator, unit, ref_low, ref_high}, or None"""
+    
+    text = re.sub(r"[|:\t()\[\]]", " ", line)
+    text = re.sub(r"(?<=\d),(?=\d{3}\b)", "", text).strip()
+    tokens = text.split()
+    split = next((i for i, token in enumerate(tokens) if _VALUE.match(token)), None)
+    if not split:
+        return None
+    
+    name = " ".join(tokens[:split]).strip(" -")
+    if not re.search(r"[A-Za-z]{2,}", name):
+        return None
+    
+    comparator, value = _VALUE.match(tokens[split]).groups()
+    rest = tokens[split + 1:]
+    
+    # Layouts: "value unit [flag] range" and "value flag unit range"
+    if rest and rest[0].lower() in _FLAGS:
+        rest = rest[1:]
+    
+    unit = None
+    if rest and _UNIT.match(rest[0]) and not _RANGE.match(rest[0]) and rest[0].lower() not in _FLAGS:
+        unit = rest[0]
+        rest = rest[1:]
+    
+    # The printed range follows the value (after an optional H/L flag)
+    if rest and rest[0].lower() in _FLAGS:
+        rest = rest[1:]
+    ref_low = ref_high = None
+    match = _RANGE.match(" ".join(rest))
+    if match:
+        if match.group(1):
+            ref_low, ref_high = float(match.group(1)), float(match.group(2))
+        elif match.group(3).startswith(">"):
+            ref_low, ref_high = float(match.group(4)), np.inf
+        else:
+            ref_low, ref_high = -np.inf, float(match.group(4))
+    
+    return {"test": name, "value": float(value), "comparator": comparator, "unit": unit,
+            "ref_low": ref_low, "ref_high": ref_high}
+
+
+def parse_report(text: str, reference: ReferenceTable) -> pd.DataFrame:
+    """
+    Report text -> one row per recognized result
+    Lines whose name is a known test are always kept; unknown tests only with a printed range
+    """
+    
+    rows = []
+    notes = []
+    for number, line in enumerate(text.splitlines(), start=1):
+        item = _parse_line(line)
+        if item is not None:
+            item["ref_row"] = reference.lookup(item["test"])
+            if item["ref_row"] >= 0 or item["ref_low"] is not None:
+                item["line"] = number
+                rows.append(item)
+                continue
+        if line.strip():
+            notes.append(line.strip())
+    
+    frame = pd.DataFrame(rows, columns=["test", "value", "comparator", "unit", "ref_low", "ref_high", "ref_row", "line"])
+    
+    # Object columns with None for missing entries (pandas 3 infers a string dtype holding NaN)
+    for column in ("comparator", "unit"):
+        frame[column] = pd.Series([v if isinstance(v, str) else None for v in frame[column]], index=frame.index, dtype=object)
+    frame.attrs["notes"] = notes
+    return frame
+
+
+def flag_results(results: pd.DataFrame, reference: ReferenceTable) -> pd.DataFrame:
+    """
+    Add status (low/normal/high/unknown) and canonical values to parsed results
+    The printed range is compared in the report's own unit; otherwise the value is converted
+    to the reference unit and compared against the bundled range
+    """
+    
+    flagged = results.copy()
+    rows = flagged["ref_row"].to_numpy(dtype=int)
+    known = rows >= 0
+    safe_rows = np.maximum(rows, 0)
+    
+    # Conversion factor from the report unit to the reference unit (NaN when not convertible);
+    # without a unit the value cannot be placed on the reference scale, so it is not flagged
+    units = [normalize_unit(unit) for unit in flagged["unit"]]
+    factors = np.array([
+        reference.conversions[row].get(unit) if ok and unit else np.nan
+        for row, unit, ok in zip(safe_rows, units, known)
+    ], dtype=float)
+    
+    value = flagged["value"].to_numpy(dtype=float)
+    printed = flagged["ref_low"].notna().to_numpy()
+    canonical = value * factors
+    
+    low = np.where(printed, flagged["ref_low"].to_numpy(dtype=float),
+                   np.where(known, reference.frame["low"].to_numpy()[safe_rows], np.nan))
+    high = np.where(printed, flagged["ref_high"].to_numpy(dtype=float),
+                    np.where(known, reference.frame["high"].to_numpy()[safe_rows], np.nan))
+    compared = np.where(printed, value, canonical)
+    
+    with np.errstate(invalid="ignore"):
+        status = np.select(
+            [np.isnan(compared) | np.isnan(low), compared < low, compared > high],
+            ["unknown", "low", "high"],
+            "normal"
+        )
+    
+    flagged["test_name"] = np.where(known, reference.frame["test"].to_numpy()[safe_rows], flagged["test"])
+    flagged["canonical_value"] = np.round(canonical, 3)
+    flagged["canonical_unit"] = np.where(known, reference.frame["unit"].to_numpy()[safe_rows], None)
+    flagged["range_low"] = low
+    flagged["range_high"] = high
+    flagged["range_source"] = np.where(printed, "report", np.where(known, "reference", None))
+    flagged["status"] = status
+    return flagged
+
+
+def _format_range(low: float, high: float) -> str:
+    if np.isnan(low):
+        return "-"
+    if np.isinf(high):
+        return f">= {low:g}"
+    if np.isinf(low) or low == 0:
+        return f"< {high:g}" if np.isinf(low) else f"0 - {high:g}"
+    return f"{low:g} - {high:g}"
+
+
+def summarize_results(flagged: pd.DataFrame) -> Dict[str, Any]:
+    """JSON-friendly summary of flagged results"""
+    records = []
+    for row in flagged.itertuples():
+        records.append({
+            "test": row.test_name,
+            "value": row.value,
+            "comparator": row.comparator,
+            "unit": row.unit,
+            "reference_range": _format_range(row.range_low, row.range_high) + (
+                f" {row.canonical_unit}" if row.range_source == "reference" and normalize_unit(row.unit) != row.canonical_unit else ""
+            ),
+            "range_source": row.range_source,
+            "status": row.status,
+            "line": int(row.line)
+        })
+    abnormal = [r for r in records if r["status"] in ("low", "high")]
+    return {
+        "tests": len(records),
+        "abnormal_count": len(abnormal),
+        "results": records,
+        "abnormal": abnormal,
+        "notes": flagged.attrs.get("notes", [])
+    }
+
+
+STATUS_LABELS = {"low": "🔻 Low", "high": "🔺 High", "normal": "✅ Normal", "unknown": "-"}
+
+
+def format_results(summary: Dict[str, Any], abnormal_only: bool = False) -> str:
+    """Markdown table of the results (or only the abnormal ones)"""
+    rows = summary["abnormal"] if abnormal_only else summary["results"]
+    if not rows:
+        return "All recognized values are within their reference ranges." if abnormal_only else "No lab values recognized."
+    
+    lines = ["| Test | Result | Unit | Reference Range | Status |", "|------|--------|------|-----------------|--------|"]
+    for r in rows:
+        lines.append(f"| {r['test']} | {r['comparator'] or ''}{r['value']:g} | {r['unit'] or '-'} | {r['reference_range']} | {STATUS_LABELS[r['status']]} |")
+    return "\n".join(lines)
+
+
+class ReportParser:
+    """Runs extraction and flagging over uploaded report files"""
+    
+    def __init__(self, reference: ReferenceTable = None):
+        self.reference = reference or ReferenceTable()
+    
+    @classmethod
+    def from_path(cls, path: Optional[str] = None) -> "ReportParser":
+        """Parser over a reference range CSV, or the bundled adult ranges when path is empty"""
+        return cls(ReferenceTable.from_csv(path) if path else ReferenceTable())
+    
+    def analyze_text(self, text: str) -> Optional[Dict[str, Any]]:
+        """Summary for report text, or None when no lab values were recognized"""
+        results = parse_report(text, self.reference)
+        if results.empty:
+            return None
+        return summarize_results(flag_results(results, self.reference))
+    
+    def analyze_files(self, files: List) -> Optional[Dict[str, Any]]:
+        """Summary over all uploaded reports, or None unless every file has a text layer"""
+        if not files:
+            return None
+        
+        texts = []
+        for file in files:
+            text = extract_text(file)
+            if text is None:
+                return None
+            texts.append(text)
+        
+        return self.analyze_text("\n".join(texts))
+    
+    @staticmethod
+    def summary_prompt(user_message: str, summary: Dict[str, Any]) -> str:
+        """Flow input with the structured results and the narrative report text instead of the raw report"""
+        # All narrative text (impressions, notes) is kept; the report itself is already bounded
+        # by file_preprocessing.MAX_EXTRACTED_CHARS
+        notes = "\n".join(summary["notes"])
+        prompt = (
+            f"{user_message}\n\n"
+            f"Lab results extracted from the report ({summary['tests']} tests, "
+            f"{summary['abnormal_count']} outside the reference range):\n\n"
+            f"{format_results(summary)}"
+        )
+        if notes:
+            prompt += f"\n\nOther text from the report:\n{notes}"
+        return prompt
\ No newline at end of file
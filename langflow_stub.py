@@ -0,0 +1,327 @@
+# langflow_stub.py - Local stand-in for the Langflow run API (benchmarks, load tests, offline runs)
+"""
+Langflow stub server
+Answers POST /api/v1/run/<flow> (JSON or multipart, optionally ?stream=true) and
+POST /api/v1/files/upload/<flow> like the hosted Langflow API, with configurable latency,
+answer size, error rate and response shape. Settings can be changed while it runs, per flow.
+The translator flow replies in the "[n] translation" format translation.py expects, marking
+each numbered segment as translated, so translate-once mode works against the stub.
+
+Usage:
+    python langflow_stub.py --port 7860 --latency-ms 800 --error-rate 0.05
+    (then point the *_URL secrets at http://127.0.0.1:7860/api/v1/run/<flow>)
+
+From Python:
+    stub = StubServer(latency_ms=50).start()
+    api = CloudLangflowAPI(stub.secrets())
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Dict, Any, List
+from urllib.parse import urlsplit, parse_qs
+
+
+# Secret name -> flow path segment used by secrets()
+FLOW_SECRETS = {
+    "QNA_AGENT_URL": "qna",
+    "REPORT_ANALYZER_URL": "report",
+    "PRESCRIPTION_ANALYZER_URL": "prescription",
+    "BILL_ANALYZER_URL": "bill",
+    "HOSPITAL_FINDER_URL": "hospitals",
+    "TRANSLATOR_URL": "translator"
+}
+
+# Where the answer text sits in the run response (each one is a path _extract_message knows,
+# except "unknown", which makes the client fall back to the raw JSON)
+SHAPES = ("standard", "direct", "output_message", "message", "result", "text", "unknown")
+
+DEFAULTS = {
+    "latency_ms": 200.0,        # mean time to answer
+    "jitter_ms": 50.0,          # uniform +/- spread around the mean
+    "response_chars": 1500,     # answer length
+    "padding_kb": 0,            # extra JSON (logs, artifacts) in each run response
+    "error_rate": 0.0,          # fraction of run requests answered with error_status
+    "error_status": 503,
+    "retry_after": None,        # Retry-After header on errors (seconds), if set
+    "shape": "standard",
+    "stream_chunks": 20         # token events per streamed answer
+}
+
+FILLER = ("Based on the information provided, the values are within the expected range for an adult. "
+          "Please discuss any new symptoms with your doctor. ")
+
+
+def answer_text(input_value: str, chars: int) -> str:
+    """Deterministic answer of about `chars` characters that echoes the start of the input"""
+    head = f"**Answer** to: {input_value[:60]}\n\n"
+    body = (FILLER * (chars // len(FILLER) + 1))[:max(0, chars - len(head))]
+    return head + body
+
+
+def translation_text(input_value: str) -> str:
+    """Translator flow reply: one "[n] translation" line per numbered segment of the prompt"""
+    segments = re.findall(r"^\[(\d+)\]\s?(.*)$", input_value, re.MULTILINE)
+    return "\n".join(f"[{n}] (translated) {segment}" for n, segment in segments)
+
+
+def shape_response(text: str, shape: str, padding_kb: int = 0) -> Dict[str, Any]:
+    """Run response with the answer placed according to `shape`"""
+    if shape == "standard":
+        data = {"outputs": [{"inputs": {}, "outputs": [{"results": {"message": {"text": text}}}]}]}
+    elif shape == "direct":
+        data = {"outputs": [{"results": {"message": {"text": text}}}]}
+    elif shape == "output_message":
+        data = {"outputs": [{"message": text}]}
+    elif shape == "message":
+        data = {"message": {"text": text}}
+    elif shape == "result":
+        data = {"result": {"text": text}}
+    elif shape == "text":
+        data = {"text": text}
+    else:
+        data = {"data": {"answer": text}}
+    
+    data["session_id"] = str(uuid.uuid4())
+    if padding_kb:
+        data["logs"] = ["x" * 1024 for _ in range(padding_kb)]
+    return data
+
+
+class _StubServer(ThreadingHTTPServer):
+    # Deep listen backlog so load-test bursts queue instead of being refused
+    request_queue_size = 512
+    daemon_threads = True
+
+
+class StubServer:
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, seed: Optional[int] = None, **settings):
+        """Settings (see DEFAULTS) apply to every flow until overridden with configure(flow=...)"""
+        unknown = set(settings) - set(DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown stub settings: {', '.join(sorted(unknown))}")
+        
+        self.host = host
+        self.port = port
+        self.settings = dict(DEFAULTS, **settings)
+        self.flow_settings = {}
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self.reset_stats()
+    
+    # ========== CONTROL ==========
+    
+    def configure(self, flow: Optional[str] = None, **settings):
+        """Change settings for every flow, or for one flow path segment (e.g. "qna")"""
+        unknown = set(settings) - set(DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown stub settings: {', '.join(sorted(unknown))}")
+        with self._lock:
+            if flow is None:
+                self.settings.update(settings)
+            else:
+                self.flow_settings.setdefault(flow, {}).update(settings)
+    
+    def reset_settings(self, **settings):
+        """Back to DEFAULTS (plus settings) for every flow, dropping per-flow overrides"""
+        with self._lock:
+            self.settings = dict(DEFAULTS, **settings)
+            self.flow_settings = {}
+    
+    def settings_for(self, flow: str) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.settings, **self.flow_settings.get(flow, {}))
+    
+    def reset_stats(self):
+        with self._lock:
+            self.requests = Counter()       # (flow, kind) where kind is run/stream/upload/error
+            self.bytes_received = Counter()  # flow -> request body bytes
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": {f"{flow}:{kind}": n for (flow, kind), n in sorted(self.requests.items())},
+                "bytes_received": dict(self.bytes_received)
+            }
+    
+    def _count(self, flow: str, kind: str, size: int = 0):
+        with self._lock:
+            self.requests[(flow, kind)] += 1
+            self.bytes_received[flow] += size
+    
+    # ========== LIFECYCLE ==========
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+    
+    def url(self, flow: str) -> str:
+        return f"{self.base_url}/api/v1/run/{flow}"
+    
+    def secrets(self, **extra) -> Dict[str, Any]:
+        """[api] settings pointing every flow at this stub (pass to CloudLangflowAPI(secrets))"""
+        secrets = {name: self.url(flow) for name, flow in FLOW_SECRETS.items()}
+        secrets.update({"APP_TOKEN": "stub-token", "ORG_ID": "stub-org"})
+        secrets.update(extra)
+        return secrets
+    
+    def start(self) -> "StubServer":
+        """Serve in a background thread; port 0 picks a free port"""
+        handler = type("StubHandler", (_StubHandler,), {"stub": self})
+        self._server = _StubServer((self.host, self.port), handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="langflow-stub", daemon=True).start()
+        return self
+    
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    
+    stub: StubServer = None
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, *args):
+        pass
+    
+    def do_POST(self):
+        parts = urlsplit(self.path)
+        segments = parts.path.strip("/").split("/")
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        
+        if segments[:3] == ["api", "v1", "files"] and len(segments) >= 5 and segments[3] == "upload":
+            flow = segments[4]
+            self.stub._count(flow, "upload", len(body))
+            self._send_json(200, {"flow_id": flow, "file_path": f"{flow}/{uuid.uuid4().hex}"})
+            return
+        
+        if segments[:3] != ["api", "v1", "run"] or len(segments) < 4:
+            self._send_json(404, {"detail": "Not Found"})
+            return
+        
+        flow = segments[3]
+        settings = self.stub.settings_for(flow)
+        stream = parse_qs(parts.query).get("stream") == ["true"]
+        
+        delay = max(0.0, settings["latency_ms"] + self.stub.random.uniform(-1, 1) * settings["jitter_ms"]) / 1000
+        
+        if self.stub.random.random() < settings["error_rate"]:
+            self.stub._count(flow, "error", len(body))
+            time.sleep(delay)
+            headers = {"Retry-After": str(settings["retry_after"])} if settings["retry_after"] is not None else {}
+            self._send_json(settings["error_status"], {"detail": "Stub error"}, headers)
+            return
+        
+        self.stub._count(flow, "stream" if stream else "run", len(body))
+        input_value = self._input_value(body)
+        if flow == "translator":
+            text = translation_text(input_value)
+        else:
+            text = answer_text(input_value, settings["response_chars"])
+        
+        if stream:
+            self._send_stream(text, delay, settings["stream_chunks"])
+            return
+        
+        time.sleep(delay)
+        self._send_json(200, shape_response(text, settings["shape"], settings["padding_kb"]))
+    
+    def _input_value(self, body: bytes) -> str:
+        """input_value from a JSON or multipart run request"""
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            try:
+                return str(json.loads(body).get("input_value", ""))
+            except (ValueError, AttributeError):
+                return ""
+        
+        marker = b'name="input_value"\r\n\r\n'
+        start = body.find(marker)
+        if start < 0:
+            return ""
+        start += len(marker)
+        return body[start:body.find(b"\r\n--", start)].decode("utf-8", "replace")
+    
+    def _send_json(self, status: int, data: Dict[str, Any], headers: Dict[str, str] = None):
+        out = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(out)
+    
+    def _send_stream(self, text: str, delay: float, chunks: int):
+        """SSE token events spread over `delay`, then the end event"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        
+        def write(event: Dict[str, Any]):
+            data = f"data: {json.dumps(event)}\n\n".encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+        
+        size = max(1, len(text) // max(1, chunks))
+        pieces = [text[i:i + size] for i in range(0, len(text), size)]
+        for piece in pieces:
+            time.sleep(delay / len(pieces))
+            write({"event": "token", "data": {"chunk": piece}})
+        write({"event": "end", "data": {"result": shape_response(text, "standard")}})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Local Langflow run API stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7860)
+    parser.add_argument("--latency-ms", type=float, default=DEFAULTS["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=DEFAULTS["jitter_ms"])
+    parser.add_argument("--response-chars", type=int, default=DEFAULTS["response_chars"])
+    parser.add_argument("--padding-kb", type=int, default=DEFAULTS["padding_kb"])
+    parser.add_argument("--error-rate", type=float, default=DEFAULTS["error_rate"])
+    parser.add_argument("--error-status", type=int, default=DEFAULTS["error_status"])
+    parser.add_argument("--shape", choices=SHAPES, default=DEFAULTS["shape"])
+    args = parser.parse_args(argv)
+    
+    stub = StubServer(
+        args.host, args.port,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, response_chars=args.response_chars,
+        padding_kb=args.padding_kb, error_rate=args.error_rate, error_status=args.error_status,
+        shape=args.shape
+    ).start()
+    
+    print(f"Langflow stub listening on {stub.base_url}")
+    for name, url in stub.secrets().items():
+        print(f'{name} = "{url}"')
+    
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,414 @@
+# load_test.py - Concurrent browser sessions against one `streamlit run main_cloud.py` server
+"""
+Load test for the Streamlit app
+Starts one `streamlit run main_cloud.py` server, with its flows answered by
+langflow_stub.StubServer, and opens concurrent sessions against it over Streamlit's websocket
+protocol, the way browser tabs do. Each virtual user loads the app, picks one of the five tools
+in the sidebar, fills in the form and submits it, then closes the tab and opens a new one. All
+sessions share the server process, its script threads and its st.cache_resource client, so the
+numbers show how many concurrent sessions one Streamlit process holds and what each costs.
+
+Concurrency is ramped through the given levels. For each level the report has session
+throughput, submit latency percentiles, queueing delay (submit latency above the first level),
+sessions that fell back to the English answer, and the server process's RSS (at the start of the
+level, its peak and after the sessions closed). A warm-up session runs before the first level so
+the script's imports and the client are not counted.
+
+Usage:
+    python load_test.py --users 1,5,10,25 --sessions 3 --latency-ms 800
+    python load_test.py --users 10 --tools qna,hospital --language Hindi --output load.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Optional, Dict, Any, List
+
+import numpy as np
+
+from benchmark import RssSampler, rss_mb
+from langflow_stub import StubServer
+
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main_cloud.py")
+
+# Page, input widget kind, submit button label and a sample input per tool
+TOOLS = {
+    "qna": ("🧠 Medical Q&A", "text_area", "🔍 Get Medical Answer",
+            "What are the early signs of type 2 diabetes?"),
+    "report": ("📄 Report Analyzer", "text_area", "🔬 Analyze Report",
+               "Hemoglobin 10.2 g/dL, TSH 6.5 uIU/mL - explain these results"),
+    "hospital": ("🏥 Hospital Finder", "text_input", "🔍 Find Hospitals",
+                 "Cardiac hospital with 24x7 emergency"),
+    "medicine": ("💊 Medicine Explainer", "text_area", "🔬 Explain Medicines",
+                 "Ecosprin 75 once daily and Pan 40 before breakfast"),
+    "bill": ("💰 Bill Auditor", "text_area", "🔍 Analyze Bill",
+             "Room rent 3 days Rs 4500 per day, CBC Rs 1200 - check for overcharges")
+}
+
+NAVIGATION_LABEL = "Navigate to:"
+LANGUAGE_LABEL = "🌍 Response Language"
+
+# Timeout for one script run (a slow stub plus retries can take a while) and for server startup
+RUN_TIMEOUT = 300
+STARTUP_TIMEOUT = 60
+
+
+# ========== STREAMLIT SERVER ==========
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class AppServer:
+    """`streamlit run main_cloud.py` in a scratch directory whose .streamlit/secrets.toml points at the stub"""
+    
+    def __init__(self, secrets: Dict[str, Any]):
+        self.secrets = secrets
+        self.port = _free_port()
+        self.process = None
+        self._workdir = None
+        self._log = None
+    
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+    
+    def _log_tail(self, chars: int = 2000) -> str:
+        self._log.flush()
+        self._log.seek(0)
+        return self._log.read().decode("utf-8", "replace")[-chars:]
+    
+    def start(self):
+        self._workdir = tempfile.TemporaryDirectory(prefix="load-test-")
+        os.makedirs(os.path.join(self._workdir.name, ".streamlit"))
+        with open(os.path.join(self._workdir.name, ".streamlit", "secrets.toml"), "w", encoding="utf-8") as out:
+            out.write("[api]\n")
+            for key, value in self.secrets.items():
+                out.write(f"{key} = {json.dumps(str(value))}\n")
+        
+        self._log = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", APP_PATH,
+             "--server.headless", "true", "--server.address", "127.0.0.1", "--server.port", str(self.port),
+             "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+            cwd=self._workdir.name, stdout=self._log, stderr=subprocess.STDOUT
+        )
+        
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"streamlit exited with {self.process.returncode}:\n{self._log_tail()}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1) as response:
+                    if response.status == 200:
+                        return self
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"streamlit did not start within {STARTUP_TIMEOUT}s")
+    
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self._log:
+            self._log.close()
+        if self._workdir:
+            self._workdir.cleanup()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# ========== BROWSER SESSION ==========
+
+class BrowserSession:
+    """
+    One browser tab on the websocket stream: asks for a script run with the current widget
+    values and collects the elements it draws until the run finishes
+    """
+    
+    def __init__(self, port: int):
+        self.url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        self.websocket = None
+        self.widgets = {}
+        self.values = {}
+        self.alerts = []
+        self.exceptions = []
+    
+    async def __aenter__(self):
+        import websockets
+        self.websocket = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None)
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.websocket.close()
+    
+    def widget(self, kind: str, label: Optional[str] = None):
+        """First widget of this kind drawn by the last run (with this label, if given)"""
+        for widget_kind, proto in self.widgets.values():
+            if widget_kind == kind and (label is None or proto.label == label):
+                return proto
+        raise LookupError(f"No {kind} {label or ''} on the page".replace("  ", " "))
+    
+    def set_value(self, proto, value: str):
+        self.values[proto.id] = value
+    
+    async def run(self, trigger: Optional[str] = None):
+        """Rerun the script with the widget values set so far (and a button click), wait until it finishes"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.page_script_hash = ""
+        for widget_id, value in self.values.items():
+            state = message.rerun_script.widget_states.widgets.add()
+            state.id = widget_id
+            state.string_value = value
+        if trigger:
+            state = message.rerun_script.widget_states.widgets.add()
+            state.id = trigger
+            state.trigger_value = True
+        await self.websocket.send(message.SerializeToString())
+        
+        self.widgets, self.alerts, self.exceptions = {}, [], []
+        while True:
+            reply = ForwardMsg()
+            reply.ParseFromString(await self.websocket.recv())
+            kind = reply.WhichOneof("type")
+            if kind == "delta" and reply.delta.WhichOneof("type") == "new_element":
+                element = reply.delta.new_element
+                element_kind = element.WhichOneof("type")
+                proto = getattr(element, element_kind)
+                if element_kind == "alert":
+                    self.alerts.append(proto)
+                elif element_kind == "exception":
+                    self.exceptions.append(proto)
+                elif getattr(proto, "id", ""):
+                    self.widgets[proto.id] = (element_kind, proto)
+            elif kind == "script_finished":
+                if reply.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    # st.rerun(): the next run follows on its own
+                    self.widgets, self.alerts, self.exceptions = {}, [], []
+                    continue
+                if reply.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("main_cloud.py failed to compile")
+                break
+        self.values = {widget_id: value for widget_id, value in self.values.items() if widget_id in self.widgets}
+        
+        if self.exceptions:
+            raise RuntimeError(self.exceptions[0].message)
+
+
+# ========== VIRTUAL USERS ==========
+
+class VirtualUser:
+    """One simulated patient: a new browser session per visit, one tool submission per session"""
+    
+    def __init__(self, user_id: int, port: int, tools: List[str], language: str = "English"):
+        self.user_id = user_id
+        self.port = port
+        self.tools = itertools.cycle(tools[user_id % len(tools):] + tools[:user_id % len(tools)])
+        self.language = language
+        self.visits = 0
+    
+    async def _run(self, session: BrowserSession, timings: Dict[str, float], step: str, trigger: Optional[str] = None):
+        started = time.perf_counter()
+        await asyncio.wait_for(session.run(trigger), RUN_TIMEOUT)
+        timings[step] = timings.get(step, 0.0) + time.perf_counter() - started
+    
+    async def session(self) -> Dict[str, Any]:
+        """Load the app, open a tool, submit its form; per-step wall times"""
+        from streamlit.proto.Alert_pb2 import Alert
+        
+        tool = next(self.tools)
+        page, widget, button, text = TOOLS[tool]
+        self.visits += 1
+        timings = {}
+        record = {"user": self.user_id, "tool": tool, "success": False, "error": None}
+        
+        record["started_at"] = time.time()
+        started = time.perf_counter()
+        try:
+            async with BrowserSession(self.port) as session:
+                await self._run(session, timings, "load")
+                
+                # The navigation radio's identity follows the selected page, so a switch can take two reruns
+                for _ in range(3):
+                    if any(kind == "button" and proto.label == button for kind, proto in session.widgets.values()):
+                        break
+                    session.set_value(session.widget("radio", NAVIGATION_LABEL), page)
+                    await self._run(session, timings, "navigate")
+                
+                if self.language != "English":
+                    picker = session.widget("selectbox", LANGUAGE_LABEL)
+                    session.set_value(picker, next(o for o in picker.options if o.startswith(self.language)))
+                    await self._run(session, timings, "navigate")
+                
+                session.set_value(session.widget(widget), f"{text} (user {self.user_id}, visit {self.visits})")
+                await self._run(session, timings, "submit", trigger=session.widget("button", button).id)
+                
+                errors = [alert.body for alert in session.alerts if alert.format == Alert.ERROR]
+                record["success"] = not errors
+                if errors:
+                    record["error"] = errors[0]
+                
+                # The localized leg failed and the page showed the English answer instead
+                fallback = [alert.body for alert in session.alerts
+                            if alert.format == Alert.WARNING and "Showing English" in alert.body]
+                record["degraded"] = fallback[0] if fallback else None
+        except Exception as e:
+            record["error"] = str(e) or type(e).__name__
+        
+        record["session_s"] = time.perf_counter() - started
+        record["finished_at"] = time.time()
+        record.update({f"{step}_s": seconds for step, seconds in timings.items()})
+        return record
+
+    async def visit(self, sessions: int, delay: float) -> List[Dict[str, Any]]:
+        await asyncio.sleep(delay)
+        return [await self.session() for _ in range(sessions)]
+
+
+async def _run_users(users: int, sessions: int, port: int, tools: List[str], language: str,
+                     ramp_seconds: float) -> List[Dict[str, Any]]:
+    visits = [
+        VirtualUser(user_id, port, tools, language).visit(sessions, ramp_seconds * user_id / max(1, users))
+        for user_id in range(users)
+    ]
+    return [record for records in await asyncio.gather(*visits) for record in records]
+
+
+def run_level(users: int, sessions: int, server: AppServer, tools: List[str],
+              language: str = "English", ramp_seconds: float = 2.0) -> Dict[str, Any]:
+    """
+    users concurrent browser sessions against the one server, each user running `sessions`
+    sessions back to back; starts spread over ramp_seconds. RSS is the server process's
+    """
+    with RssSampler(pid=server.pid) as memory:
+        records = asyncio.run(_run_users(users, sessions, server.port, tools, language, ramp_seconds))
+    # Sessions are closed; give the server a moment to drop them before reading what it kept
+    time.sleep(1.0)
+    end_mb = rss_mb(server.pid)
+    
+    elapsed = (max(r["finished_at"] for r in records) - min(r["started_at"] for r in records)) if records else 0.0
+    ok = [r for r in records if r["success"]]
+    submit = np.array([r["submit_s"] for r in ok if "submit_s" in r]) * 1000
+    session = np.array([r["session_s"] for r in ok]) * 1000
+    
+    def percentiles(values: np.ndarray) -> Dict[str, Optional[float]]:
+        if not len(values):
+            return {"p50": None, "p95": None, "p99": None}
+        return {f"p{q}": round(float(np.percentile(values, q)), 1) for q in (50, 95, 99)}
+    
+    def megabytes(value: Optional[float]) -> Optional[float]:
+        return round(value, 1) if value is not None else None
+    
+    return {
+        "users": users,
+        "sessions": len(records),
+        "failed": len(records) - len(ok),
+        "degraded": sum(1 for r in ok if r.get("degraded")),
+        "errors": sorted({r["error"] for r in records if r["error"]})[:5],
+        "degraded_reasons": sorted({r["degraded"] for r in ok if r.get("degraded")})[:5],
+        "elapsed_s": round(elapsed, 2),
+        "sessions_per_min": round(len(ok) / elapsed * 60, 1) if elapsed else None,
+        "submit_ms": percentiles(submit),
+        "session_ms": percentiles(session),
+        "per_tool_submit_p50_ms": {
+            tool: round(float(np.median([r["submit_s"] for r in ok if r["tool"] == tool and "submit_s" in r])) * 1000, 1)
+            for tool in sorted({r["tool"] for r in ok if "submit_s" in r})
+        },
+        "server_rss_mb": {
+            "start": megabytes(memory.start_mb),
+            "peak": megabytes(memory.peak_mb),
+            "end": megabytes(end_mb)
+        }
+    }
+
+
+def run_load_test(levels: List[int], sessions: int = 2, tools: List[str] = None, language: str = "English",
+                  ramp_seconds: float = 2.0, **stub_settings) -> Dict[str, Any]:
+    """Ramp through the concurrency levels against one server and a fresh stub; queueing delay is relative to the first level"""
+    
+    tools = tools or list(TOOLS)
+    stub_settings = dict({"latency_ms": 500.0, "jitter_ms": 100.0}, **stub_settings)
+    results = []
+    with StubServer(seed=0, **stub_settings) as stub, AppServer(stub.secrets()) as server:
+        idle_mb = rss_mb(server.pid)
+        warmup = run_level(1, 1, server, tools[:1], language, 0.0)
+        if warmup["failed"]:
+            raise RuntimeError(f"Warm-up session failed: {warmup['errors']}")
+        
+        for users in levels:
+            result = run_level(users, sessions, server, tools, language, ramp_seconds)
+            baseline = results[0]["submit_ms"]["p50"] if results else result["submit_ms"]["p50"]
+            if baseline is not None and result["submit_ms"]["p50"] is not None:
+                result["queueing_delay_ms"] = {
+                    q: round(max(0.0, value - baseline), 1) if value is not None else None
+                    for q, value in result["submit_ms"].items()
+                }
+            results.append(result)
+            print(f"{users:>5} users  {result['sessions_per_min']:>8} sessions/min  "
+                  f"submit p50 {result['submit_ms']['p50']} ms  p95 {result['submit_ms']['p95']} ms  "
+                  f"queueing p95 {result.get('queueing_delay_ms', {}).get('p95')} ms  "
+                  f"server RSS {result['server_rss_mb']['start']} -> peak {result['server_rss_mb']['peak']} MB  "
+                  f"failed {result['failed']}  English fallback {result['degraded']}", flush=True)
+    
+    return {
+        "settings": {"sessions_per_user": sessions, "tools": tools, "language": language,
+                     "ramp_seconds": ramp_seconds, "stub": stub_settings},
+        "server_idle_rss_mb": round(idle_mb, 1) if idle_mb is not None else None,
+        "server_warm_rss_mb": warmup["server_rss_mb"]["end"],
+        "levels": results
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Ramp concurrent browser sessions through one main_cloud.py server")
+    parser.add_argument("--users", default="1,5,10", help="Comma-separated concurrency levels")
+    parser.add_argument("--sessions", type=int, default=2, help="Sessions per virtual user at each level")
+    parser.add_argument("--tools", default=",".join(TOOLS), help=f"Comma-separated: {', '.join(TOOLS)}")
+    parser.add_argument("--language", default="English", help="Response language picked on each page")
+    parser.add_argument("--ramp-seconds", type=float, default=2.0, help="Spread user start times over this long")
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="Stub mean latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stub error rate")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    args = parser.parse_args(argv)
+    
+    tools = [tool.strip() for tool in args.tools.split(",") if tool.strip()]
+    unknown = [tool for tool in tools if tool not in TOOLS]
+    if unknown:
+        parser.error(f"Unknown tool(s): {', '.join(unknown)}")
+    
+    report = run_load_test(
+        [int(n) for n in args.users.split(",")], args.sessions, tools, args.language, args.ramp_seconds,
+        latency_ms=args.latency_ms, error_rate=args.error_rate
+    )
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            json.dump(report, out, indent=2)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
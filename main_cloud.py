@@ -1,4 +1,7 @@
 # main_cloud.py - CHRONOCHECK (Bilingual Version)
+import hashlib
+import json
+import pandas as pd
 import streamlit as st
 
 # ========== API INTEGRATION ==========
@@ -8,24 +11,25 @@ class DummyAPI:
     def qna_medical(self, question):
         return {"success": True, "message": f"**Answer:** This would come from your Q&A Langflow flow.\n\nQuestion: {question}"}
     
-    def analyze_report(self, user_message, uploaded_files=None):
+    def analyze_report(self, user_message, uploaded_files=None, analysis_type=None, language=None):
         if uploaded_files:
             file_names = ", ".join([f.name for f in uploaded_files])
             return {"success": True, "message": f"**Report Analysis:** Analysis for uploaded file(s): {file_names}\n\nAI analysis of your medical report.\n\nMessage: {user_message}"}
         else:
             return {"success": True, "message": f"**Report Analysis:** {user_message}"}
     
-    def find_hospitals(self, query, location=""):
+    def find_hospitals(self, query, location="", specializations=None, phrase=False, language=None):
         return {"success": True, "message": f"**Hospital Recommendations:**\n\nLooking for: {query} in {location if location else 'your area'}"}
     
-    def explain_medicines(self, user_message, uploaded_files=None):
+    def explain_medicines(self, user_message, uploaded_files=None, check_interactions=True):
         if uploaded_files:
             file_names = ", ".join([f.name for f in uploaded_files])
             return {"success": True, "message": f"**Medicine Explanation:** Analysis for uploaded file(s): {file_names}\n\nAI analysis of your prescription.\n\nMessage: {user_message}"}
         else:
             return {"success": True, "message": f"**Medicine Explanation:** {user_message}"}
     
-    def analyze_bill(self, user_message, uploaded_files=None):
+    def analyze_bill(self, user_message, uploaded_files=None, quick_audit=False, check_overcharges=True, check_duplicates=True,
+                     language=None):
         audit_report = """**Medical Billing Audit Report**
 
 | Bill Item | Billed Price (₹) | Standard/Ref Price (₹) | Potential Overcharge (₹) | Auditor's Expert Analysis |
@@ -45,11 +49,28 @@ The bill is inflated due to overcharging for certain items."""
             "message": audit_report,
             "demo_mode": True
         }
+    
+    def call_bilingual(self, method_name, message, english_message=None, *args, timeout=None, stream=False, language=None,
+                       localized_options=None):
+        method = getattr(self, method_name)
+        localized = method(message, *args, **(localized_options or {}))
+        english = method(english_message, *args) if english_message is not None else None
+        return {"success": localized.get("success"), "localized": localized, "english": english}
 
-# Now try to import the real API
-try:
+# Build the real API once per process and share it across sessions and reruns.
+# The secrets fingerprint is the cache key, so the client is rebuilt only when secrets change.
+@st.cache_resource(max_entries=1, show_spinner=False)
+def get_api(secrets_fingerprint: str):
     from cloud_langflow_api import CloudLangflowAPI
-    api = CloudLangflowAPI()
+    return CloudLangflowAPI()
+
+def secrets_fingerprint() -> str:
+    api_secrets = {key: str(value) for key, value in st.secrets["api"].items()}
+    return hashlib.sha256(json.dumps(api_secrets, sort_keys=True).encode()).hexdigest()
+
+# Now try to load the real API
+try:
+    api = get_api(secrets_fingerprint())
 except Exception as e:
     st.error(f"Failed to initialize API: {str(e)}. Using demo mode.")
     api = DummyAPI()
@@ -237,15 +258,24 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ========== BILINGUAL RESPONSE COMPONENT ==========
-def display_bilingual_response(selected_language: str, response_text: str, english_response: str = None):
+def render_message(message) -> str:
+    """Render a complete message, or stream it progressively if it is a chunk generator"""
+    if isinstance(message, str):
+        st.markdown(message)
+        return message
+    return st.write_stream(message)
+
+def display_bilingual_response(selected_language: str, response_text, english_response=None):
     """
     Display response with language toggle
     If english_response is None, it means we only have one response
+    response_text may be a chunk generator (streaming); english_response may be
+    a callable returning the English result, resolved after the first tab renders
     """
     
     # If selected language is English, just show the response normally
     if selected_language == "English":
-        st.markdown(response_text)
+        render_message(response_text)
         return
     
     # For non-English languages, provide toggle between languages
@@ -255,9 +285,14 @@ def display_bilingual_response(selected_language: str, response_text: str, engli
     tab1, tab2 = st.tabs([f"🌐 {selected_language}", "🇬🇧 English"])
     
     with tab1:
-        st.markdown(response_text)
+        response_text = render_message(response_text)
     
     with tab2:
+        if callable(english_response):
+            with st.spinner("Loading English version..."):
+                english_result = english_response()
+            english_response = english_result["message"] if english_result.get("success") else None
+        
         if english_response:
             st.markdown(english_response)
         else:
@@ -265,6 +300,28 @@ def display_bilingual_response(selected_language: str, response_text: str, engli
             st.info("English version not available. Showing original response.")
             st.markdown(response_text)
 
+def split_bilingual_results(results: dict):
+    """
+    Unpack call_bilingual output into (result, english_response)
+    english_response is the English message, None, or a callable when streaming
+    If only the selected-language call failed, fall back to the English answer
+    """
+    result = results["localized"]
+    english_result = results.get("english")
+    
+    if callable(english_result):
+        if result.get("success"):
+            return result, english_result
+        english_result = english_result()
+    
+    english_response = english_result["message"] if english_result and english_result.get("success") else None
+    
+    if not result.get("success") and english_response:
+        st.warning(f"⚠️ Translated response unavailable ({result.get('error', 'Unknown error')}). Showing English.")
+        return english_result, english_response
+    
+    return result, english_response
+
 # ========== LANGUAGE SELECTOR COMPONENT ==========
 def language_selector_component(key_suffix=""):
     """Reusable language selector for all agents"""
@@ -296,6 +353,9 @@ def language_selector_component(key_suffix=""):
 if 'selected_tool' not in st.session_state:
     st.session_state.selected_tool = "📊 Dashboard"
 
+if 'stream_responses' not in st.session_state:
+    st.session_state.stream_responses = True
+
 # ========== SIDEBAR ==========
 with st.sidebar:
     # App Name & Tagline
@@ -309,6 +369,11 @@ with st.sidebar:
     # Show connection status
     if api and not isinstance(api, DummyAPI):
         st.sidebar.success("✅ Connected to Cloud Langflow")
+        st.sidebar.caption(f"API client builds: {type(api).build_count}")
+        
+        for flow_key, breaker in api.circuit_metrics().items():
+            if breaker["state"] != "closed":
+                st.sidebar.warning(f"⚠️ {api.endpoints[flow_key]['flow_name']} unavailable - using demo responses")
     
     st.markdown("---")
     
@@ -321,6 +386,8 @@ with st.sidebar:
         "💊 Medicine Explainer",
         "💰 Bill Auditor"
     ]
+    if api and not isinstance(api, DummyAPI):
+        page_options.append("📈 Admin Metrics")
     
     selected_page = st.radio(
         "Navigate to:",
@@ -330,6 +397,13 @@ with st.sidebar:
     )
     
     st.session_state.selected_tool = selected_page
+    
+    st.markdown("---")
+    st.toggle(
+        "⚡ Stream responses",
+        key="stream_responses",
+        help="Show answers as they are generated instead of waiting for the full response"
+    )
 
 # ========== DASHBOARD PAGE ==========
 if st.session_state.selected_tool == "📊 Dashboard":
@@ -492,13 +566,15 @@ elif st.session_state.selected_tool == "🧠 Medical Q&A":
                 elif expertise == "Professional":
                     english_question += "\n\nPlease provide a detailed, professional-level explanation with complete medical terminology."
                 
-                # Get response in selected language
-                result = api.qna_medical(enhanced_question)
-                
-                # Get English response if language is not English
-                english_result = None
-                if language != "English" and result.get("success"):
-                    english_result = api.qna_medical(english_question)
+                # Get selected-language and English responses concurrently
+                results = api.call_bilingual(
+                    "qna_medical",
+                    enhanced_question,
+                    english_question if language != "English" else None,
+                    stream=st.session_state.stream_responses,
+                    language=language
+                )
+                result, english_response = split_bilingual_results(results)
 
                 st.markdown("---")
                 
@@ -512,15 +588,8 @@ elif st.session_state.selected_tool == "🧠 Medical Q&A":
                     
                     st.markdown(f"**Response Level:** {expertise}")
                     
-                    # Display bilingual response
-                    if language == "English":
-                        st.markdown(result["message"])
-                    else:
-                        display_bilingual_response(
-                            language, 
-                            result["message"],
-                            english_result["message"] if english_result and english_result.get("success") else None
-                        )
+                    # Display bilingual response (streams progressively when enabled)
+                    display_bilingual_response(language, result["message"], english_response)
                     
                     if result.get("demo_mode"):
                         st.markdown('<div class="demo-mode">⚠️ Demo Mode: Using sample response</div>', unsafe_allow_html=True)
@@ -554,7 +623,7 @@ elif st.session_state.selected_tool == "📄 Report Analyzer":
         for file in uploaded_files:
             st.markdown(f"""
             <div class="file-card">
-                📄 {file.name} ({(len(file.getvalue()) / 1024):.1f} KB)
+                📄 {file.name} ({(file.size / 1024):.1f} KB)
             </div>
             """, unsafe_allow_html=True)
     
@@ -582,16 +651,25 @@ elif st.session_state.selected_tool == "📄 Report Analyzer":
                 if language != "English":
                     analysis_msg += f"\n\nIMPORTANT: Provide the complete analysis in {language} language only."
                 
-                # Get response in selected language
-                result = api.analyze_report(analysis_msg, uploaded_files)
-                
-                # Get English response if language is not English
-                english_result = None
-                if language != "English" and result.get("success"):
+                english_analysis_msg = None
+                if language != "English":
                     english_analysis_msg = f"{analysis_type}"
                     if additional_notes:
                         english_analysis_msg += f" | Notes: {additional_notes}"
-                    english_result = api.analyze_report(english_analysis_msg, uploaded_files)
+                
+                # Get selected-language and English responses concurrently
+                results = api.call_bilingual(
+                    "analyze_report",
+                    analysis_msg,
+                    english_analysis_msg,
+                    uploaded_files,
+                    analysis_type,
+                    stream=st.session_state.stream_responses,
+                    language=language,
+                    # "Abnormal Values Only" is built locally in English; the selected-language leg translates it
+                    localized_options={"language": language} if language != "English" else None
+                )
+                result, english_response = split_bilingual_results(results)
                 
                 st.markdown("---")
                 
@@ -599,15 +677,14 @@ elif st.session_state.selected_tool == "📄 Report Analyzer":
                     st.success("✅ Analysis Complete!")
                     st.markdown("### 📋 Analysis Results")
                     
-                    # Display bilingual response
-                    if language == "English":
-                        st.markdown(result["message"])
-                    else:
-                        display_bilingual_response(
-                            language,
-                            result["message"],
-                            english_result["message"] if english_result and english_result.get("success") else None
-                        )
+                    # Display bilingual response (streams progressively when enabled)
+                    display_bilingual_response(language, result["message"], english_response)
+                    
+                    # Lab values extracted and flagged locally against reference ranges
+                    lab_results = result.get("lab_results")
+                    if lab_results:
+                        with st.expander(f"🧪 Lab values: {lab_results['abnormal_count']} of {lab_results['tests']} outside the reference range"):
+                            st.dataframe(pd.DataFrame(lab_results["results"]), use_container_width=True, hide_index=True)
                     
                     if result.get("demo_mode"):
                         st.markdown('<div class="demo-mode">⚠️ Demo Mode: Using sample response</div>', unsafe_allow_html=True)
@@ -652,24 +729,24 @@ elif st.session_state.selected_tool == "🏥 Hospital Finder":
             st.warning("⚠️ Please enter what medical service you need")
         else:
             with st.spinner(f"🏥 Searching hospitals in {language}..."):
-                # Build search query with language instruction
-                search_query = f"Find hospitals for: {query} in {location}"
-                if specializations:
-                    search_query += f" specializing in {', '.join(specializations)}"
-                
+                # Both legs search for the user's query; only the selected-language leg has local
+                # matches phrased by the flow, in that language (the English leg shows them as a table)
+                localized_options = None
                 if language != "English":
-                    search_query += f"\n\nIMPORTANT: Provide the complete response in {language} language only."
-                
-                # Get response in selected language
-                result = api.find_hospitals(search_query, location)
+                    localized_options = {"phrase": True, "language": language}
                 
-                # Get English response if language is not English
-                english_result = None
-                if language != "English" and result.get("success"):
-                    english_search_query = f"Find hospitals for: {query} in {location}"
-                    if specializations:
-                        english_search_query += f" specializing in {', '.join(specializations)}"
-                    english_result = api.find_hospitals(english_search_query, location)
+                # Get selected-language and English responses concurrently
+                results = api.call_bilingual(
+                    "find_hospitals",
+                    query,
+                    query if language != "English" else None,
+                    location,
+                    specializations,
+                    stream=st.session_state.stream_responses,
+                    language=language,
+                    localized_options=localized_options
+                )
+                result, english_response = split_bilingual_results(results)
                 
                 st.markdown("---")
                 
@@ -677,15 +754,13 @@ elif st.session_state.selected_tool == "🏥 Hospital Finder":
                     st.success("✅ Search Complete!")
                     st.markdown("### 🏥 Recommended Hospitals")
                     
-                    # Display bilingual response
-                    if language == "English":
-                        st.markdown(result["message"])
-                    else:
-                        display_bilingual_response(
-                            language,
-                            result["message"],
-                            english_result["message"] if english_result and english_result.get("success") else None
-                        )
+                    # Display bilingual response (streams progressively when enabled)
+                    display_bilingual_response(language, result["message"], english_response)
+                    
+                    # Structured matches from the local hospital directory
+                    if result.get("hospitals") and not result.get("local_index"):
+                        with st.expander(f"📋 Hospital directory: {len(result['hospitals'])} matches"):
+                            st.dataframe(pd.DataFrame(result["hospitals"]), use_container_width=True, hide_index=True)
                     
                     if result.get("demo_mode"):
                         st.markdown('<div class="demo-mode">⚠️ Demo Mode: Using sample response</div>', unsafe_allow_html=True)
@@ -717,7 +792,7 @@ elif st.session_state.selected_tool == "💊 Medicine Explainer":
         for file in uploaded_files:
             st.markdown(f"""
             <div class="file-card">
-                💊 {file.name} ({(len(file.getvalue()) / 1024):.1f} KB)
+                💊 {file.name} ({(file.size / 1024):.1f} KB)
             </div>
             """, unsafe_allow_html=True)
     
@@ -762,14 +837,19 @@ elif st.session_state.selected_tool == "💊 Medicine Explainer":
                 if language != "English":
                     analysis_msg += f"\n\nIMPORTANT: Provide the complete analysis in {language} language only."
                 
-                # Get response in selected language
-                result = api.explain_medicines(analysis_msg, uploaded_files)
+                english_analysis_msg = " | ".join(analysis_parts) if language != "English" else None
                 
-                # Get English response if language is not English
-                english_result = None
-                if language != "English" and result.get("success"):
-                    english_analysis_msg = " | ".join(analysis_parts)
-                    english_result = api.explain_medicines(english_analysis_msg, uploaded_files)
+                # Get selected-language and English responses concurrently
+                results = api.call_bilingual(
+                    "explain_medicines",
+                    analysis_msg,
+                    english_analysis_msg,
+                    uploaded_files,
+                    check_interactions,
+                    stream=st.session_state.stream_responses,
+                    language=language
+                )
+                result, english_response = split_bilingual_results(results)
                 
                 st.markdown("---")
                 
@@ -777,29 +857,34 @@ elif st.session_state.selected_tool == "💊 Medicine Explainer":
                     st.success("✅ Analysis Complete!")
                     st.markdown("### 💊 Medicine Analysis")
                     
-                    # Display bilingual response
-                    if language == "English":
-                        st.markdown(result["message"])
-                    else:
-                        display_bilingual_response(
-                            language,
-                            result["message"],
-                            english_result["message"] if english_result and english_result.get("success") else None
-                        )
+                    # Display bilingual response (streams progressively when enabled)
+                    display_bilingual_response(language, result["message"], english_response)
+                    
+                    # Interactions and generic names from the local drug tables
+                    medicine_check = result.get("medicine_check") or {}
+                    
+                    if medicine_check.get("interactions"):
+                        with st.expander(f"⚠️ Drug Interactions ({len(medicine_check['interactions'])} found)", expanded=True):
+                            for finding in medicine_check["interactions"]:
+                                st.markdown(f"**{finding['severity'].title()}** · {' + '.join(finding['drugs'])}: {finding['description']}")
                     
                     if include_generics and not result.get("demo_mode"):
                         with st.expander("💰 Generic Alternatives Information"):
-                            st.markdown("""
-                            **Common Generic Savings:**
+                            alternatives = medicine_check.get("generic_alternatives") or []
+                            if alternatives:
+                                rows = "\n".join(
+                                    f"| {alt['brand']} | {alt['generic']} | "
+                                    f"{str(alt['savings_pct']) + '%' if alt['savings_pct'] is not None else '-'} |"
+                                    for alt in alternatives
+                                )
+                                st.markdown(
+                                    "| Brand Name | Generic Alternative | Typical Savings |\n"
+                                    "|------------|---------------------|-----------------|\n" + rows
+                                )
+                            else:
+                                st.markdown("No branded medicines were recognized in the prescription.")
                             
-                            | Brand Name | Generic Alternative | Typical Savings |
-                            |------------|---------------------|-----------------|
-                            | Metformin | Metformin HCl | 85% |
-                            | Atorvastatin | Atorvastatin Calcium | 78% |
-                            | Losartan | Losartan Potassium | 82% |
-                            
-                            💡 Generic medicines contain the same active ingredients and are equally effective.
-                            """)
+                            st.markdown("💡 Generic medicines contain the same active ingredients and are equally effective.")
                     
                     if result.get("demo_mode"):
                         st.markdown('<div class="demo-mode">⚠️ Demo Mode: Using sample response</div>', unsafe_allow_html=True)
@@ -831,7 +916,7 @@ elif st.session_state.selected_tool == "💰 Bill Auditor":
         for file in uploaded_files:
             st.markdown(f"""
             <div class="file-card">
-                💰 {file.name} ({(len(file.getvalue()) / 1024):.1f} KB)
+                💰 {file.name} ({(file.size / 1024):.1f} KB)
             </div>
             """, unsafe_allow_html=True)
     
@@ -874,14 +959,23 @@ elif st.session_state.selected_tool == "💰 Bill Auditor":
                 if language != "English":
                     analysis_msg += f"\n\nIMPORTANT: Provide the complete audit report in {language} language only."
                 
-                # Get response in selected language
-                result = api.analyze_bill(analysis_msg, uploaded_files)
+                english_analysis_msg = " | ".join(analysis_parts) if language != "English" else None
                 
-                # Get English response if language is not English
-                english_result = None
-                if language != "English" and result.get("success"):
-                    english_analysis_msg = " | ".join(analysis_parts)
-                    english_result = api.analyze_bill(english_analysis_msg, uploaded_files)
+                # Get selected-language and English responses concurrently
+                results = api.call_bilingual(
+                    "analyze_bill",
+                    analysis_msg,
+                    english_analysis_msg,
+                    uploaded_files,
+                    analysis_depth == "Quick Audit",
+                    check_overcharges,
+                    check_duplicates,
+                    stream=st.session_state.stream_responses,
+                    language=language,
+                    # A quick audit is built locally in English; the selected-language leg translates it
+                    localized_options={"language": language} if language != "English" else None
+                )
+                result, english_response = split_bilingual_results(results)
                 
                 st.markdown("---")
                 
@@ -889,21 +983,88 @@ elif st.session_state.selected_tool == "💰 Bill Auditor":
                     st.success("✅ Audit Complete!")
                     st.markdown("### 📊 Audit Results")
                     
-                    # Display bilingual response
-                    if language == "English":
-                        st.markdown(result["message"])
-                    else:
-                        display_bilingual_response(
-                            language,
-                            result["message"],
-                            english_result["message"] if english_result and english_result.get("success") else None
-                        )
+                    # Display bilingual response (streams progressively when enabled)
+                    display_bilingual_response(language, result["message"], english_response)
+                    
+                    # Line items checked locally against the reference price table
+                    local_audit = result.get("local_audit")
+                    if local_audit:
+                        with st.expander(f"🧮 Line-item check: {local_audit['flagged_items']} of {local_audit['line_items']} items flagged"):
+                            if local_audit["findings"]:
+                                st.dataframe(pd.DataFrame(local_audit["findings"]), use_container_width=True, hide_index=True)
+                            else:
+                                st.markdown(f"Nothing flagged (checked: {', '.join(local_audit['checks'])}).")
                     
                     if result.get("demo_mode"):
                         st.markdown('<div class="demo-mode">⚠️ Demo Mode: Using sample audit report</div>', unsafe_allow_html=True)
                 else:
                     st.error(f"❌ Audit failed: {result.get('error', 'Unknown error')}")
 
+# ========== ADMIN METRICS PAGE ==========
+elif st.session_state.selected_tool == "📈 Admin Metrics":
+    st.markdown("""
+    <div class="glass-card">
+        <h2 style="margin-top: 0;">📈 Admin Metrics</h2>
+        <p>Latency and outcomes of every Langflow call made by this server process</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    snapshot = api.metrics.snapshot()
+    if not snapshot:
+        st.info("No flow calls recorded yet. Use any agent and come back here.")
+    else:
+        rows = []
+        for flow_key, m in snapshot.items():
+            rows.append({
+                "Flow": api.endpoints.get(flow_key, {}).get("flow_name", flow_key),
+                "Calls": m["calls"],
+                "Success": m["success"],
+                "Demo fallbacks": m["fallbacks"],
+                "p50 (s)": m["latency_p50_s"],
+                "p95 (s)": m["latency_p95_s"],
+                "Avg attempts": m["attempts_mean"],
+                "Status codes": ", ".join(f"{code}: {n}" for code, n in sorted(m["status_codes"].items())),
+                "Avg request (KB)": m["request_kb_mean"],
+                "Uploaded (KB)": m["upload_kb_total"],
+                "Extract (ms)": m["extract_ms_mean"]
+            })
+        table = pd.DataFrame(rows)
+        
+        slowest = table.dropna(subset=["p95 (s)"]).sort_values("p95 (s)", ascending=False).head(1)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Flow calls", int(table["Calls"].sum()))
+        col2.metric("Demo fallbacks", int(table["Demo fallbacks"].sum()))
+        if not slowest.empty:
+            col3.metric("Slowest flow (p95)", slowest["Flow"].iloc[0], f"{slowest['p95 (s)'].iloc[0]:.2f}s", delta_color="off")
+        
+        st.dataframe(table.round(3), use_container_width=True, hide_index=True)
+    
+    cache_stats = api.cache.stats()
+    st.caption(f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['entries']} entries")
+    
+    extraction = api.extractor.stats().values()
+    st.caption(f"Answer extraction: {sum(s['fast_path_hits'] for s in extraction)} on the learned path, "
+               f"{sum(s['full_searches'] for s in extraction)} full searches")
+    
+    raw_stats = api.raw_responses.stats()
+    if raw_stats["enabled"]:
+        st.caption(f"Raw responses kept: {raw_stats['bodies']} ({raw_stats['stored_kb']:.0f} of "
+                   f"{raw_stats['max_kb']:.0f} KB, {raw_stats['evictions']} evicted)")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "⬇️ Prometheus metrics",
+            api.prometheus_metrics(),
+            file_name="chronocheck_metrics.prom",
+            mime="text/plain",
+            use_container_width=True
+        )
+    with col2:
+        if st.button("🔄 Reset metrics", use_container_width=True):
+            api.metrics.reset()
+            st.rerun()
+
 # ========== FOOTER ==========
 st.markdown("---")
 st.markdown("""
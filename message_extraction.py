@@ -0,0 +1,134 @@
+# message_extraction.py - Answer text extraction from Langflow run responses
+"""
+Message extraction
+Langflow puts the answer text in different places depending on the flow (standard
+outputs[0].outputs[0].results.message.text, direct results, top-level message/result/text/
+content). The full search walks those places in order and reports the JSON path that matched;
+the path is remembered per flow and tried first on the next response, so the search only runs
+again when a flow changes shape. Bodies are decoded with orjson when it is installed.
+"""
+
+import json
+from collections import Counter
+from typing import Optional, Dict, Any, Tuple, Iterator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# A JSON path: dict keys and list indexes from the response root to the answer text
+Path = Tuple[Any, ...]
+
+
+def loads(body: bytes) -> Any:
+    """Decode a response body; orjson when available (it rejects NaN/Infinity, so those go to json)"""
+    if orjson is not None:
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(body)
+
+
+def dumps_indented(data: Any) -> str:
+    """Pretty-printed JSON for responses without a recognisable answer"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(data, indent=2)
+
+
+def follow(data: Any, path: Path) -> Optional[str]:
+    """Non-empty string at path, or None"""
+    for step in path:
+        if isinstance(step, int):
+            if not isinstance(data, list) or step >= len(data):
+                return None
+            data = data[step]
+        elif isinstance(data, dict):
+            data = data.get(step)
+        else:
+            return None
+    return data if data and isinstance(data, str) else None
+
+
+def _candidates(data: Dict[str, Any]) -> Iterator[Path]:
+    """Places the answer can be, in priority order"""
+    outputs = data.get("outputs")
+    if outputs and isinstance(outputs, list):
+        # Standard Langflow format - outputs[0].outputs[i].results.message.text
+        first_output = outputs[0]
+        if isinstance(first_output, dict):
+            inner_outputs = first_output.get("outputs")
+            if isinstance(inner_outputs, list):
+                for i in range(len(inner_outputs)):
+                    yield ("outputs", 0, "outputs", i, "results", "message", "text")
+            
+            # Direct results
+            yield ("outputs", 0, "results", "message", "text")
+        
+        # Any message or text in outputs
+        for i in range(len(outputs)):
+            yield ("outputs", i, "message")
+            yield ("outputs", i, "text")
+    
+    # Top-level fields
+    yield ("message",)
+    yield ("message", "text")
+    yield ("message", "data", "text")
+    yield ("result",)
+    yield ("result", "text")
+    yield ("result", "message")
+    yield ("text",)
+    yield ("content",)
+
+
+def search(data: Any) -> Tuple[Optional[str], Optional[Path]]:
+    """Full search: (text, path) of the first place holding a non-empty string"""
+    if not isinstance(data, dict):
+        return None, None
+    for path in _candidates(data):
+        text = follow(data, path)
+        if text is not None:
+            return text, path
+    return None, None
+
+
+class MessageExtractor:
+    """Full search with a learned per-flow fast path"""
+    
+    def __init__(self):
+        self.paths = {}             # flow key -> path that matched last time
+        self.hits = Counter()       # flow key -> answers found on the learned path
+        self.searches = Counter()   # flow key -> full searches (first response, shape changes)
+    
+    def extract(self, data: Any, flow: Optional[str] = None) -> Optional[str]:
+        """Answer text from a run response (or a stream's end-event result); None if there is none"""
+        path = self.paths.get(flow) if flow is not None else None
+        if path is not None:
+            text = follow(data, path)
+            if text is not None:
+                self.hits[flow] += 1
+                return text
+        
+        text, path = search(data)
+        if flow is not None:
+            self.searches[flow] += 1
+            if path is not None:
+                self.paths[flow] = path
+        return text
+    
+    def stats(self) -> Dict[str, Any]:
+        """Per flow: fast-path hits, full searches and the learned path"""
+        return {
+            flow: {
+                "fast_path_hits": self.hits[flow],
+                "full_searches": self.searches[flow],
+                "path": ".".join(map(str, self.paths[flow])) if flow in self.paths else None
+            }
+            for flow in sorted(set(self.hits) | set(self.searches))
+        }
\ No newline at end of file
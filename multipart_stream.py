@@ -0,0 +1,140 @@
+# multipart_stream.py - Streaming multipart/form-data bodies for flow runs and file uploads
+"""
+Streaming multipart encoder
+Builds the multipart body lazily: file parts are read in CHUNK_SIZE slices from each upload's
+own buffer (Streamlit UploadedFile and ProcessedUpload are BytesIO), so the HTTP client sends
+them without a joined copy of every file. Part sizes are known up front, so the body has a
+Content-Length, oversized requests are rejected before anything is sent, and each iteration
+starts again from the first byte (retries re-send the same encoder). Upload-registry keys are
+the uploads' SHA-256 (file_digest), taken before the request since the key decides whether to
+send at all.
+"""
+
+import hashlib
+import uuid
+from contextlib import contextmanager
+from typing import Optional, Dict, List, Tuple, Iterator, AsyncIterator
+
+
+# Slice size for file parts
+CHUNK_SIZE = 64 * 1024
+
+# Default limit for one request body (files plus form fields)
+DEFAULT_MAX_REQUEST_BYTES = 100 * 1024 ** 2
+
+
+class UploadTooLarge(ValueError):
+    """The multipart body would exceed the per-request limit"""
+    
+    def __init__(self, size: int, limit: int):
+        self.size = size
+        self.limit = limit
+        super().__init__(f"Upload too large: {size / 1024 ** 2:.1f} MB in one request "
+                         f"(limit {limit / 1024 ** 2:.0f} MB). Please upload fewer or smaller files.")
+
+
+def _quote(value: str) -> str:
+    """Header parameter value, HTML5 style (as browsers and urllib3 encode them)"""
+    return value.replace("\\", "\\\\").replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
+
+
+@contextmanager
+def file_view(file) -> Iterator[memoryview]:
+    """Zero-copy view of an upload's bytes; independent of the file position, so concurrent
+    readers (the two legs of a bilingual call) do not interfere"""
+    if hasattr(file, "getbuffer"):
+        with file.getbuffer() as view:
+            yield view
+    else:
+        yield memoryview(file.getvalue())
+
+
+def file_size(file) -> int:
+    """Byte length of the upload's buffer (not the reported size, which may be stale)"""
+    with file_view(file) as view:
+        return view.nbytes
+
+
+def file_digest(file, chunk_size: int = CHUNK_SIZE) -> str:
+    """SHA-256 of an upload, hashed slice by slice"""
+    digest = hashlib.sha256()
+    with file_view(file) as view:
+        for start in range(0, view.nbytes, chunk_size):
+            digest.update(view[start:start + chunk_size])
+    return digest.hexdigest()
+
+
+class MultipartEncoder:
+    """
+    multipart/form-data body as a re-iterable stream of bytes
+    fields: (name, (filename, value[, content_type])) like requests' files=; a None filename
+    makes a plain form field (str or bytes value), otherwise value is an upload (file-like)
+    """
+    
+    def __init__(self, fields: List[Tuple[str, Tuple]], max_bytes: Optional[int] = None,
+                 chunk_size: int = CHUNK_SIZE):
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.parts = []   # (field name, header bytes, bytes value or upload, size)
+        
+        for name, spec in fields:
+            filename, value = spec[0], spec[1]
+            if filename is None:
+                header = f'--{self.boundary}\r\nContent-Disposition: form-data; name="{_quote(name)}"\r\n\r\n'
+                data = value.encode("utf-8") if isinstance(value, str) else bytes(value)
+                self.parts.append((name, header.encode("utf-8"), data, len(data)))
+            else:
+                content_type = spec[2] if len(spec) > 2 and spec[2] else "application/octet-stream"
+                header = (f'--{self.boundary}\r\nContent-Disposition: form-data; name="{_quote(name)}"; '
+                          f'filename="{_quote(filename)}"\r\nContent-Type: {content_type}\r\n\r\n')
+                self.parts.append((name, header.encode("utf-8"), value, file_size(value)))
+        
+        self.closing = f"--{self.boundary}--\r\n".encode("ascii")
+        self.file_bytes = sum(size for _, _, value, size in self.parts if not isinstance(value, bytes))
+        self.length = sum(len(header) + size + 2 for _, header, _, size in self.parts) + len(self.closing)
+        
+        if max_bytes is not None and self.length > max_bytes:
+            raise UploadTooLarge(self.length, max_bytes)
+    
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+    
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Content-Type and Content-Length for the request"""
+        return {"Content-Type": self.content_type, "Content-Length": str(self.length)}
+    
+    def __len__(self) -> int:
+        return self.length
+    
+    def __iter__(self) -> Iterator[bytes]:
+        """The whole body from the start; every iteration re-reads the uploads"""
+        for _, header, value, _ in self.parts:
+            yield header
+            if isinstance(value, bytes):
+                yield value
+            else:
+                with file_view(value) as view:
+                    for start in range(0, view.nbytes, self.chunk_size):
+                        yield bytes(view[start:start + self.chunk_size])
+            yield b"\r\n"
+        yield self.closing
+    
+    def async_content(self) -> "AsyncBody":
+        """The body for httpx.AsyncClient (content=...), which streams any sync iterable synchronously"""
+        return AsyncBody(self)
+
+
+class AsyncBody:
+    """Async-iterable view of a MultipartEncoder; each iteration starts from the first byte"""
+    
+    __slots__ = ("encoder",)
+    
+    def __init__(self, encoder: MultipartEncoder):
+        self.encoder = encoder
+    
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        # The uploads are already in memory, so slices are produced without awaiting
+        for chunk in self.encoder:
+            yield chunk
\ No newline at end of file
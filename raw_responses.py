@@ -0,0 +1,117 @@
+# raw_responses.py - Opt-in, bounded retention of raw Langflow response bodies
+"""
+Raw response store
+Results carry only the answer text and metadata. When raw retention is enabled, the response
+body bytes are kept compressed in a store bounded by total size (oldest evicted first), and
+the result gets a small RawResponse handle that decodes the body again on request. Decoded
+Langflow responses (chat history, artifacts, component logs) are several times larger than
+their bytes, so nothing decoded is held between calls.
+
+Results themselves stay the plain success/message/error dicts the rest of the app reads
+(st.session_state, the response cache, api_server's JSON replies, dict(result, ...) when a
+result is localized). With the decoded body gone they hold a few short strings, so only the
+handle is a slotted object.
+"""
+
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, Any
+
+from message_extraction import loads
+
+
+@dataclass(frozen=True, repr=False)
+class RawResponse:
+    """Handle to a retained response body (the result's "raw" entry)"""
+    
+    __slots__ = ("ref", "size", "store")
+    
+    ref: str
+    size: int
+    store: "RawResponseStore"
+    
+    def __repr__(self) -> str:
+        return f"RawResponse(ref={self.ref!r}, size={self.size})"
+    
+    @property
+    def available(self) -> bool:
+        """False once the body has been evicted from the store"""
+        return self.store.contains(self.ref)
+    
+    def json(self) -> Any:
+        """Decoded body (parsed on every call); None if evicted or not JSON"""
+        return self.store.load(self.ref)
+    
+    def text(self) -> Optional[str]:
+        body = self.store.get_bytes(self.ref)
+        return body.decode("utf-8", "replace") if body is not None else None
+
+
+class RawResponseStore:
+    """Compressed response bodies, bounded by total compressed size; max_bytes=0 disables retention"""
+    
+    def __init__(self, max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self._bodies = OrderedDict()   # ref -> compressed body
+        self._lock = threading.Lock()
+        self.stored_bytes = 0
+        self.evictions = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+    
+    def put(self, body: bytes) -> Optional[RawResponse]:
+        """Retain a body; None if retention is off or the body alone exceeds the budget"""
+        if not self.enabled or not body:
+            return None
+        
+        compressed = zlib.compress(body, 1)
+        if len(compressed) > self.max_bytes:
+            return None
+        
+        ref = uuid.uuid4().hex
+        with self._lock:
+            self._bodies[ref] = compressed
+            self.stored_bytes += len(compressed)
+            while self.stored_bytes > self.max_bytes:
+                _, evicted = self._bodies.popitem(last=False)
+                self.stored_bytes -= len(evicted)
+                self.evictions += 1
+        return RawResponse(ref, len(body), self)
+    
+    def contains(self, ref: str) -> bool:
+        with self._lock:
+            return ref in self._bodies
+    
+    def get_bytes(self, ref: str) -> Optional[bytes]:
+        with self._lock:
+            compressed = self._bodies.get(ref)
+        return zlib.decompress(compressed) if compressed is not None else None
+    
+    def load(self, ref: str) -> Any:
+        body = self.get_bytes(ref)
+        if body is None:
+            return None
+        try:
+            return loads(body)
+        except ValueError:
+            return None
+    
+    def clear(self):
+        with self._lock:
+            self._bodies.clear()
+            self.stored_bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "bodies": len(self._bodies),
+                "stored_kb": self.stored_bytes / 1024,
+                "max_kb": self.max_bytes / 1024,
+                "evictions": self.evictions
+            }
\ No newline at end of file
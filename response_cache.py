@@ -0,0 +1,147 @@
+# response_cache.py - Response cache for deterministic Langflow calls
+"""
+Two-tier response cache for CloudLangflowAPI
+In-memory LRU with TTL, plus an optional on-disk SQLite tier shared across processes
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Optional, Dict, Any, List
+
+from multipart_stream import file_digest
+
+
+class ResponseCache:
+    
+    def __init__(self, max_entries: int = 512, db_path: Optional[str] = None):
+        """Create the memory tier and, if db_path is given, the SQLite tier"""
+        
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (expires_at, result)
+        self._lock = threading.Lock()
+        
+        self.hits = Counter()
+        self.misses = Counter()
+        self.disk_hits = Counter()
+        
+        self.db_path = db_path
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, expires_at REAL NOT NULL, result TEXT NOT NULL)"
+            )
+            self._db.commit()
+    
+    # ========== KEYS ==========
+    
+    @staticmethod
+    def normalize_input(input_value: str) -> str:
+        """Collapse whitespace and case so trivially different prompts share an entry"""
+        return re.sub(r"\s+", " ", input_value or "").strip().casefold()
+    
+    @staticmethod
+    def hash_files(files: List = None) -> str:
+        """Content hash of uploaded files (order-sensitive, name-independent)"""
+        if not files:
+            return ""
+        
+        digest = hashlib.sha256()
+        for file in files:
+            digest.update(bytes.fromhex(file_digest(file)))
+        return digest.hexdigest()
+    
+    def make_key(self, flow_key: str, input_value: str, files: List = None) -> str:
+        """Cache key: flow key + normalized input + file content hash"""
+        material = "\x00".join([flow_key, self.normalize_input(input_value), self.hash_files(files)])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+    
+    # ========== LOOKUP / STORE ==========
+    
+    def get(self, flow_key: str, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached result or None, counting the hit/miss against flow_key"""
+        
+        now = time.time()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits[flow_key] += 1
+                    return dict(result)
+                del self._entries[key]
+            
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT expires_at, result FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[0] > now:
+                    result = json.loads(row[1])
+                    self._store_memory(key, row[0], result)
+                    self.hits[flow_key] += 1
+                    self.disk_hits[flow_key] += 1
+                    return dict(result)
+            
+            self.misses[flow_key] += 1
+            return None
+    
+    def set(self, key: str, result: Dict[str, Any], ttl: float):
+        """Store a result in both tiers for ttl seconds"""
+        
+        if ttl <= 0:
+            return
+        
+        expires_at = time.time() + ttl
+        
+        with self._lock:
+            self._store_memory(key, expires_at, result)
+            
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, expires_at, result) VALUES (?, ?, ?)",
+                    (key, expires_at, json.dumps(result))
+                )
+                self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+                self._db.commit()
+    
+    def _store_memory(self, key: str, expires_at: float, result: Dict[str, Any]):
+        """Insert into the LRU, evicting the least recently used entries (lock held)"""
+        self._entries[key] = (expires_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters overall and per flow"""
+        with self._lock:
+            flows = set(self.hits) | set(self.misses)
+            return {
+                "entries": len(self._entries),
+                "hits": sum(self.hits.values()),
+                "misses": sum(self.misses.values()),
+                "disk_hits": sum(self.disk_hits.values()),
+                "per_flow": {
+                    flow: {
+                        "hits": self.hits[flow],
+                        "misses": self.misses[flow],
+                        "disk_hits": self.disk_hits[flow]
+                    }
+                    for flow in sorted(flows)
+                }
+            }
\ No newline at end of file
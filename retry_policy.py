@@ -0,0 +1,148 @@
+# retry_policy.py - Retry policy for Langflow calls
+"""
+Retry policy for CloudLangflowAPI
+Exponential backoff with full jitter, Retry-After support, per-error-class handling
+and a process-wide retry budget so an outage doesn't multiply outbound load
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import requests
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+# Statuses that signal a transient upstream problem
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+# Exception classes by kind, for both the requests and the httpx (async) clients
+CONNECT_TIMEOUTS = (requests.exceptions.ConnectTimeout,)
+READ_TIMEOUTS = (requests.exceptions.ReadTimeout,)
+CONNECTION_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError)
+
+if httpx is not None:
+    CONNECT_TIMEOUTS += (httpx.ConnectTimeout, httpx.PoolTimeout)
+    READ_TIMEOUTS += (httpx.ReadTimeout, httpx.WriteTimeout)
+    CONNECTION_ERRORS += (httpx.ConnectError, httpx.ReadError, httpx.WriteError, httpx.RemoteProtocolError)
+
+
+class RetryBudget:
+    """
+    Allow retries up to a fraction of recent requests (plus a small floor)
+    e.g. ratio=0.2 lets at most one retry per five requests over the window
+    """
+    
+    def __init__(self, ratio: float = 0.2, min_retries: int = 3, window: float = 10.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+        self.denied = 0
+    
+    def _trim(self, now: float):
+        cutoff = now - self.window
+        for events in (self._requests, self._retries):
+            while events and events[0] < cutoff:
+                events.popleft()
+    
+    def record_request(self):
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            self._requests.append(now)
+    
+    def try_acquire(self) -> bool:
+        """Spend one retry if the budget allows it"""
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+                self.denied += 1
+                return False
+            self._retries.append(now)
+            return True
+
+
+class RetryPolicy:
+    
+    def __init__(self, max_attempts: int = 3, base_delay: float = 1.0, max_delay: float = 20.0,
+                 connect_timeout: float = 10.0, retry_read_timeouts: bool = False,
+                 budget: RetryBudget = None):
+        """
+        max_attempts counts the first try; read timeouts are not retried by default because
+        the flow was already working on the request and a retry burns another full timeout
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.connect_timeout = connect_timeout
+        self.retry_read_timeouts = retry_read_timeouts
+        self.budget = budget or RetryBudget()
+    
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given (0-based) failed attempt"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+    
+    @staticmethod
+    def retry_after(response) -> Optional[float]:
+        """Seconds requested by a Retry-After header (delta-seconds or HTTP date)"""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+    
+    def _allow(self, attempt: int) -> bool:
+        return attempt + 1 < self.max_attempts and self.budget.try_acquire()
+    
+    def delay_after_exception(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying after a request exception, or None to give up"""
+        
+        if isinstance(error, CONNECT_TIMEOUTS):
+            # Nothing reached the server; retry promptly
+            retryable = True
+        elif isinstance(error, READ_TIMEOUTS):
+            retryable = self.retry_read_timeouts
+        elif isinstance(error, CONNECTION_ERRORS):
+            retryable = True
+        else:
+            retryable = False
+        
+        if not retryable or not self._allow(attempt):
+            return None
+        if isinstance(error, CONNECT_TIMEOUTS):
+            return self.backoff(0)
+        return self.backoff(attempt)
+    
+    def delay_after_response(self, response, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying a response, or None if it should be returned as-is"""
+        
+        if response.status_code not in RETRYABLE_STATUS:
+            return None
+        
+        # A Retry-After longer than we are willing to wait means give up now
+        delay = self.retry_after(response)
+        if delay is not None and delay > self.max_delay:
+            return None
+        
+        if not self._allow(attempt):
+            return None
+        return delay if delay is not None else self.backoff(attempt)
\ No newline at end of file
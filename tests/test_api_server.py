@@ -0,0 +1,130 @@
+# test_api_server.py - Headless API routing, single-flight and error mapping against the Langflow stub
+import asyncio
+import base64
+
+import httpx
+import pytest
+
+import api_server
+from api_server import AgentServer, SingleFlight
+from async_langflow_api import AsyncCloudLangflowAPI
+from langflow_stub import StubServer
+
+
+@pytest.fixture
+def stub():
+    with StubServer(seed=0, latency_ms=200, jitter_ms=0) as server:
+        yield server
+
+
+@pytest.fixture
+def server(stub, tmp_path):
+    prices = tmp_path / "prices.csv"
+    prices.write_text("item,price,aliases\nComplete Blood Count,200,CBC\n", encoding="utf-8")
+    return AgentServer(lambda: AsyncCloudLangflowAPI(secrets=stub.secrets(BILL_REFERENCE_PRICES=str(prices))))
+
+
+def _run(server, *requests):
+    """Send (method, path, json) requests concurrently; responses in order"""
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server), base_url="http://test") as client:
+            return await asyncio.gather(*(client.request(method, path, json=body) for method, path, body in requests))
+    return asyncio.run(send())
+
+
+def _bill(text):
+    return [{"name": "bill.txt", "type": "text/plain", "content_base64": base64.b64encode(text.encode()).decode()}]
+
+
+def test_qna_runs_the_flow(server, stub):
+    response, = _run(server, ("POST", "/qna", {"question": "What is HbA1c?"}))
+    assert response.status_code == 200
+    assert response.json()["success"]
+    assert stub.stats()["requests"] == {"qna:run": 1}
+
+
+def test_identical_requests_share_one_upstream_call(server, stub):
+    responses = _run(server, *[("POST", "/hospitals", {"query": "Cardiac", "location": "Pune"})] * 5)
+    assert [r.status_code for r in responses] == [200] * 5
+    assert stub.stats()["requests"] == {"hospitals:run": 1}
+    assert server.single_flight.coalesced == 4
+
+
+def test_requests_differing_in_options_are_not_coalesced(server, stub):
+    body = {"message": "Check", "files": _bill("CBC 1 900 900")}
+    quick, detailed = _run(server, ("POST", "/bill", dict(body, quick_audit=True)), ("POST", "/bill", body))
+    assert quick.json()["local_audit"]["total_overcharge"] == 700
+    assert "local_audit" in detailed.json()
+    # Only the detailed audit calls the flow
+    assert stub.stats()["requests"] == {"bill:run": 1}
+    assert server.single_flight.executed == 2
+
+
+@pytest.mark.parametrize("method, path, body, status", [
+    ("POST", "/nowhere", {}, 404),
+    ("GET", "/qna", None, 405),
+    ("POST", "/qna", {}, 400),
+    ("POST", "/bill", {"message": "x", "quick_audit": "yes"}, 400),
+    ("POST", "/hospitals", {"query": "x", "specializations": "Cardiology"}, 400),
+    ("POST", "/report", {"files": [{"name": "r.pdf"}]}, 400),
+])
+def test_request_errors(server, stub, method, path, body, status):
+    response, = _run(server, (method, path, body))
+    assert response.status_code == status
+    assert response.json()["success"] is False
+    assert stub.stats()["requests"] == {}
+
+
+def test_body_over_the_limit_is_refused(server, monkeypatch):
+    monkeypatch.setattr(api_server, "MAX_BODY_BYTES", 100)
+    response, = _run(server, ("POST", "/qna", {"question": "x" * 200}))
+    assert response.status_code == 413
+
+
+def test_unexpected_error_keeps_the_json_shape(server):
+    async def broken(question):
+        raise RuntimeError("boom")
+    server._get_api().qna_medical = broken
+    
+    response, = _run(server, ("POST", "/qna", {"question": "q"}))
+    assert response.status_code == 500
+    assert response.json() == {"success": False, "error": "Internal error: RuntimeError: boom"}
+
+
+def test_health_and_metrics(server):
+    _run(server, ("POST", "/qna", {"question": "q"}))
+    health, metrics = _run(server, ("GET", "/health", None), ("GET", "/metrics", None))
+    assert health.json()["circuits"]["qna_agent"] == "closed"
+    assert "qna_agent" in metrics.text
+
+
+def test_lifespan_builds_and_closes_the_client(server):
+    messages = asyncio.Queue()
+    sent = []
+    
+    async def send(message):
+        sent.append(message["type"])
+    
+    async def run():
+        await messages.put({"type": "lifespan.startup"})
+        await messages.put({"type": "lifespan.shutdown"})
+        await server({"type": "lifespan"}, messages.get, send)
+    
+    asyncio.run(run())
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert server.api is not None
+
+
+def test_single_flight_propagates_errors_to_every_caller():
+    flight = SingleFlight()
+    
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream")
+    
+    async def run():
+        return await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+    
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.stats() == {"executed": 1, "coalesced": 2, "in_flight": 0}
\ No newline at end of file
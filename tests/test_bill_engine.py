@@ -0,0 +1,95 @@
+# test_bill_engine.py - Bill line parsing, overcharge and duplicate checks
+from bill_engine import BillAuditor, _parse_line
+
+
+def test_single_spaced_dated_line():
+    item = _parse_line("12/03/2024 X-Ray Chest PA 1 600 600")
+    assert item == {"description": "X-Ray Chest PA", "date": "2024-03-12", "quantity": 1.0, "amount": 600.0}
+
+
+def test_column_layout_with_date():
+    item = _parse_line("1  12/03/2024  CBC  1  200  200")
+    assert item["description"] == "CBC"
+    assert item["date"] == "2024-03-12"
+    assert item["amount"] == 200.0
+
+
+def test_dose_is_part_of_the_description():
+    item = _parse_line("Inj Ceftriaxone 1 g 2 60 120")
+    assert item["description"] == "Inj Ceftriaxone 1 g"
+    assert item["quantity"] == 2.0
+    
+    item = _parse_line("Inj Pantoprazole 40 mg 2 120 240")
+    assert item["description"] == "Inj Pantoprazole 40 mg"
+    assert item["quantity"] == 2.0
+
+
+def test_numbered_pipe_table_rows():
+    # The layout the DOCX extractor produces, with an S.No column
+    assert _parse_line("3 | Paracetamol 500mg Tablet | 10 | 5 | 50")["quantity"] == 10.0
+    assert _parse_line("12 | Normal Saline 500ml | 4 | 30 | 120")["quantity"] == 4.0
+    
+    item = _parse_line("1 | Room Rent General Ward | 3 | 1500 | 4500")
+    assert item["description"] == "Room Rent General Ward"
+    assert item["quantity"] == 3.0
+
+
+def test_rate_before_quantity():
+    assert _parse_line("Room Rent General Ward | 1500 | 3 | 4500")["quantity"] == 3.0
+
+
+def test_numbered_pipe_table_has_no_false_overcharges():
+    audit = BillAuditor().audit_text(
+        "S.No | Item | Qty | Rate | Amount\n"
+        "1 | Room Rent General Ward | 3 | 1500 | 4500\n"
+        "3 | Paracetamol 500mg Tablet | 10 | 2 | 20\n"
+        "12 | Normal Saline 500ml | 4 | 30 | 120"
+    )
+    assert audit["line_items"] == 3
+    assert audit["total_overcharge"] == 0
+
+
+def test_duplicates_on_dated_lines():
+    audit = BillAuditor().audit_text(
+        "12/03/2024 CBC 1 200 200\n"
+        "13/03/2024 CBC 1 200 200\n"
+        "13/03/2024 Complete Blood Count 1 200 200\n"
+        "13/03/2024 CBC 1 200 200"
+    )
+    duplicates = {f["line"]: (f["duplicate_kind"], f["duplicate_of"]) for f in audit["findings"] if f["duplicate_kind"]}
+    # Same test on different days is not a duplicate
+    assert duplicates == {3: ("near", 2), 4: ("exact", 2)}
+
+
+def test_overcharge_against_reference_price():
+    audit = BillAuditor().audit_text("12/03/2024 X-Ray Chest PA 1 600 600")
+    assert audit["findings"][0]["overcharged"]
+    assert audit["total_overcharge"] > 0
+
+
+def test_explain_prompt_does_not_present_findings_as_final():
+    audit = BillAuditor().audit_text("12/03/2024 X-Ray Chest PA 1 600 600")
+    prompt = BillAuditor.explain_prompt("Check my bill", audit)
+    assert "final" not in prompt
+
+
+def test_explain_prompt_sends_unmatched_items_and_bill_text():
+    text = "1 | Angioplasty Package | 1 | 150000 | 150000\n2 | CBC | 1 | 900 | 900"
+    audit = BillAuditor().audit_text(text)
+    assert [row["description"] for row in audit["unmatched"]] == ["Angioplasty Package"]
+    
+    prompt = BillAuditor.explain_prompt("Check my bill", audit, text)
+    assert "- Angioplasty Package: ₹150,000.00" in prompt
+    assert text in prompt
+    assert "re-audit" not in prompt
+
+def test_unchecked_kinds_are_not_reported():
+    text = "CBC 1 900 900\nCBC 1 900 900"
+    only_overcharges = BillAuditor().audit_text(text, overcharges=True, duplicates=False)
+    assert not any(f["duplicate"] for f in only_overcharges["findings"])
+    assert only_overcharges["duplicate_amount"] == 0
+    
+    only_duplicates = BillAuditor().audit_text(text, overcharges=False, duplicates=True)
+    assert [f["line"] for f in only_duplicates["findings"]] == [2]
+    assert only_duplicates["total_overcharge"] == 0
+    assert "overcharges" not in BillAuditor.explain_prompt("Check", only_duplicates)
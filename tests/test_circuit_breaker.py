@@ -0,0 +1,70 @@
+# test_circuit_breaker.py - Circuit breaker state transitions
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+def _open_breaker(**settings):
+    breaker = CircuitBreaker("test", failure_threshold=2, **settings)
+    for _ in range(2):
+        permit = breaker.allow_request()
+        assert permit is not None
+        breaker.record(permit, False)
+    return breaker
+
+
+def test_opens_after_consecutive_failures():
+    breaker = _open_breaker(open_seconds=60)
+    assert breaker.state == OPEN
+    assert breaker.allow_request() is None
+    assert breaker.short_circuited == 1
+
+
+def test_half_open_allows_one_probe():
+    breaker = _open_breaker(open_seconds=0)
+    assert breaker.allow_request().probe
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request() is None
+
+
+def test_probe_success_closes_and_failure_reopens():
+    breaker = _open_breaker(open_seconds=0)
+    breaker.record(breaker.allow_request(), True)
+    assert breaker.state == CLOSED
+    
+    breaker = _open_breaker(open_seconds=0)
+    breaker.record(breaker.allow_request(), False)
+    assert breaker.state == OPEN
+
+
+def test_released_probe_lets_the_next_call_through():
+    breaker = _open_breaker(open_seconds=0)
+    permit = breaker.allow_request()
+    breaker.release(permit)   # e.g. the upload was refused before reaching the flow
+    assert breaker.state == HALF_OPEN
+    breaker.record(breaker.allow_request(), True)
+    assert breaker.state == CLOSED
+
+
+def test_stale_call_does_not_decide_the_probe():
+    breaker = CircuitBreaker("test", failure_threshold=2, open_seconds=0)
+    slow = breaker.allow_request()   # let through while closed, still running
+    for _ in range(2):
+        breaker.record(breaker.allow_request(), False)
+    
+    probe = breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    
+    # The slow call finishing (or being released) must not close the circuit or free the probe slot
+    breaker.record(slow, True)
+    breaker.release(slow)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request() is None
+    
+    breaker.record(probe, False)
+    assert breaker.state == OPEN
+
+
+def test_error_rate_opens_without_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=100, error_rate_threshold=0.5, min_calls=4, open_seconds=60)
+    for success in (False, True, False, True):
+        breaker.record(breaker.allow_request(), success)
+    assert breaker.state == OPEN
@@ -0,0 +1,37 @@
+# test_lab_report.py - Lab value extraction and range flagging
+from lab_report import ReportParser
+
+
+def _results(text):
+    return {row["test"]: row for row in ReportParser().analyze_text(text)["results"]}
+
+
+def test_value_below_report_range_is_low():
+    row = _results("Hemoglobin 10.2 g/dL 13-17")["Hemoglobin"]
+    assert row["status"] == "low"
+    assert row["range_source"] == "report"
+
+
+def test_unitless_row_does_not_crash_and_is_not_flagged():
+    results = _results("Hemoglobin 10.2 g/dL 13-17\nESR 30")
+    assert results["ESR"]["unit"] is None
+    assert results["ESR"]["status"] == "unknown"
+
+
+def test_flag_before_unit_layout():
+    row = _results("WBC 11,500 H /cumm 4000 - 11000")["Total WBC Count"]
+    assert row["value"] == 11500
+    assert row["unit"] == "/cumm"
+    assert row["status"] == "high"
+
+
+def test_summary_prompt_keeps_all_report_text():
+    text = "Hemoglobin 10.2 g/dL 13-17\n" + "\n".join(f"Remark line {i} " + "x" * 60 for i in range(100))
+    summary = ReportParser().analyze_text(text)
+    prompt = ReportParser.summary_prompt("Explain", summary)
+    assert "Remark line 0 " in prompt
+    assert "Remark line 99 " in prompt
+
+
+def test_no_lab_values_returns_none():
+    assert ReportParser().analyze_text("Patient was advised rest and fluids") is None
\ No newline at end of file
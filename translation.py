@@ -0,0 +1,175 @@
+# translation.py - Segment-level translation of English answers for translate-once mode
+"""
+Translate-once support
+Instead of running an agent flow a second time with "answer in {language}", the English
+answer is split into segments (lines, table cells) and only the segments not already in
+the translation cache are sent to a dedicated translation flow, in numbered batches.
+Cache entries are keyed by (source segment hash, language), so disclaimers, headings and
+table headers that repeat across answers are translated once.
+"""
+
+import hashlib
+import re
+from typing import Optional, Dict, Any, List, Tuple
+
+from response_cache import ResponseCache
+
+
+# Translated segments are stable; keep them for 30 days
+TRANSLATION_TTL = 30 * 24 * 3600
+
+# Upper bound on the source text sent in one translation call
+MAX_BATCH_CHARS = 6000
+
+# Markdown prefix kept out of the translated text: headings, bullets, numbered items, quotes
+_PREFIX = re.compile(r"^(\s*(?:#{1,6}\s+|[-*+]\s+|\d+[.)]\s+|>\s*)?)(.*?)(\s*)$")
+_TABLE_SEPARATOR = re.compile(r"^\s*\|?[\s:|-]+\|?\s*$")
+_NUMBERED = re.compile(r"^\s*\[(\d+)\]\s?(.*)$")
+
+
+def _translatable(text: str) -> bool:
+    """Only text with words goes to the translator; numbers, amounts and rules are kept"""
+    return bool(re.search(r"[^\W\d_]{2,}", text))
+
+
+def split_segments(text: str) -> Tuple[List[Any], List[str]]:
+    """
+    Markdown text -> (pieces, segments)
+    pieces holds literal strings and integer indexes into segments; joining the pieces with
+    each index replaced by its translation rebuilds the text
+    """
+    pieces, segments, positions = [], [], {}
+    
+    def add(segment: str):
+        if segment not in positions:
+            positions[segment] = len(segments)
+            segments.append(segment)
+        pieces.append(positions[segment])
+    
+    for number, line in enumerate(text.split("\n")):
+        if number:
+            pieces.append("\n")
+        
+        if "|" in line and line.strip().startswith("|") and not _TABLE_SEPARATOR.match(line):
+            for position, cell in enumerate(line.split("|")):
+                if position:
+                    pieces.append("|")
+                stripped = cell.strip()
+                if _translatable(stripped):
+                    lead = cell[:len(cell) - len(cell.lstrip())]
+                    trail = cell[len(cell.rstrip()):]
+                    pieces.append(lead)
+                    add(stripped)
+                    pieces.append(trail)
+                else:
+                    pieces.append(cell)
+            continue
+        
+        prefix, body, trail = _PREFIX.match(line).groups()
+        if _translatable(body):
+            pieces.append(prefix)
+            add(body)
+            pieces.append(trail)
+        else:
+            pieces.append(line)
+    
+    return pieces, segments
+
+
+class TranslationJob:
+    """One text being translated: cached segments are filled in up front, the rest in batches"""
+    
+    def __init__(self, text: str, language: str, cache: ResponseCache):
+        self.language = language
+        self.cache = cache
+        self.pieces, self.segments = split_segments(text)
+        self.translations = {}
+        self.cached_segments = 0
+        
+        for segment in self.segments:
+            cached = cache.get("translator", self.cache_key(segment, language))
+            if cached is not None:
+                self.translations[segment] = cached["text"]
+                self.cached_segments += 1
+    
+    @staticmethod
+    def cache_key(segment: str, language: str) -> str:
+        """(source hash, language) -> cache key"""
+        source_hash = hashlib.sha256(segment.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{source_hash}\x00{language}".encode("utf-8")).hexdigest()
+    
+    @property
+    def missing(self) -> List[str]:
+        return [s for s in self.segments if s not in self.translations]
+    
+    def batches(self) -> List[List[str]]:
+        """Missing segments grouped so each call stays under MAX_BATCH_CHARS"""
+        batches, current, size = [], [], 0
+        for segment in self.missing:
+            if current and size + len(segment) > MAX_BATCH_CHARS:
+                batches.append(current)
+                current, size = [], 0
+            current.append(segment)
+            size += len(segment)
+        if current:
+            batches.append(current)
+        return batches
+    
+    def prompt(self, batch: List[str]) -> str:
+        """Translation flow input for one batch of numbered segments"""
+        numbered = "\n".join(f"[{i}] {segment}" for i, segment in enumerate(batch, start=1))
+        return (
+            f"Translate each numbered segment into {self.language}. Keep numbers, units, amounts, "
+            f"medicine names and markdown formatting unchanged. Reply with exactly one line per "
+            f"segment, in the form [n] translation, and nothing else.\n\n{numbered}"
+        )
+    
+    def apply(self, batch: List[str], reply: str) -> bool:
+        """Store the translations from a reply; False if any segment is missing from it"""
+        found = {}
+        for line in reply.splitlines():
+            match = _NUMBERED.match(line)
+            if match and match.group(2).strip():
+                found[int(match.group(1))] = match.group(2).strip()
+        
+        if any(i not in found for i in range(1, len(batch) + 1)):
+            return False
+        
+        for i, segment in enumerate(batch, start=1):
+            self.translations[segment] = found[i]
+            self.cache.set(self.cache_key(segment, self.language), {"text": found[i]}, TRANSLATION_TTL)
+        return True
+    
+    def text(self) -> str:
+        return "".join(
+            self.translations[self.segments[piece]] if isinstance(piece, int) else piece
+            for piece in self.pieces
+        )
+    
+    def result(self, english_result: Dict[str, Any], calls: int) -> Dict[str, Any]:
+        """Localized result: the English result with its message replaced by the translation"""
+        result = {k: v for k, v in english_result.items() if k not in ("raw", "cached")}
+        result.update({
+            "message": self.text(),
+            "translated": True,
+            "translation": {
+                "language": self.language,
+                "segments": len(self.segments),
+                "cached_segments": self.cached_segments,
+                "calls": calls
+            }
+        })
+        return result
+
+
+def restate_prompt(text: str, language: str) -> str:
+    """Agent flow input asking for a locally built English report in language (no translation flow)"""
+    return (
+        f"Rewrite the following report in {language} language only. Keep every number, amount, "
+        f"unit, test and medicine name and the markdown table layout unchanged, and do not add "
+        f"or remove any finding.\n\n{text}"
+    )
+
+
+def failed_translation(error: Optional[str]) -> Dict[str, Any]:
+    return {"success": False, "error": f"Translation failed: {error or 'incomplete reply from the translation flow'}"}
\ No newline at end of file
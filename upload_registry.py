@@ -0,0 +1,85 @@
+# upload_registry.py - Registry of files already uploaded to Langflow
+"""
+Upload-once registry for CloudLangflowAPI
+Maps (flow key, content hash) to the file reference returned by Langflow's upload endpoint
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, Tuple
+
+
+class UploadRegistry:
+    
+    def __init__(self, ttl: float = 6 * 3600, max_entries: int = 1024):
+        """Uploaded files are reused for ttl seconds (Langflow may clean them up later)"""
+        
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._refs = OrderedDict()   # key -> (expires_at, file reference)
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        
+        self.uploads = 0
+        self.reuses = 0
+    
+    def _lookup(self, key: Tuple) -> Optional[str]:
+        """Return a live reference (lock held)"""
+        entry = self._refs.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._refs[key]
+            return None
+        self._refs.move_to_end(key)
+        return entry[1]
+    
+    def get_or_upload(self, key: Tuple, upload: Callable[[], Optional[str]]) -> Optional[str]:
+        """
+        Return the reference for key, calling upload() only if it is not registered yet
+        Concurrent callers for the same key (e.g. both bilingual legs) wait for a single upload
+        """
+        
+        with self._lock:
+            ref = self._lookup(key)
+            if ref is not None:
+                self.reuses += 1
+                return ref
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        
+        with key_lock:
+            with self._lock:
+                ref = self._lookup(key)
+                if ref is not None:
+                    self.reuses += 1
+                    return ref
+            
+            ref = upload()
+            
+            with self._lock:
+                self._key_locks.pop(key, None)
+            if ref is not None:
+                self.register(key, ref)
+        
+        return ref
+    
+    def lookup(self, key: Tuple) -> Optional[str]:
+        """Registered reference for key, counted as a reuse (for callers doing their own upload)"""
+        with self._lock:
+            ref = self._lookup(key)
+            if ref is not None:
+                self.reuses += 1
+            return ref
+    
+    def register(self, key: Tuple, ref: str):
+        """Record a completed upload"""
+        with self._lock:
+            self.uploads += 1
+            self._refs[key] = (time.time() + self.ttl, ref)
+            while len(self._refs) > self.max_entries:
+                self._refs.popitem(last=False)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"files": len(self._refs), "uploads": self.uploads, "reuses": self.reuses}
\ No newline at end of file